@@ -1,5 +1,44 @@
+from pathlib import Path
+
 import streamlit as st
 
+from rhgp.app.score_table import ScoreTable
+from rhgp.config import paths
+
+# Lookups read the precomputed score table (`make score-table`); neither the model nor the
+# processed dataset is loaded here. The table is opened once per server process.
+
+DEFAULT_TABLE = paths().reports / "score_table.arrow"
+
+
+@st.cache_resource
+def load_table(path: str) -> ScoreTable:
+    return ScoreTable.open(Path(path))
+
+
 st.title("Restaurant Health Grade Predictor")
-st.write("Optional demo app. Run after training a model and deciding on input UX.")
+table_path = st.sidebar.text_input("Score table", str(DEFAULT_TABLE))
+if not Path(table_path).exists():
+    st.warning("No score table yet: run `make score-table` after training a model.")
+    st.stop()
+table = load_table(table_path)
+st.sidebar.write(f"{len(table):,} restaurants")
+
+camis = st.number_input("CAMIS", min_value=0, step=1, value=int(table.keys[0]))
+found = table.lookup(int(camis))
+if found is None:
+    st.info(f"No inspections for CAMIS {int(camis)}.")
+else:
+    latest = found.latest
+    st.metric("P(next grade is B or C)", f"{found.p_fail:.1%}")
+    st.write(
+        f"Latest inspection {latest['inspection_date_t']:%Y-%m-%d}: "
+        f"{latest['inspection_type']}, grade {latest['grade_t']}, score {latest['score_t']}"
+    )
+    st.subheader("Latest features")
+    st.json({k: None if v != v else str(v) for k, v in latest.items()})
+    st.subheader("History")
+    st.dataframe(found.history, hide_index=True)
 
+with st.expander("Highest risk restaurants"):
+    st.dataframe(table.riskiest(20), hide_index=True)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import argparse
+import time
+from typing import cast
+
+import pandas as pd
+
+from rhgp.data.schema import COLS, normalize_grade
+from rhgp.data.synthetic import synthetic_raw_rows
+from rhgp.features.aggregate_inspections import aggregate_to_inspections
+
+# Columnar inspection aggregation vs the pandas groupby/`first` path it replaced.
+
+
+def groupby_aggregate(raw: pd.DataFrame) -> pd.DataFrame:
+    df = raw.copy()
+    df[COLS.grade] = df[COLS.grade].map(normalize_grade)
+    df["_has_violation"] = df[COLS.violation_code].notna()
+    df["_is_critical"] = df[COLS.critical_flag].astype(str).str.upper().eq("CRITICAL")
+    agg = df.groupby([COLS.camis, COLS.inspection_date], dropna=False).agg(
+        inspection_type=(COLS.inspection_type, "first"),
+        grade_t=(COLS.grade, "first"),
+        score_t=(COLS.score, "first"),
+        n_violations_t=("_has_violation", "sum"),
+        n_critical_violations_t=("_is_critical", "sum"),
+    )
+    return cast(pd.DataFrame, agg.reset_index())
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark raw -> inspection aggregation.")
+    p.add_argument("--rows", type=int, default=10_000_000, help="Approximate raw rows.")
+    p.add_argument("--shuffle", action="store_true", help="Unsorted input (forces the sort).")
+    args = p.parse_args(argv)
+
+    raw = synthetic_raw_rows(args.rows, seed=0)
+    if args.shuffle:
+        raw = raw.sample(frac=1.0, random_state=0, ignore_index=True)
+
+    t0 = time.perf_counter()
+    columnar = aggregate_to_inspections(raw)
+    t_columnar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    reference = groupby_aggregate(raw)
+    t_groupby = time.perf_counter() - t0
+
+    assert len(columnar) == len(reference)
+    print(f"raw_rows={len(raw)} inspections={len(columnar)} shuffle={args.shuffle}")
+    print(f"groupby\t{t_groupby:.2f}s\t{len(raw) / t_groupby / 1e6:.1f}M rows/s")
+    print(f"columnar\t{t_columnar:.2f}s\t{len(raw) / t_columnar / 1e6:.1f}M rows/s")
+    print(f"speedup\t{t_groupby / t_columnar:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
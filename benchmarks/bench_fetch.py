@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import replace
+from datetime import date
+
+import pandas as pd
+
+from rhgp.data.fetch import FetchConfig, fetch_all
+from rhgp.data.mock_socrata import MockSocrata
+from rhgp.data.synthetic import synthetic_raw, to_socrata_records
+
+# Serial $offset paging vs concurrent date-window fetch against a local mock Socrata server.
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark serial vs parallel Socrata fetch.")
+    p.add_argument("--restaurants", type=int, default=5_000)
+    p.add_argument("--limit", type=int, default=5_000)
+    p.add_argument("--latency-ms", type=float, default=200.0, help="Simulated server time/page.")
+    p.add_argument("--workers", type=int, default=8)
+    p.add_argument("--window-days", type=int, default=90)
+    args = p.parse_args(argv)
+
+    start, end = date(2022, 1, 1), date(2025, 1, 1)
+    raw = synthetic_raw(n_restaurants=args.restaurants, start=start, end=end, seed=0)
+    records = to_socrata_records(raw)
+
+    with MockSocrata(records, latency_s=args.latency_ms / 1000) as mock:
+        cfg = FetchConfig(
+            since_date=start, limit=args.limit, base_url=mock.base_url, meta_url=mock.meta_url
+        )
+        t0 = time.perf_counter()
+        serial = fetch_all(cfg)
+        t_serial = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        parallel = fetch_all(replace(cfg, workers=args.workers, window_days=args.window_days))
+        t_parallel = time.perf_counter() - t0
+
+    pd.testing.assert_frame_equal(serial, parallel)
+    print(f"rows={len(serial)} limit={args.limit} latency_ms={args.latency_ms}")
+    print(f"serial\t{t_serial:.2f}s")
+    print(f"parallel(workers={args.workers})\t{t_parallel:.2f}s")
+    print(f"speedup\t{t_serial / t_parallel:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
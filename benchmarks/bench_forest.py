@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, cast
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset
+from rhgp.models.forest import ForestModel, export_forest
+from rhgp.models.train import feature_columns, time_split
+from rhgp.models.train_rf import build_rf_pipeline
+
+# Load time, first-call and single-row latency, and batch throughput of the joblib RF
+# pipeline against its exported array form.
+
+
+def _timed(fn: Any, *args: Any) -> tuple[Any, float]:
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark joblib vs exported RandomForest.")
+    p.add_argument("--restaurants", type=int, default=20_000)
+    p.add_argument("--n-estimators", type=int, default=400)
+    p.add_argument("--single-rows", type=int, default=200, help="Single-row predict calls.")
+    args = p.parse_args(argv)
+
+    raw = synthetic_raw(
+        n_restaurants=args.restaurants, start=date(2021, 1, 1), end=date(2025, 1, 1), seed=0
+    )
+    train, test, *_ = time_split(build_supervised_dataset(raw))
+    X_test = test.loc[:, feature_columns()]
+    pipe = build_rf_pipeline(n_estimators=args.n_estimators)
+    pipe.fit(train.loc[:, feature_columns()], train["y_t1"].astype(int))
+    print(f"train_rows={len(train)} test_rows={len(test)} trees={args.n_estimators}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        joblib_path = Path(tmp) / "rf.joblib"
+        joblib.dump(pipe, joblib_path)
+        forest_path = export_forest(pipe, Path(tmp) / "rf.forest")
+        loaders = {
+            "joblib": (joblib_path, joblib.load),
+            "forest": (forest_path, ForestModel.load),
+        }
+        print("format\tsize_mb\tload_ms\tfirst_row_ms\tsingle_p50_ms\tbatch_rows/s")
+        scores = {}
+        for name, (path, load) in loaders.items():
+            model, load_s = _timed(load, path)
+            first = cast(pd.DataFrame, X_test.iloc[:1])
+            _, first_s = _timed(model.predict_proba, first)
+            single = []
+            for i in range(min(args.single_rows, len(X_test))):
+                row = cast(pd.DataFrame, X_test.iloc[i : i + 1])
+                single.append(_timed(model.predict_proba, row)[1])
+            proba, batch_s = _timed(model.predict_proba, X_test)
+            scores[name] = proba[:, 1]
+            print(
+                f"{name}\t{path.stat().st_size / 1e6:.1f}\t{load_s * 1e3:.1f}"
+                f"\t{first_s * 1e3:.2f}\t{np.median(single) * 1e3:.2f}"
+                f"\t{len(X_test) / batch_s:.0f}"
+            )
+    print(f"max_abs_diff={np.abs(scores['joblib'] - scores['forest']).max():.2e}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import cast
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset
+from rhgp.models.sweep import threshold_sweep
+from rhgp.models.train import build_pipeline, feature_columns, time_split
+from rhgp.models.train_hgb import build_hgb_pipeline, early_stopping_iterations
+from rhgp.models.train_rf import build_rf_pipeline
+
+# Fit time, batch and single-row predict latency, and artifact size of the trainers.
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark logreg / RF / HGB trainers.")
+    p.add_argument("--restaurants", type=int, default=20_000)
+    p.add_argument("--single-rows", type=int, default=200, help="Single-row predict calls.")
+    args = p.parse_args(argv)
+
+    raw = synthetic_raw(
+        n_restaurants=args.restaurants, start=date(2021, 1, 1), end=date(2025, 1, 1), seed=0
+    )
+    train, test, *_ = time_split(build_supervised_dataset(raw))
+    train = train.sort_values("inspection_date_t1", kind="stable", ignore_index=True)
+    X_train, y_train = train.loc[:, feature_columns()], train["y_t1"].astype(int)
+    X_test, y_test = test.loc[:, feature_columns()], test["y_t1"].astype(int).to_numpy()
+    print(f"train_rows={len(train)} test_rows={len(test)}")
+
+    hgb = build_hgb_pipeline()
+    t0 = time.perf_counter()
+    n_iter, _ = early_stopping_iterations(hgb, train)
+    t_early = time.perf_counter() - t0
+    hgb.set_params(clf__max_iter=n_iter)
+    models: dict[str, Pipeline] = {
+        "logreg": build_pipeline(),
+        "rf": build_rf_pipeline(),
+        "hgb": hgb,
+    }
+
+    print("model\tfit_s\tpredict_ms/1k\tsingle_p50_ms\tartifact_mb\tpr_auc")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, pipe in models.items():
+            t0 = time.perf_counter()
+            pipe.fit(X_train, y_train)
+            fit_s = time.perf_counter() - t0 + (t_early if name == "hgb" else 0.0)
+
+            t0 = time.perf_counter()
+            p_fail = pipe.predict_proba(X_test)[:, 1]
+            batch_ms = (time.perf_counter() - t0) * 1e3 / len(X_test) * 1e3
+
+            single = []
+            for i in range(min(args.single_rows, len(X_test))):
+                row = cast(pd.DataFrame, X_test.iloc[i : i + 1])
+                t0 = time.perf_counter()
+                pipe.predict_proba(row)
+                single.append(time.perf_counter() - t0)
+
+            path = Path(tmp) / f"{name}.joblib"
+            joblib.dump(pipe, path)
+            size_mb = path.stat().st_size / 1e6
+            pr_auc = threshold_sweep(y_test, p_fail).pr_auc() or 0.0
+            print(
+                f"{name}\t{fit_s:.2f}\t{batch_ms:.2f}\t{np.median(single) * 1e3:.2f}"
+                f"\t{size_mb:.2f}\t{pr_auc:.3f}"
+            )
+    print(f"hgb_iterations={n_iter} (early stopping {t_early:.2f}s, included in fit_s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
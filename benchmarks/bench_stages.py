@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import sklearn
+
+from rhgp.data.dataset import write_dataset
+from rhgp.data.synthetic import synthetic_raw_rows
+from rhgp.features.aggregate_inspections import aggregate_to_inspections
+from rhgp.features.build_examples import attach_labels
+from rhgp.features.features import add_history_features
+from rhgp.models import eval
+from rhgp.models.train import build_pipeline, feature_columns, time_split
+
+# Per-stage wall time and peak traced memory of the pipeline on a synthetic snapshot of
+# `--rows` violation rows, checked against a stored baseline. Runs offline.
+#
+#   python benchmarks/bench_stages.py --rows 1000000                    # check
+#   python benchmarks/bench_stages.py --rows 1000000 --update-baseline  # re-baseline
+#
+# Times are the best of `--repeat` runs; memory is the tracemalloc peak of one further run
+# (NumPy and pandas buffers are traced; Arrow's allocator is not). Baselines are per
+# machine and per row count, and record the interpreter, machine and library versions they
+# were taken with; checks in a different environment are flagged. Record them with the
+# project's Python (3.11): re-baseline after intended changes or on new hardware.
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+
+def _stages(rows: int, tmp: Path) -> list[tuple[str, Callable[[dict[str, Any]], Any]]]:
+    # Each stage reads its inputs from `ctx` and stores its output under its own name.
+    def train(ctx: dict[str, Any]) -> Any:
+        train_df = ctx["split"][0]
+        pipe = build_pipeline()
+        return pipe.fit(train_df.loc[:, feature_columns()], train_df["y_t1"].astype(int))
+
+    def evaluate(ctx: dict[str, Any]) -> Any:
+        # End to end as `make eval` runs it: read the split, score, sweep, baselines.
+        out = tmp / "reports"
+        argv = ["--data", str(tmp / "dataset"), "--model", str(tmp / "logreg.joblib")]
+        return eval.main([*argv, "--out-dir", str(out)])
+
+    return [
+        ("generate", lambda ctx: synthetic_raw_rows(rows, seed=0)),
+        ("aggregate", lambda ctx: aggregate_to_inspections(ctx["generate"])),
+        ("history", lambda ctx: add_history_features(ctx["aggregate"])),
+        ("labels", lambda ctx: attach_labels(ctx["history"])),
+        ("split", lambda ctx: time_split(ctx["labels"])),
+        ("train", train),
+        ("eval", evaluate),
+    ]
+
+
+def _prepare_eval(ctx: dict[str, Any], tmp: Path) -> None:
+    dataset = tmp / "dataset"
+    if not dataset.exists():
+        write_dataset(ctx["labels"], dataset)
+        joblib.dump(ctx["train"], tmp / "logreg.joblib")
+
+
+def run(rows: int, repeat: int, memory: bool) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as d:
+        tmp = Path(d)
+        stages = _stages(rows, tmp)
+        ctx: dict[str, Any] = {}
+        for name, fn in stages:
+            if name == "eval":
+                _prepare_eval(ctx, tmp)
+            best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                ctx[name] = fn(ctx)
+                best = min(best, time.perf_counter() - t0)
+            results[name] = {"seconds": round(best, 4)}
+            if memory:
+                tracemalloc.start()
+                fn(ctx)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results[name]["peak_mb"] = round(peak / 1e6, 2)
+    return results
+
+
+def environment() -> dict[str, str]:
+    return {
+        "python": ".".join(map(str, sys.version_info[:2])),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def environment_mismatches(stored: dict[str, Any], current: dict[str, str]) -> list[str]:
+    """Fields of the baseline's environment that differ from `current` (or were not stored)."""
+    return [
+        f"{k}: baseline {stored.get(k, 'unknown')}, now {v}"
+        for k, v in current.items()
+        if stored.get(k) != v
+    ]
+
+
+def regressions(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    time_tolerance: float,
+    memory_tolerance: float,
+    min_seconds: float,
+) -> list[str]:
+    """Stages slower or larger than the baseline by more than the tolerances."""
+    out = []
+    for name, got in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        t, bt = got["seconds"], base["seconds"]
+        if t > bt * (1 + time_tolerance) and t - bt > min_seconds:
+            out.append(f"{name}: {t:.3f}s vs baseline {bt:.3f}s (+{t / bt - 1:.0%})")
+        m, bm = got.get("peak_mb"), base.get("peak_mb")
+        if m is not None and bm is not None and m > bm * (1 + memory_tolerance):
+            out.append(f"{name}: {m:.1f} MB vs baseline {bm:.1f} MB (+{m / bm - 1:.0%})")
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark pipeline stages against a baseline.")
+    p.add_argument("--rows", type=int, default=1_000_000, help="Synthetic violation rows.")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    p.add_argument("--update-baseline", action="store_true")
+    p.add_argument("--time-tolerance", type=float, default=0.25, help="Allowed slowdown.")
+    p.add_argument("--memory-tolerance", type=float, default=0.10, help="Allowed growth.")
+    p.add_argument("--min-seconds", type=float, default=0.05, help="Ignore smaller slowdowns.")
+    p.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run.")
+    args = p.parse_args(argv)
+
+    results = run(args.rows, args.repeat, memory=not args.no_memory)
+    frame = pd.DataFrame(results).T
+    print(f"rows={args.rows}")
+    print(frame.round(3).to_string())
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    key = str(args.rows)
+    if args.update_baseline:
+        stored[key] = {**environment(), "stages": results}
+        args.baseline.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline for rows={key} written to {args.baseline}")
+        return 0
+    if key not in stored:
+        print(f"No baseline for rows={key} in {args.baseline}; run with --update-baseline.")
+        return 0
+    for line in environment_mismatches(stored[key], environment()):
+        print(f"ENVIRONMENT MISMATCH {line} (timings may not be comparable)")
+    found = regressions(
+        results,
+        stored[key]["stages"],
+        args.time_tolerance,
+        args.memory_tolerance,
+        args.min_seconds,
+    )
+    for line in found:
+        print(f"REGRESSION {line}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from datetime import date
+from typing import Any, cast
+
+import numpy as np
+import pandas as pd
+
+from rhgp.app.serve import FeatureState, ScoringService, make_server
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import attach_labels, to_inspections
+from rhgp.features.features import add_history_features
+from rhgp.models.train import build_pipeline, feature_columns
+
+# Local load test of the online scoring service: a model is trained on synthetic
+# inspections before a cutoff, the service is seeded with the state at the cutoff, and the
+# later inspections are replayed by concurrent clients (each owning a share of the
+# restaurants, so every restaurant's inspections arrive in date order).
+
+
+def _events(t: pd.DataFrame) -> list[dict[str, Any]]:
+    out = []
+    for rec in t.to_dict("records"):
+        rec = {k: None if pd.isna(v) else v for k, v in rec.items()}
+        rec["inspection_date_t"] = pd.Timestamp(rec["inspection_date_t"]).date().isoformat()
+        out.append(rec)
+    return out
+
+
+def _client(
+    host: str, port: int, events: list[dict[str, Any]], latencies: list[float]
+) -> None:
+    conn = http.client.HTTPConnection(host, port)
+    for event in events:
+        body = json.dumps({"inspections": [event]}, default=str)
+        t0 = time.perf_counter()
+        conn.request("POST", "/score", body, {"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        resp.read()
+        latencies.append(time.perf_counter() - t0)
+        if resp.status != 200:
+            raise RuntimeError(f"HTTP {resp.status} for {event}")
+    conn.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Load-test the online scoring service locally.")
+    p.add_argument("--restaurants", type=int, default=5_000)
+    p.add_argument("--clients", type=int, default=16)
+    p.add_argument("--max-requests", type=int, default=5_000)
+    p.add_argument("--max-batch", type=int, default=64)
+    p.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = p.parse_args(argv)
+
+    raw = synthetic_raw(
+        n_restaurants=args.restaurants, start=date(2021, 1, 1), end=date(2025, 1, 1), seed=0
+    )
+    t = to_inspections(raw)
+    cutoff = cast(pd.Timestamp, t["inspection_date_t"].quantile(0.8))
+    before = cast(pd.DataFrame, t[t["inspection_date_t"] < cutoff])
+    train = attach_labels(add_history_features(before))
+    model = build_pipeline().fit(train.loc[:, feature_columns()], train["y_t1"].astype(int))
+
+    later = t[t["inspection_date_t"] >= cutoff].sort_values("inspection_date_t", kind="stable")
+    later = cast(pd.DataFrame, later.head(args.max_requests))
+    shares: list[list[dict[str, Any]]] = [[] for _ in range(args.clients)]
+    for event in _events(later):
+        shares[event["camis"] % args.clients].append(event)
+
+    service = ScoringService(
+        model, FeatureState.from_inspections(before), args.max_batch, args.max_wait_ms
+    )
+    server = make_server(service, "127.0.0.1", 0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    latencies: list[list[float]] = [[] for _ in shares]
+    clients = [
+        threading.Thread(target=_client, args=("127.0.0.1", port, share, lat))
+        for share, lat in zip(shares, latencies, strict=True)
+    ]
+    t0 = time.perf_counter()
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    seconds = time.perf_counter() - t0
+    stats = service.stats.snapshot()
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+    lat = np.concatenate([np.array(x) for x in latencies]) * 1e3
+    print(f"requests={len(lat)} clients={args.clients} seconds={seconds:.2f}")
+    print(
+        f"client p50_ms={np.percentile(lat, 50):.2f} p99_ms={np.percentile(lat, 99):.2f}"
+        f" requests/s={len(lat) / seconds:.0f}"
+    )
+    print(
+        f"server p50_ms={stats['p50_ms']:.2f} p99_ms={stats['p99_ms']:.2f}"
+        f" batches={stats['batches']} mean_batch={stats['mean_batch']:.1f}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
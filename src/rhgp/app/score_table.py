@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from rhgp.data.schema import read_raw
+from rhgp.features.build_examples import to_inspections
+from rhgp.features.features import add_history_features
+from rhgp.features.state import STATE_COLUMNS
+from rhgp.models.forest import load_model
+from rhgp.models.train import feature_columns
+
+# Precomputed scores for the app: every inspection with its history features and `p_fail`
+# (the next grade's fail probability), sorted by (`camis`, date) and written as an
+# uncompressed Arrow IPC file. Opening it memory-maps the file; a lookup is a binary search
+# over the distinct `camis` values and a zero-copy slice of that restaurant's rows.
+
+TABLE_COLUMNS = STATE_COLUMNS + [c for c in feature_columns() if c not in STATE_COLUMNS]
+
+
+def build_score_table(inspections_t: pd.DataFrame, model: Any) -> pa.Table:
+    df = add_history_features(inspections_t)
+    df = df.sort_values(["camis", "inspection_date_t"], kind="mergesort", ignore_index=True)
+    out = cast(pd.DataFrame, df.loc[:, TABLE_COLUMNS])
+    out["p_fail"] = model.predict_proba(df.loc[:, feature_columns()])[:, 1]
+    return pa.Table.from_pandas(out, preserve_index=False)
+
+
+def write_score_table(table: pa.Table, path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    tmp.replace(path)
+    return path
+
+
+@dataclass
+class RestaurantScores:
+    camis: int
+    latest: dict[str, Any]
+    p_fail: float
+    history: pd.DataFrame
+
+
+class ScoreTable:
+    """A memory-mapped score table with a sorted `camis` index, built once per process."""
+
+    def __init__(self, table: pa.Table) -> None:
+        self.table = table
+        camis = table.column("camis").to_numpy()
+        starts = np.flatnonzero(np.concatenate([[len(camis) > 0], camis[1:] != camis[:-1]]))
+        self.keys = camis[starts]
+        self.starts = starts
+        self.ends = np.append(starts[1:], len(camis))
+
+    @classmethod
+    def open(cls, path: Path) -> ScoreTable:
+        return cls(pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all())
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, camis: int) -> RestaurantScores | None:
+        i = int(np.searchsorted(self.keys, camis))
+        if i == len(self.keys) or self.keys[i] != camis:
+            return None
+        lo, hi = int(self.starts[i]), int(self.ends[i])
+        history = self.table.slice(lo, hi - lo).to_pandas()
+        latest = history.iloc[-1].to_dict()
+        return RestaurantScores(int(camis), latest, float(latest["p_fail"]), history)
+
+    def riskiest(self, n: int = 20) -> pd.DataFrame:
+        """Latest inspection of the `n` restaurants with the highest `p_fail`."""
+        last = self.ends - 1
+        p_fail = self.table.column("p_fail").to_numpy()[last]
+        top = last[np.argsort(-p_fail, kind="stable")[:n]]
+        return self.table.take(pa.array(top)).to_pandas()
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Precompute the app's score table.")
+    p.add_argument("--in", dest="in_path", type=Path, required=True, help="Raw snapshot.")
+    p.add_argument("--model", type=Path, required=True)
+    p.add_argument("--out", type=Path, required=True)
+    args = p.parse_args(argv)
+
+    table = build_score_table(to_inspections(read_raw(args.in_path)), load_model(args.model))
+    write_score_table(table, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
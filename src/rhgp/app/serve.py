@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+import pandas as pd
+
+from rhgp.data.schema import normalize_grade
+from rhgp.features.features import DEFAULT_HISTORY, HistoryConfig, lag_name
+from rhgp.features.state import STATE_COLUMNS, read_state, retained_state
+from rhgp.models.forest import load_model
+from rhgp.models.train import feature_columns
+
+# Online scoring: a local HTTP service that keeps each restaurant's recent inspections in
+# memory, so the history features of a newly landed inspection cost a look at a few stored
+# rows instead of a dataset rebuild. Requests are queued and scored in micro-batches by a
+# single thread, which also owns the feature state (no locks, and updates apply in arrival
+# order).
+#
+#   POST /score   {"inspections": [{"camis": ..., "inspection_date_t": "YYYY-MM-DD", ...}]}
+#   GET  /stats   latency percentiles, throughput and batch sizes
+#   GET  /health
+
+# Restaurant -> its rows updated with a batch's inspections, applied by `FeatureState.commit`.
+Staged = dict[int, deque[dict[str, Any]]]
+
+
+class StaleInspectionError(ValueError):
+    pass
+
+
+def parse_inspection(event: dict[str, Any]) -> dict[str, Any]:
+    """
+    One inspection-level event (the `STATE_COLUMNS` fields) in the types of
+    `to_inspections`: dates as day timestamps, float32 scores, normalized grades.
+    """
+    missing = [c for c in ("camis", "inspection_date_t") if event.get(c) is None]
+    if missing:
+        raise ValueError(f"Missing fields: {missing}")
+    day = cast(pd.Timestamp, pd.Timestamp(event["inspection_date_t"])).normalize()
+    score = event.get("score_t")
+    inspection_type = event.get("inspection_type")
+    return {
+        "camis": int(event["camis"]),
+        "inspection_date_t": day,
+        "inspection_type": str(inspection_type) if inspection_type is not None else np.nan,
+        "grade_t": normalize_grade(event.get("grade_t")) or np.nan,
+        "score_t": float(np.float32(score)) if score is not None else np.nan,
+        "n_violations_t": int(event.get("n_violations_t") or 0),
+        "n_critical_violations_t": int(event.get("n_critical_violations_t") or 0),
+    }
+
+
+def _mean(values: Iterable[float]) -> float:
+    present = [v for v in values if not math.isnan(v)]
+    return sum(present) / len(present) if present else np.nan
+
+
+class FeatureState:
+    """
+    Per-`camis` recent inspections: the last `max(windows)` plus those inside the longest
+    day window, which is all `add_history_features` reads for a restaurant's next
+    inspection. Adding an inspection and computing its features is O(1) in the length of
+    the restaurant's history.
+    """
+
+    def __init__(self, history: HistoryConfig = DEFAULT_HISTORY) -> None:
+        self.history = history
+        self._keep = max([1, *history.windows])
+        self._horizon = pd.Timedelta(days=max(history.day_windows, default=0))
+        self._rows: dict[int, deque[dict[str, Any]]] = {}
+
+    @classmethod
+    def from_inspections(
+        cls, inspections_t: pd.DataFrame, history: HistoryConfig = DEFAULT_HISTORY
+    ) -> FeatureState:
+        """Seed from inspection-level rows, e.g. a `rhgp.features.state` file."""
+        state = cls(history)
+        rows = retained_state(inspections_t, history) if len(inspections_t) else inspections_t
+        for rec in cast(pd.DataFrame, rows.loc[:, STATE_COLUMNS]).to_dict("records"):
+            state._append({k: np.nan if pd.isna(v) else v for k, v in rec.items()})
+        return state
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _history(self, camis: int, staged: Staged | None = None) -> deque[dict[str, Any]]:
+        if staged is not None and camis in staged:
+            return staged[camis]
+        return self._rows.get(camis, deque())
+
+    def latest(self, camis: int, staged: Staged | None = None) -> pd.Timestamp | None:
+        rows = self._history(camis, staged)
+        return rows[-1]["inspection_date_t"] if rows else None
+
+    def check(self, inspections: list[dict[str, Any]], staged: Staged | None = None) -> None:
+        # Like incremental builds, inspections must arrive in date order per restaurant.
+        latest: dict[int, pd.Timestamp | None] = {}
+        for insp in inspections:
+            camis = insp["camis"]
+            last = latest[camis] if camis in latest else self.latest(camis, staged)
+            if last is not None and insp["inspection_date_t"] <= last:
+                raise StaleInspectionError(
+                    f"camis {camis}: inspection {insp['inspection_date_t'].date()} is not "
+                    f"after the latest stored one ({last.date()})"
+                )
+            latest[camis] = insp["inspection_date_t"]
+
+    def stage(self, inspections: list[dict[str, Any]], staged: Staged) -> list[dict[str, Any]]:
+        """
+        Features of `inspections`, in order, each seeing the earlier ones of its restaurant.
+        They are recorded in copies of the restaurants' rows in `staged`, not in the state,
+        until `commit(staged)`.
+        """
+        out = []
+        for insp in inspections:
+            camis = insp["camis"]
+            if camis not in staged:
+                staged[camis] = deque(self._rows.get(camis, ()))
+            out.append(self.features(insp, staged))
+            self._push(staged[camis], insp)
+        return out
+
+    def commit(self, staged: Staged) -> None:
+        self._rows.update(staged)
+
+    def features(self, insp: dict[str, Any], staged: Staged | None = None) -> dict[str, Any]:
+        """Features of `insp` from the stored (or staged) history; records nothing."""
+        prior = self._history(insp["camis"], staged)
+        out = dict(insp)
+        prev = prior[-1] if prior else None
+        for col in self.history.lag_columns:
+            out[lag_name(col)] = prev[col] if prev is not None else np.nan
+        rows = list(prior)
+        for w in self.history.windows:
+            for col in self.history.mean_columns:
+                out[f"{col}_mean_prev{w}"] = _mean(r[col] for r in rows[-w:])
+        for d in self.history.day_windows:
+            since = insp["inspection_date_t"] - pd.Timedelta(days=d)
+            window = [r for r in rows if r["inspection_date_t"] > since]
+            for col in self.history.mean_columns:
+                out[f"{col}_mean_prev{d}d"] = _mean(r[col] for r in window)
+            out[f"n_inspections_prev{d}d"] = len(window)
+        return out
+
+    def _append(self, insp: dict[str, Any]) -> None:
+        self._push(self._rows.setdefault(insp["camis"], deque()), insp)
+
+    def _push(self, rows: deque[dict[str, Any]], insp: dict[str, Any]) -> None:
+        rows.append({c: insp[c] for c in STATE_COLUMNS})
+        # Later inspections are newer, so rows past the horizon never re-enter a window.
+        oldest = insp["inspection_date_t"] - self._horizon
+        while len(rows) > self._keep and rows[0]["inspection_date_t"] <= oldest:
+            rows.popleft()
+
+
+class LatencyStats:
+    def __init__(self, window: int = 100_000) -> None:
+        self.started = time.perf_counter()
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.inspections = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def record_request(self, seconds: float) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+            self.requests += 1
+
+    def record_batch(self, n_inspections: int) -> None:
+        with self._lock:
+            self.batches += 1
+            self.inspections += n_inspections
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            lat = np.array(self.latencies) * 1e3
+            uptime = time.perf_counter() - self.started
+            return {
+                "requests": self.requests,
+                "inspections": self.inspections,
+                "batches": self.batches,
+                "mean_batch": self.inspections / self.batches if self.batches else 0.0,
+                "p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+                "p99_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+                "requests_per_s": self.requests / uptime if uptime > 0 else 0.0,
+                "uptime_s": uptime,
+            }
+
+
+@dataclass
+class _Pending:
+    inspections: list[dict[str, Any]]
+    future: Future[list[float]]
+
+
+class MicroBatcher:
+    """
+    Collects queued requests for up to `max_wait_ms` after the first one (or until
+    `max_batch` inspections) and scores them with one `predict_proba` call.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        state: FeatureState,
+        stats: LatencyStats,
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+    ) -> None:
+        self.model = model
+        self.state = state
+        self.stats = stats
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1e3
+        self._queue: queue.Queue[_Pending | None] = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, inspections: list[dict[str, Any]]) -> Future[list[float]]:
+        future: Future[list[float]] = Future()
+        self._queue.put(_Pending(inspections, future))
+        return future
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first: _Pending) -> tuple[list[_Pending], bool]:
+        batch, size = [first], len(first.inspections)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.perf_counter(), 0.0))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            size += len(item.inspections)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+            self._score(batch)
+
+    def _score(self, batch: list[_Pending]) -> None:
+        # The batch's inspections are staged and only committed to the state once scored, so
+        # a failed batch can be retried as is.
+        rows: list[dict[str, Any]] = []
+        accepted: list[tuple[_Pending, int, int]] = []
+        staged: Staged = {}
+        for item in batch:
+            try:
+                self.state.check(item.inspections, staged)
+            except ValueError as e:
+                item.future.set_exception(e)
+                continue
+            lo = len(rows)
+            rows.extend(self.state.stage(item.inspections, staged))
+            accepted.append((item, lo, len(rows)))
+        if not rows:
+            for item, _, _ in accepted:
+                item.future.set_result([])
+            return
+        try:
+            X = pd.DataFrame({c: [r[c] for r in rows] for c in feature_columns()})
+            p_fail = self.model.predict_proba(X)[:, 1].tolist()
+        except Exception as e:
+            # Surfaced to every request in the batch rather than killing the thread.
+            for item, _, _ in accepted:
+                item.future.set_exception(e)
+            return
+        self.state.commit(staged)
+        self.stats.record_batch(len(rows))
+        for item, lo, hi in accepted:
+            item.future.set_result(p_fail[lo:hi])
+
+
+class ScoringService:
+    def __init__(
+        self, model: Any, state: FeatureState, max_batch: int = 64, max_wait_ms: float = 2.0
+    ) -> None:
+        self.state = state
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(model, state, self.stats, max_batch, max_wait_ms)
+
+    def score(self, events: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return self.score_inspections([parse_inspection(e) for e in events])
+
+    def score_inspections(self, inspections: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        p_fail = self.batcher.submit(inspections).result()
+        return [
+            {
+                "camis": insp["camis"],
+                "inspection_date_t": insp["inspection_date_t"].date().isoformat(),
+                "p_fail": p,
+            }
+            for insp, p in zip(inspections, p_fail, strict=True)
+        ]
+
+    def close(self) -> None:
+        self.batcher.close()
+
+
+def _handler(service: ScoringService) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out as separate writes; without TCP_NODELAY the body waits
+        # for the client's delayed ACK (~40 ms) on keep-alive connections.
+        disable_nagle_algorithm = True
+
+        def _send(self, status: int, body: dict[str, Any]) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "restaurants": len(service.state)})
+            elif self.path == "/stats":
+                self._send(200, service.stats.snapshot())
+            else:
+                self._send(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self) -> None:
+            t0 = time.perf_counter()
+            if self.path != "/score":
+                self._send(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                events = body["inspections"] if "inspections" in body else [body]
+                inspections = [parse_inspection(e) for e in events]
+            except (ValueError, KeyError, TypeError) as e:
+                self._send(400, {"error": str(e)})
+                return
+            try:
+                scores = service.score_inspections(inspections)
+            except StaleInspectionError as e:
+                self._send(409, {"error": str(e)})
+                return
+            except Exception as e:
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            self._send(200, {"scores": scores})
+            service.stats.record_request(time.perf_counter() - t0)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def make_server(service: ScoringService, host: str = "127.0.0.1", port: int = 8000) -> Any:
+    """A threading HTTP server for `service`; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), _handler(service))
+    server.daemon_threads = True
+    return server
+
+
+def load_service(
+    model_path: Path, state_path: Path | None, max_batch: int = 64, max_wait_ms: float = 2.0
+) -> ScoringService:
+    """
+    The model (joblib pipeline or `.forest`) and, if given, the per-restaurant state written
+    by `build_examples --state`, whose history config the features follow.
+    """
+    if state_path is None:
+        state = FeatureState()
+    else:
+        rows, meta = read_state(state_path)
+        history = HistoryConfig(
+            windows=tuple(meta["windows"]), day_windows=tuple(meta["day_windows"])
+        )
+        state = FeatureState.from_inspections(rows, history)
+    return ScoringService(load_model(model_path), state, max_batch, max_wait_ms)
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Serve online scores for new inspections.")
+    p.add_argument("--model", type=Path, required=True)
+    p.add_argument("--state", type=Path, default=None, help="build_examples --state file.")
+    p.add_argument("--host", type=str, default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--max-batch", type=int, default=64, help="Inspections per predict call.")
+    p.add_argument("--max-wait-ms", type=float, default=2.0, help="Batching delay.")
+    args = p.parse_args(argv)
+
+    service = load_service(args.model, args.state, args.max_batch, args.max_wait_ms)
+    server = make_server(service, args.host, args.port)
+    port = server.server_address[1]
+    print(f"Serving on http://{args.host}:{port} ({len(service.state)} restaurants)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import shutil
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Processed (supervised) datasets are hive-partitioned by the year-month of the label date,
+# `<root>/t1_month=YYYY-MM/part-0.parquet`, so a time split only opens the months it needs.
+# The key sorts chronologically as a string and is not a feature (it is derived from t+1).
+
+PARTITION_COLUMN = "t1_month"
+_PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+
+
+def month_key(ts: pd.Timestamp) -> str:
+    return ts.strftime("%Y-%m")
+
+
+def write_fragments(df: pd.DataFrame, root: Path, name: str = "part") -> None:
+    """
+    Add `df` to the partitioned dataset at `root` as `t1_month=.../<name>-{i}.parquet` files.
+
+    Files with other names are left alone, so independent writers (e.g. shards) can fill the
+    same dataset. Rows keep their order within each month.
+    """
+    if df.empty:
+        return
+    t1 = pd.to_datetime(df["inspection_date_t1"])
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.append_column(PARTITION_COLUMN, pa.array(t1.dt.strftime("%Y-%m")))
+    # Arrow sorts are stable, so every partition keeps the builder's row order.
+    table = table.sort_by([(PARTITION_COLUMN, "ascending")])
+    ds.write_dataset(
+        table,
+        root,
+        format="parquet",
+        partitioning=_PARTITIONING,
+        basename_template=name + "-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        use_threads=False,
+    )
+
+
+def staging_path(root: Path) -> Path:
+    tmp = root.with_name(root.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    return tmp
+
+
+def replace_dataset(staged: Path, root: Path) -> None:
+    if root.is_dir():
+        shutil.rmtree(root)
+    elif root.exists():
+        root.unlink()
+    staged.mkdir(parents=True, exist_ok=True)
+    staged.replace(root)
+
+
+def write_dataset(df: pd.DataFrame, root: Path) -> None:
+    """Replace `root` with `df` partitioned by `t1_month` (rows keep their order per month)."""
+    tmp = staging_path(root)
+    write_fragments(df, tmp)
+    replace_dataset(tmp, root)
+
+
+def partition_dir(root: Path, key: str) -> Path:
+    return root / f"{PARTITION_COLUMN}={key}"
+
+
+def replace_partitions(parts: dict[str, pd.DataFrame], root: Path) -> None:
+    """
+    Replace whole `t1_month` partitions of a `write_dataset` dataset with new contents (an
+    empty frame clears the month); other months are not touched.
+
+    Each month is one file swapped in by a rename, so an interrupted call leaves every
+    month either old or new.
+    """
+    paths = {key: partition_dir(root, key) / "part-0.parquet" for key in parts}
+    for path in paths.values():
+        others = [f for f in path.parent.glob("*.parquet") if f.name != path.name]
+        if others:
+            raise ValueError(f"{path.parent} holds several files; rebuild the dataset in full")
+    for key, df in parts.items():
+        path = paths[key]
+        if df.empty:
+            path.unlink(missing_ok=True)
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Hidden until renamed: dataset discovery skips dot-files.
+        tmp = path.with_name(f".{path.name}.tmp")
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp)
+        tmp.replace(path)
+
+
+def open_dataset(path: Path) -> ds.Dataset:
+    if path.is_dir():
+        return ds.dataset(path, format="parquet", partitioning=_PARTITIONING)
+    return ds.dataset(path, format="parquet")
+
+
+def date_filter(column: str, op: str, value: pd.Timestamp, path: Path) -> ds.Expression:
+    """
+    `column <op> value` on a timestamp column, plus the matching partition-key bound when
+    filtering `inspection_date_t1` of a partitioned dataset (which prunes whole months).
+    """
+    field = ds.field(column)
+    scalar = pa.scalar(value.to_pydatetime())
+    expr = {"<": field < scalar, "<=": field <= scalar, ">=": field >= scalar, ">": field > scalar}
+    out = expr[op]
+    if column == "inspection_date_t1" and path.is_dir():
+        key = ds.field(PARTITION_COLUMN)
+        out &= key <= month_key(value) if op in {"<", "<="} else key >= month_key(value)
+    return out
+
+
+def dataset_files(path: Path, filter: ds.Expression | None = None) -> list[str]:
+    # Files a scan with `filter` opens (all of them for a single-file dataset).
+    return [f.path for f in cast(Any, open_dataset(path)).get_fragments(filter=filter)]
+
+
+def read_dataset(
+    path: Path, columns: list[str] | None = None, filter: ds.Expression | None = None
+) -> pd.DataFrame:
+    """
+    Read a processed dataset written by `write_dataset` (or a legacy single parquet file).
+
+    Only `columns` are decoded, and partitions/row groups excluded by `filter` are skipped.
+    The partition key is dropped unless requested.
+    """
+    dataset = open_dataset(path)
+    if columns is None:
+        columns = [c for c in dataset.schema.names if c != PARTITION_COLUMN]
+    table = dataset.to_table(columns=columns, filter=filter)
+    return table.to_pandas()
+
+
+def iter_batches(
+    path: Path,
+    columns: list[str],
+    filter: ds.Expression | None = None,
+    batch_rows: int = 100_000,
+    seed: int | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream `columns` of a processed dataset as frames of at most `batch_rows` rows.
+
+    Files are visited in order, or in a `seed`-shuffled order, one batch in memory at a time.
+    """
+    dataset = cast(Any, open_dataset(path))
+    fragments = list(dataset.get_fragments(filter=filter))
+    if seed is not None:
+        order = np.random.default_rng(seed).permutation(len(fragments))
+        fragments = [fragments[i] for i in order]
+    for fragment in fragments:
+        # The dataset schema lets filters see the partition key of each file.
+        for batch in fragment.to_batches(
+            schema=dataset.schema,
+            columns=columns,
+            filter=filter,
+            batch_size=batch_rows,
+            use_threads=False,
+        ):
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+
+def dataset_fingerprint(path: Path) -> dict[str, object]:
+    # Cheap identity of a dataset on disk (file or partitioned directory) for run metadata.
+    if not path.exists():
+        return {"path": str(path), "exists": False}
+    files = sorted(path.rglob("*.parquet")) if path.is_dir() else [path]
+    stats = [f.stat() for f in files]
+    mtime = max((s.st_mtime for s in stats), default=0)
+    return {
+        "path": str(path),
+        "exists": True,
+        "files": len(stats),
+        "size_bytes": sum(int(s.st_size) for s in stats),
+        # Naive ISO time plus "Z": design cache keys embed this exact string.
+        "mtime_utc": datetime.fromtimestamp(mtime, tz=UTC).replace(tzinfo=None).isoformat() + "Z",
+    }
@@ -1,18 +1,35 @@
 from __future__ import annotations
 
 import argparse
+import json
 import os
-from dataclasses import dataclass
-from datetime import date, datetime
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from datetime import UTC, date, datetime, timedelta
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, cast
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-from rhgp.data.schema import desired_columns, required_columns
+from rhgp.data.http_cache import CachingAdapter, ResponseCache
+from rhgp.data.schema import (
+    COLS,
+    apply_raw_schema,
+    desired_columns,
+    raw_arrow_schema,
+    read_raw,
+    required_columns,
+)
+from rhgp.perf import PerfRecorder, add_profile_argument
 
 DATASET_ID = "43nn-pn8j"
 BASE_URL = f"https://data.cityofnewyork.us/resource/{DATASET_ID}.json"
@@ -23,6 +40,21 @@ META_URL = f"https://data.cityofnewyork.us/api/views/{DATASET_ID}.json"
 class FetchConfig:
     since_date: date
     limit: int = 50_000
+    base_url: str = BASE_URL
+    meta_url: str = META_URL
+    # Exclusive upper bound; None leaves the range open-ended.
+    until_date: date | None = None
+    # workers > 1 splits the range into disjoint date windows fetched concurrently.
+    workers: int = 1
+    window_days: int = 30
+    # Ask Socrata to reduce violations to one row per (camis, inspection_date).
+    server_aggregate: bool = False
+
+
+@dataclass(frozen=True)
+class Watermark:
+    max_inspection_date: date
+    rows: int
 
 
 def _since_years_to_date(since_years: int) -> date:
@@ -30,35 +62,98 @@ def _since_years_to_date(since_years: int) -> date:
     return date(today.year - since_years, today.month, today.day)
 
 
-def build_params(cfg: FetchConfig, offset: int) -> dict[str, Any]:
-    cols = desired_columns()
+def inspection_level_select(cols: list[str]) -> list[str]:
+    # Server-side equivalent of `aggregate_to_inspections`. Type/grade/score are constant
+    # within an inspection, so min() stands in for the client-side "first".
+    select = [COLS.camis, COLS.inspection_date]
+    for c in [COLS.inspection_type, COLS.grade, COLS.score]:
+        if c in cols:
+            select.append(f"min({c}) AS {c}")
+    counted = COLS.violation_code if COLS.violation_code in cols else "*"
+    select.append(f"count({counted}) AS n_violations_t")
+    if COLS.critical_flag in cols:
+        select.append(
+            f"sum(case(upper({COLS.critical_flag}) = 'CRITICAL', 1, true, 0))"
+            " AS n_critical_violations_t"
+        )
+    return select
+
+
+def output_columns(cfg: FetchConfig, cols: list[str]) -> list[str]:
+    if not cfg.server_aggregate:
+        return cols
+    return [item.rsplit(" AS ", 1)[-1] for item in inspection_level_select(cols)]
+
+
+def build_params(cfg: FetchConfig, offset: int, cols: list[str] | None = None) -> dict[str, Any]:
+    cols = cols or desired_columns()
+    where = f"inspection_date >= '{cfg.since_date.isoformat()}'"
+    if cfg.until_date is not None:
+        where += f" AND inspection_date < '{cfg.until_date.isoformat()}'"
     # Socrata supports SoQL with $select/$where/$order, and pagination via $limit/$offset.
-    return {
+    # $offset paging is only stable under a unique order: rows tied on the order keys may
+    # move between pages, so the row id (`:id`) breaks ties between violations.
+    params: dict[str, Any] = {
         "$select": ", ".join(cols),
-        "$where": f"inspection_date >= '{cfg.since_date.isoformat()}'",
-        "$order": "inspection_date ASC",
+        "$where": where,
+        "$order": f"{COLS.inspection_date} ASC, {COLS.camis} ASC, :id",
         "$limit": cfg.limit,
         "$offset": offset,
     }
+    if cfg.server_aggregate:
+        params["$select"] = ", ".join(inspection_level_select(cols))
+        params["$group"] = f"{COLS.camis}, {COLS.inspection_date}"
+        params["$order"] = f"{COLS.inspection_date} ASC, {COLS.camis} ASC"
+    return params
+
+
+def date_windows(start: date, end: date | None, days: int) -> list[tuple[date, date | None]]:
+    # Disjoint [lo, hi) windows covering [start, end); the last one stays open when end is None.
+    if days < 1:
+        raise ValueError(f"window_days must be >= 1, got {days}")
+    stop = end or date.today() + timedelta(days=1)
+    windows: list[tuple[date, date | None]] = []
+    lo = start
+    while lo < stop:
+        hi = min(lo + timedelta(days=days), stop)
+        windows.append((lo, hi))
+        lo = hi
+    if not windows:
+        windows.append((start, end))
+    elif end is None:
+        windows[-1] = (windows[-1][0], None)
+    return windows
 
 
-def _build_session() -> requests.Session:
+def _build_session(
+    pool_maxsize: int = 10, cache: ResponseCache | None = None
+) -> requests.Session:
     sess = requests.Session()
+    # Throttled (429) and server errors are retried. urllib3 sleeps for the response's
+    # Retry-After when present, otherwise for an exponential backoff.
     retry = Retry(
         total=5,
         backoff_factor=0.5,
         status_forcelist=[429, 500, 502, 503, 504],
         allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+    pool = max(pool_maxsize, 10)
+    adapter = (
+        CachingAdapter(cache, max_retries=retry, pool_maxsize=pool)
+        if cache is not None
+        else HTTPAdapter(max_retries=retry, pool_maxsize=pool)
     )
-    adapter = HTTPAdapter(max_retries=retry)
     sess.mount("https://", adapter)
     sess.mount("http://", adapter)
     return sess
 
 
-def fetch_available_columns(session: requests.Session | None = None) -> set[str]:
+def fetch_available_columns(
+    session: requests.Session | None = None, meta_url: str = META_URL
+) -> set[str]:
     sess = session or _build_session()
-    resp = sess.get(META_URL, timeout=60)
+    resp = sess.get(meta_url, timeout=60)
     resp.raise_for_status()
     payload = resp.json()
     cols = payload.get("columns", [])
@@ -70,13 +165,68 @@ def fetch_available_columns(session: requests.Session | None = None) -> set[str]
     return out
 
 
-def fetch_all(cfg: FetchConfig, session: requests.Session | None = None) -> pd.DataFrame:
-    sess = session or _build_session()
+def _iter_window_pages(
+    sess: requests.Session, cfg: FetchConfig, cols: list[str]
+) -> Iterator[list[dict[str, Any]]]:
+    offset = 0
+    while True:
+        params = build_params(cfg, offset=offset, cols=cols)
+        resp = sess.get(cfg.base_url, params=params, timeout=60)
+        resp.raise_for_status()
+        batch = resp.json()
+        if not isinstance(batch, list):
+            raise TypeError(f"Expected list JSON; got {type(batch)}")
+        if not batch:
+            break
+        yield batch
+        offset += cfg.limit
+        if len(batch) < cfg.limit:
+            break
+
+
+def _fetch_window(
+    sess: requests.Session, cfg: FetchConfig, cols: list[str]
+) -> list[dict[str, Any]]:
+    return [r for page in _iter_window_pages(sess, cfg, cols) for r in page]
+
+
+def iter_pages(
+    cfg: FetchConfig, sess: requests.Session, cols: list[str]
+) -> Iterator[list[dict[str, Any]]]:
+    if cfg.workers <= 1:
+        yield from _iter_window_pages(sess, cfg, cols)
+        return
+
+    # Windows are disjoint and ordered, so yielding them in order reproduces the serial
+    # `inspection_date ASC` result while keeping every $offset small. At most `workers`
+    # windows are in flight, which bounds memory when the consumer streams.
+    windows = iter(
+        replace(cfg, since_date=lo, until_date=hi)
+        for lo, hi in date_windows(cfg.since_date, cfg.until_date, cfg.window_days)
+    )
+    with ThreadPoolExecutor(max_workers=cfg.workers) as pool:
+        pending: deque[Future[list[dict[str, Any]]]] = deque(
+            pool.submit(_fetch_window, sess, w, cols) for w in islice(windows, cfg.workers)
+        )
+        while pending:
+            rows = pending.popleft().result()
+            nxt = next(windows, None)
+            if nxt is not None:
+                pending.append(pool.submit(_fetch_window, sess, nxt, cols))
+            if rows:
+                yield rows
+
+
+def _open_session(cfg: FetchConfig, session: requests.Session | None) -> requests.Session:
+    sess = session or _build_session(pool_maxsize=cfg.workers)
     token = os.getenv("SOCRATA_APP_TOKEN")
     if token:
         sess.headers.update({"X-App-Token": token})
+    return sess
+
 
-    available = fetch_available_columns(sess)
+def _resolve_columns(sess: requests.Session, cfg: FetchConfig) -> list[str]:
+    available = fetch_available_columns(sess, meta_url=cfg.meta_url)
     missing_required = set(required_columns()) - available
     if missing_required:
         raise RuntimeError(f"Dataset missing required columns: {sorted(missing_required)}")
@@ -84,51 +234,307 @@ def fetch_all(cfg: FetchConfig, session: requests.Session | None = None) -> pd.D
     cols = [c for c in desired_columns() if c in available]
     if not cols:
         raise RuntimeError("No desired columns available to fetch")
+    return cols
 
-    rows: list[dict[str, Any]] = []
-    offset = 0
-    while True:
-        params = build_params(cfg, offset=offset)
-        params["$select"] = ", ".join(cols)
-        resp = sess.get(BASE_URL, params=params, timeout=60)
-        resp.raise_for_status()
-        batch = resp.json()
-        if not isinstance(batch, list):
-            raise TypeError(f"Expected list JSON; got {type(batch)}")
-        if not batch:
-            break
-        rows.extend(batch)
-        offset += cfg.limit
-        if len(batch) < cfg.limit:
-            break
 
-    df = pd.DataFrame.from_records(rows)
-    if "inspection_date" in df.columns:
-        df["inspection_date"] = pd.to_datetime(df["inspection_date"], errors="coerce").dt.date
-    return df
+def fetch_all(cfg: FetchConfig, session: requests.Session | None = None) -> pd.DataFrame:
+    sess = _open_session(cfg, session)
+    cols = _resolve_columns(sess, cfg)
+    rows = [r for page in iter_pages(cfg, sess, cols) for r in page]
+    return _rows_to_frame(rows, output_columns(cfg, cols))
+
+
+def page_to_record_batch(page: list[dict[str, Any]], schema: pa.Schema) -> pa.RecordBatch:
+    arrays: list[pa.Array] = []
+    for field in schema:
+        values = pa.array([r.get(field.name) for r in page], type=pa.string())
+        if field.name == "inspection_date":
+            # Socrata floating timestamps ("2024-01-31T00:00:00.000"); unparseable -> null.
+            day = pc.call_function(
+                "utf8_slice_codeunits", [values], pc.SliceOptions(start=0, stop=10)
+            )
+            ts = pc.call_function(
+                "strptime",
+                [day],
+                pc.StrptimeOptions(format="%Y-%m-%d", unit="s", error_is_null=True),
+            )
+            values = ts.cast(pa.date32())
+        arrays.append(values.cast(field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def fetch_to_parquet(
+    cfg: FetchConfig, out: Path, session: requests.Session | None = None
+) -> tuple[int, date | None]:
+    """
+    Stream pages straight into a parquet file, one row group per page.
+
+    Peak memory is bounded by a page (or `workers` in-flight windows) instead of the whole
+    snapshot. Returns the row count and max `inspection_date` for the snapshot metadata.
+    """
+    sess = _open_session(cfg, session)
+    cols = _resolve_columns(sess, cfg)
+    schema = raw_arrow_schema(output_columns(cfg, cols))
+
+    rows = 0
+    max_date: date | None = None
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    with pq.ParquetWriter(tmp, schema) as writer:
+        for page in iter_pages(cfg, sess, cols):
+            batch = page_to_record_batch(page, schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+            if "inspection_date" in schema.names:
+                page_max = pc.call_function("max", [batch.column("inspection_date")]).as_py()
+                if page_max is not None and (max_date is None or page_max > max_date):
+                    max_date = page_max
+    tmp.replace(out)
+    return rows, max_date
+
+
+def _rows_to_frame(rows: list[dict[str, Any]], cols: list[str]) -> pd.DataFrame:
+    # Socrata omits null fields, so pin the column set to keep snapshot partitions aligned.
+    df = pd.DataFrame.from_records(rows).reindex(columns=cols)
+    return apply_raw_schema(df)
+
+
+def meta_path_for(out: Path) -> Path:
+    return out.with_suffix(".meta.json")
+
+
+def write_meta(out: Path, meta: dict[str, object]) -> None:
+    # Atomic, so a crash never leaves a truncated watermark behind.
+    path = meta_path_for(out)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(meta, indent=2))
+    tmp.replace(path)
+
+
+def _utc_now() -> str:
+    return datetime.now(UTC).isoformat(timespec="microseconds").replace("+00:00", "Z")
+
+
+def read_watermark(out: Path) -> Watermark | None:
+    meta_path = meta_path_for(out)
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        if meta.get("max_inspection_date"):
+            return Watermark(
+                max_inspection_date=date.fromisoformat(meta["max_inspection_date"]),
+                rows=int(meta["rows"]),
+            )
+    if not out.exists():
+        return None
+    # Snapshots written before watermarks were recorded: scan the date column instead.
+    dates = pd.to_datetime(pd.read_parquet(out, columns=["inspection_date"])["inspection_date"])
+    if dates.notna().sum() == 0:
+        return None
+    return Watermark(max_inspection_date=dates.max().date(), rows=int(len(dates)))
+
+
+def drop_overlap(delta: pd.DataFrame, existing: pd.DataFrame) -> pd.DataFrame:
+    # Remove delta rows already present in the snapshot, counting duplicates as a multiset
+    # so genuinely repeated violation rows are preserved.
+    cols = [c for c in delta.columns if c in existing.columns]
+    if existing.empty or delta.empty or not cols:
+        return delta
+
+    def keyed(df: pd.DataFrame) -> pd.DataFrame:
+        k = cast(pd.DataFrame, df[cols].astype(object))
+        k = k.where(k.notna(), "").astype(str)
+        k["_dup"] = k.groupby(cols, sort=False).cumcount()
+        return cast(pd.DataFrame, k)
+
+    merged = keyed(delta).merge(keyed(existing), on=[*cols, "_dup"], how="left", indicator=True)
+    keep = (merged["_merge"] == "left_only").to_numpy()
+    return cast(pd.DataFrame, delta[keep].reset_index(drop=True))
+
+
+def _partition_paths(out: Path) -> list[Path]:
+    return sorted(out.glob("part-*.parquet"))
+
+
+def _pending_path(part: Path) -> Path:
+    # Hidden, so dataset discovery (and `_partition_paths`) never reads a pending part.
+    return part.with_name(f".{part.name}.tmp")
+
+
+def _recover_pending(out: Path) -> None:
+    """
+    Finish or discard a delta interrupted by a crash. A delta is committed when the meta
+    naming its part is written: a pending part the meta names is renamed into place (the
+    crash came after the commit), any other is deleted (it came before).
+    """
+    meta_path = meta_path_for(out)
+    meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+    committed = cast(dict[str, Any], meta.get("last_delta") or {}).get("part")
+    for pending in out.glob(".part-*.parquet.tmp"):
+        final = pending.with_name(pending.name[1:].removesuffix(".tmp"))
+        if final.name == committed and not final.exists():
+            pending.replace(final)
+        else:
+            pending.unlink()
+
+
+def _max_inspection_date(df: pd.DataFrame) -> date | None:
+    if "inspection_date" not in df.columns:
+        return None
+    dates = df["inspection_date"].dropna()
+    return None if dates.empty else cast(date, pd.Timestamp(cast(Any, dates.max())).date())
+
+
+def fetch_incremental(
+    out: Path, cfg: FetchConfig, session: requests.Session | None = None
+) -> dict[str, object]:
+    """
+    Append rows at or after the snapshot watermark to a partitioned snapshot directory.
+
+    `cfg.since_date` is only used when the snapshot is empty. The watermark day is
+    re-queried because Socrata may still be publishing rows for it; rows already stored
+    for that day are dropped before the delta is written as a new partition.
+
+    The delta is written under a pending name, then the meta (with the new watermark and
+    the part's name) is replaced atomically, then the part is renamed into place. A crash
+    at any point leaves either the old snapshot or the new one after `_recover_pending`.
+    """
+    if out.exists() and not out.is_dir():
+        raise ValueError(f"Incremental snapshots must be a directory of partitions: {out}")
+    if cfg.server_aggregate:
+        # Re-fetched watermark-day aggregates would duplicate, not extend, stored rows.
+        raise ValueError("Incremental fetch requires violation-level rows (no server_aggregate)")
+    if out.exists():
+        _recover_pending(out)
+    parts = _partition_paths(out) if out.exists() else []
+    watermark = read_watermark(out) if parts else None
+
+    if watermark:
+        cfg = replace(cfg, since_date=watermark.max_inspection_date)
+    df = fetch_all(cfg, session=session)
+    if watermark and not df.empty:
+        existing = read_raw(
+            out, filters=[("inspection_date", "==", watermark.max_inspection_date)]
+        )
+        df = drop_overlap(df, existing)
+
+    out.mkdir(parents=True, exist_ok=True)
+    part = out / f"part-{len(parts):05d}.parquet" if not df.empty else None
+    if part is not None:
+        df.to_parquet(_pending_path(part), index=False)
+
+    meta_path = meta_path_for(out)
+    prev_meta = json.loads(meta_path.read_text()) if watermark and meta_path.exists() else {}
+    dates = [watermark.max_inspection_date] if watermark else []
+    delta_max = _max_inspection_date(df)
+    if delta_max:
+        dates.append(delta_max)
+    meta: dict[str, object] = {
+        "dataset_id": DATASET_ID,
+        "fetched_at": _utc_now(),
+        "since_date": prev_meta.get("since_date", cfg.since_date.isoformat()),
+        "rows": (watermark.rows if watermark else 0) + int(len(df)),
+        "columns": prev_meta.get("columns", list(df.columns)),
+        "max_inspection_date": max(dates).isoformat() if dates else None,
+        "partitions": len(parts) + (part is not None),
+        "last_delta": {
+            "since_date": cfg.since_date.isoformat(),
+            "rows": int(len(df)),
+            "part": part.name if part is not None else None,
+        },
+    }
+    write_meta(out, meta)
+    if part is not None:
+        _pending_path(part).replace(part)
+    return meta
+
+
+def _snapshot_meta(
+    cfg: FetchConfig, rows: int, columns: list[str], max_date: date | None
+) -> dict[str, object]:
+    return {
+        "dataset_id": DATASET_ID,
+        "fetched_at": _utc_now(),
+        "since_date": cfg.since_date.isoformat(),
+        "rows": int(rows),
+        "columns": columns,
+        "max_inspection_date": max_date.isoformat() if max_date else None,
+        "level": "inspection" if cfg.server_aggregate else "violation",
+    }
 
 
 def main(argv: list[str] | None = None) -> int:
     p = argparse.ArgumentParser(description="Fetch NYC inspections data from Socrata.")
     p.add_argument("--since-years", type=int, default=3)
     p.add_argument("--out", type=Path, required=True)
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Treat --out as a partition directory and append only rows at/after its watermark.",
+    )
+    mode.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write pages as Arrow record batches instead of buffering all rows in memory.",
+    )
+    p.add_argument(
+        "--server-aggregate",
+        action="store_true",
+        help="Fetch one row per inspection via SoQL $group instead of one row per violation.",
+    )
+    p.add_argument(
+        "--workers", type=int, default=1, help="Concurrent date-window fetchers (1 = serial)."
+    )
+    p.add_argument("--window-days", type=int, default=30)
+    p.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Persistent HTTP cache; unchanged pages are revalidated with conditional GETs.",
+    )
+    p.add_argument("--cache-max-mb", type=int, default=2048)
+    p.add_argument("--cache-max-age-days", type=float, default=30.0)
+    add_profile_argument(p)
     args = p.parse_args(argv)
 
+    cache = (
+        ResponseCache(
+            args.cache_dir,
+            max_bytes=args.cache_max_mb * 1024**2,
+            max_age_s=args.cache_max_age_days * 24 * 3600,
+        )
+        if args.cache_dir
+        else None
+    )
+    sess = _build_session(pool_maxsize=args.workers, cache=cache)
+
     since_date = _since_years_to_date(args.since_years)
-    cfg = FetchConfig(since_date=since_date)
+    cfg = FetchConfig(
+        since_date=since_date,
+        workers=args.workers,
+        window_days=args.window_days,
+        server_aggregate=args.server_aggregate,
+    )
+    perf = PerfRecorder(args.profile)
+    with perf.stage("fetch") as stage:
+        if args.incremental:
+            meta = fetch_incremental(args.out, cfg, session=sess)
+            stage.rows = cast(dict[str, Any], meta["last_delta"])["rows"]
+        elif args.stream:
+            n_rows, max_date = fetch_to_parquet(cfg, args.out, session=sess)
+            meta = _snapshot_meta(cfg, n_rows, pq.read_schema(args.out).names, max_date)
+            stage.rows = n_rows
+        else:
+            df = fetch_all(cfg, session=sess)
+            args.out.parent.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(args.out, index=False)
+            meta = _snapshot_meta(cfg, len(df), list(df.columns), _max_inspection_date(df))
+            stage.rows = len(df)
 
-    df = fetch_all(cfg)
-    args.out.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(args.out, index=False)
-    meta = {
-        "dataset_id": DATASET_ID,
-        "fetched_at": datetime.utcnow().isoformat() + "Z",
-        "since_date": since_date.isoformat(),
-        "rows": int(len(df)),
-        "columns": list(df.columns),
-    }
-    meta_path = args.out.with_suffix(".meta.json")
-    pd.Series(meta).to_json(meta_path, indent=2)
+    if cache is not None:
+        meta["http_cache"] = asdict(cache.stats)
+    meta["perf"] = perf.to_dict()
+    write_meta(args.out, meta)
     return 0
 
 
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Persistent response cache for Socrata GETs. Entries are keyed by the full request URL
+# (query string included) and revalidated with ETag/Last-Modified on every use, so an
+# unchanged upstream costs one 304 per request instead of a full page transfer.
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stored: int = 0
+    evicted: int = 0
+    bytes_served_from_cache: int = 0
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int = 2 * 1024**3,
+        max_age_s: float = 30 * 24 * 3600,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        # key -> (last_used, size); loaded from disk once, then maintained in memory.
+        self._index: dict[str, tuple[float, int]] = {}
+        for meta_path in self.root.glob("*.json"):
+            try:
+                meta = json.loads(meta_path.read_text())
+            except json.JSONDecodeError:
+                continue
+            self._index[meta_path.stem] = (float(meta["last_used"]), int(meta["size"]))
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.root / f"{key}.json", self.root / f"{key}.body"
+
+    def get(self, url: str) -> tuple[dict[str, Any], bytes] | None:
+        meta_path, body_path = self._paths(self.key(url))
+        try:
+            meta = json.loads(meta_path.read_text())
+            body = body_path.read_bytes()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if meta.get("url") != url or len(body) != meta.get("size"):
+            return None
+        return meta, body
+
+    def put(self, url: str, headers: CaseInsensitiveDict[str], body: bytes) -> None:
+        meta_path, body_path = self._paths(self.key(url))
+        now = time.time()
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "content_type": headers.get("Content-Type"),
+            "size": len(body),
+            "stored_at": now,
+            "last_used": now,
+        }
+        with self._lock:
+            tmp = body_path.with_suffix(".body.tmp")
+            tmp.write_bytes(body)
+            tmp.replace(body_path)
+            meta_path.write_text(json.dumps(meta))
+            self._index[meta_path.stem] = (now, len(body))
+            self.stats.stored += 1
+        self.evict()
+
+    def touch(self, url: str, meta: dict[str, Any]) -> None:
+        meta_path, _ = self._paths(self.key(url))
+        meta = {**meta, "last_used": time.time()}
+        with self._lock:
+            meta_path.write_text(json.dumps(meta))
+            self._index[meta_path.stem] = (meta["last_used"], int(meta["size"]))
+            self.stats.hits += 1
+            self.stats.bytes_served_from_cache += int(meta["size"])
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.stats.misses += 1
+
+    def evict(self) -> None:
+        # Drop entries unused for longer than max_age_s, then least-recently-used entries
+        # until the cache fits in max_bytes.
+        with self._lock:
+            now = time.time()
+            total = sum(size for _, size in self._index.values())
+            for key, (last_used, size) in sorted(self._index.items(), key=lambda kv: kv[1]):
+                if now - last_used <= self.max_age_s and total <= self.max_bytes:
+                    break
+                for path in self._paths(key):
+                    path.unlink(missing_ok=True)
+                del self._index[key]
+                total -= size
+                self.stats.evicted += 1
+
+
+class CachingAdapter(HTTPAdapter):
+    def __init__(self, cache: ResponseCache, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> Any:
+        url = request.url
+        if request.method != "GET" or url is None:
+            return super().send(request, *args, **kwargs)
+
+        cached = self.cache.get(url)
+        if cached is not None:
+            meta, _ = cached
+            if meta.get("etag"):
+                request.headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request.headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = super().send(request, *args, **kwargs)
+        if resp.status_code == 304 and cached is not None:
+            meta, body = cached
+            self.cache.touch(url, meta)
+            return _cached_response(request, meta, body)
+
+        self.cache.record_miss()
+        if resp.status_code == 200 and (
+            resp.headers.get("ETag") or resp.headers.get("Last-Modified")
+        ):
+            self.cache.put(url, resp.headers, resp.content)
+        return resp
+
+
+def _cached_response(
+    request: requests.PreparedRequest, meta: dict[str, Any], body: bytes
+) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.reason = "OK"
+    resp._content = body
+    resp.url = meta["url"]
+    resp.request = request
+    resp.headers = CaseInsensitiveDict(
+        {
+            k: v
+            for k, v in {
+                "Content-Type": meta.get("content_type"),
+                "ETag": meta.get("etag"),
+                "Last-Modified": meta.get("last_modified"),
+                "X-Cache": "HIT",
+            }.items()
+            if v
+        }
+    )
+    return resp
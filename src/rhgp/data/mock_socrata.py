@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, cast
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from rhgp.data.schema import COLS
+
+# Minimal local stand-in for the Socrata resource/metadata endpoints, used by tests and
+# benchmarks so fetch code paths can run offline. Only the SoQL subset issued by
+# `rhgp.data.fetch` is understood. Like Socrata, rows tied on the `$order` keys may come back
+# in a different order on every request, so paging is only stable with a unique order
+# (`:id` is the row's position in `records`).
+
+_DATE_KEY = "__inspection_date"
+_CLAUSE_RE = re.compile(r"^\s*(\w+)\s*(>=|<=|=|>|<)\s*'([^']*)'\s*$")
+_AGG_RE = re.compile(r"^(count|min|max|sum)\((.+)\)(?:\s+AS\s+(\w+))?$", re.IGNORECASE)
+_CASE_RE = re.compile(
+    r"^case\(upper\((\w+)\)\s*=\s*'([^']*)',\s*(\d+),\s*true,\s*(\d+)\)$", re.IGNORECASE
+)
+
+
+class MockSocrata:
+    def __init__(
+        self,
+        records: list[dict[str, Any]],
+        dataset_id: str = "mock-0000",
+        *,
+        latency_s: float = 0.0,
+        throttle_every: int = 0,
+        retry_after_s: int = 0,
+    ) -> None:
+        self.dataset_id = dataset_id
+        self.records = records
+        # Simulated server-side time per resource request.
+        self.latency_s = latency_s
+        # Answer every Nth resource request with 429 + Retry-After (0 disables).
+        self.throttle_every = throttle_every
+        self.retry_after_s = retry_after_s
+        self.requests: list[dict[str, str]] = []
+        # perf_counter() arrival time of each request, parallel to `requests`.
+        self.arrivals: list[float] = []
+        self.throttled = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def records(self) -> list[dict[str, Any]]:
+        return self._records
+
+    @records.setter
+    def records(self, records: list[dict[str, Any]]) -> None:
+        self._records = records
+        self._frame: pd.DataFrame | None = None
+
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            df = pd.DataFrame.from_records(self._records)
+            if COLS.inspection_date in df.columns:
+                df[_DATE_KEY] = pd.to_datetime(df[COLS.inspection_date], errors="coerce")
+            self._frame = df
+        return self._frame
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("MockSocrata is not running")
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.url}/resource/{self.dataset_id}.json"
+
+    @property
+    def meta_url(self) -> str:
+        return f"{self.url}/api/views/{self.dataset_id}.json"
+
+    def columns(self) -> list[str]:
+        seen: dict[str, None] = {}
+        for r in self.records:
+            for k in r:
+                seen.setdefault(k, None)
+        return list(seen)
+
+    def start(self) -> MockSocrata:
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                mock._handle(self)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> MockSocrata:
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def _handle(self, req: BaseHTTPRequestHandler) -> None:
+        parsed = urlparse(req.path)
+        params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        with self._lock:
+            self.requests.append({"path": parsed.path, **params})
+            self.arrivals.append(time.perf_counter())
+            n_requests = len(self.requests)
+
+        if parsed.path == f"/api/views/{self.dataset_id}.json":
+            payload: object = {"columns": [{"fieldName": c} for c in self.columns()]}
+        elif parsed.path == f"/resource/{self.dataset_id}.json":
+            if self.throttle_every and n_requests % self.throttle_every == 0:
+                with self._lock:
+                    self.throttled += 1
+                headers = {"Retry-After": str(self.retry_after_s)}
+                self._send(req, 429, {"error": True, "message": "throttled"}, headers)
+                return
+            time.sleep(self.latency_s)
+            try:
+                payload = self.query(params, seed=n_requests)
+            except ValueError as e:
+                self._send(req, 400, {"error": True, "message": str(e)})
+                return
+        else:
+            self._send(req, 404, {"error": True, "message": "not found"})
+            return
+
+        # Content-derived validators so clients can revalidate with conditional GETs.
+        body = json.dumps(payload).encode()
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if req.headers.get("If-None-Match") == etag:
+            with self._lock:
+                self.not_modified += 1
+            req.send_response(304)
+            req.send_header("ETag", etag)
+            req.end_headers()
+            return
+        self._send(req, 200, payload, {"ETag": etag})
+
+    def _send(
+        self,
+        req: BaseHTTPRequestHandler,
+        status: int,
+        payload: object,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        body = json.dumps(payload).encode()
+        req.send_response(status)
+        req.send_header("Content-Type", "application/json")
+        req.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            req.send_header(k, v)
+        req.end_headers()
+        req.wfile.write(body)
+        with self._lock:
+            self.bytes_sent += len(body)
+
+    def query(self, params: dict[str, str], seed: int = 0) -> list[dict[str, Any]]:
+        df = self.frame()
+        if "$where" in params:
+            mask = pd.Series(True, index=df.index)
+            for clause in re.split(r"\s+AND\s+", params["$where"], flags=re.IGNORECASE):
+                mask &= _eval_clause(df, clause)
+            df = cast(pd.DataFrame, df[mask])
+
+        if "$group" in params:
+            df = _group(df, params["$group"], params.get("$select", ""))
+
+        if "$order" in params:
+            keys: list[str] = []
+            for part in params["$order"].split(","):
+                col, *direction = part.split()
+                if direction and direction[0].upper() != "ASC":
+                    raise ValueError(f"Unsupported order direction: {part}")
+                keys.append(col)
+            # Shuffled first, so ties land in a per-request order.
+            df = df.iloc[np.random.default_rng(seed).permutation(len(df))]
+            sort_frame = pd.DataFrame({k: _sort_key(df, k) for k in keys}, index=df.index)
+            df = df.loc[sort_frame.sort_values(keys, kind="mergesort").index]
+
+        cols = [c for c in df.columns if c != _DATE_KEY]
+        if "$select" in params and "$group" not in params:
+            cols = [c.strip() for c in params["$select"].split(",")]
+        df = cast(pd.DataFrame, df.reindex(columns=pd.Index(cols)))
+
+        offset = int(params.get("$offset", 0))
+        limit = int(params.get("$limit", 1000))
+        page = df.iloc[offset : offset + limit]
+        # Socrata omits null fields from JSON rows.
+        return [{k: v for k, v in r.items() if pd.notna(v)} for r in page.to_dict("records")]
+
+
+def _split_top_level(spec: str) -> list[str]:
+    parts, depth, cur = [], 0, ""
+    for ch in spec:
+        if ch == "," and depth == 0:
+            parts.append(cur.strip())
+            cur = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(ch, 0)
+        cur += ch
+    if cur.strip():
+        parts.append(cur.strip())
+    return parts
+
+
+def _eval_expr(df: pd.DataFrame, expr: str) -> pd.Series:
+    expr = expr.strip()
+    if expr == "*":
+        return pd.Series(1, index=df.index)
+    m = _CASE_RE.match(expr)
+    if m:
+        col, value, then, other = m.groups()
+        hit = df[col].astype("string").str.upper().eq(value).fillna(False)
+        return hit.map({True: int(then), False: int(other)}).astype(int)
+    if expr not in df.columns:
+        raise ValueError(f"Unsupported expression: {expr}")
+    return cast(pd.Series, df[expr])
+
+
+def _group(df: pd.DataFrame, group_spec: str, select_spec: str) -> pd.DataFrame:
+    keys = [k.strip() for k in group_spec.split(",")]
+    work = pd.DataFrame({k: df[k] for k in keys}, index=df.index)
+    aggs: dict[str, tuple[str, str]] = {}
+    for item in _split_top_level(select_spec):
+        m = _AGG_RE.match(item)
+        if not m:
+            if item not in keys:
+                raise ValueError(f"Non-grouped column in $select: {item}")
+            continue
+        fn, inner, alias = m.groups()
+        name = alias or f"{fn.lower()}_{inner}"
+        work[f"__{name}"] = _eval_expr(df, inner)
+        agg_fn = {"count": "count", "min": "min", "max": "max", "sum": "sum"}[fn.lower()]
+        aggs[name] = (f"__{name}", agg_fn)
+
+    out = work.groupby(keys, dropna=False, sort=False).agg(**aggs).reset_index()
+    for name, (_, fn) in aggs.items():
+        if fn in {"count", "sum"}:
+            # Socrata serializes numbers as strings.
+            out[name] = out[name].astype(int).astype(str)
+    if COLS.inspection_date in out.columns:
+        out[_DATE_KEY] = pd.to_datetime(out[COLS.inspection_date], errors="coerce")
+    return cast(pd.DataFrame, out)
+
+
+def _sort_key(df: pd.DataFrame, col: str) -> pd.Series:
+    if col == ":id":
+        # Grouped frames get a fresh index, so this is only meaningful for raw rows.
+        return pd.Series(df.index, index=df.index)
+    if col == COLS.inspection_date:
+        return cast(pd.Series, df[_DATE_KEY])
+    return cast(pd.Series, df[col])
+
+
+def _eval_clause(df: pd.DataFrame, clause: str) -> pd.Series:
+    m = _CLAUSE_RE.match(clause)
+    if not m:
+        raise ValueError(f"Unsupported $where clause: {clause}")
+    col, op, raw_value = m.groups()
+    if col not in df.columns:
+        raise ValueError(f"Unknown column: {col}")
+    left = _sort_key(df, col)
+    value: object = pd.Timestamp(raw_value) if col == COLS.inspection_date else raw_value
+    if op == ">=":
+        return left >= value
+    if op == "<=":
+        return left <= value
+    if op == ">":
+        return left > value
+    if op == "<":
+        return left < value
+    return left == value
@@ -1,6 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 
 @dataclass(frozen=True)
@@ -44,8 +51,99 @@ def desired_columns() -> list[str]:
     return selected_columns()
 
 
-def normalize_grade(value: str | None) -> str | None:
-    if value is None:
+GRADES = ["A", "B", "C"]
+GRADE_DTYPE = pd.CategoricalDtype(GRADES)
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+# Compact snapshot types. Socrata serves every field as a string; low-cardinality text is
+# dictionary-encoded (pandas `category`) and numbers use the narrowest safe width.
+RAW_ARROW_TYPES: dict[str, pa.DataType] = {
+    COLS.camis: pa.int32(),
+    COLS.inspection_date: pa.date32(),
+    COLS.inspection_type: _CATEGORY,
+    COLS.grade: _CATEGORY,
+    COLS.score: pa.float32(),
+    COLS.violation_code: _CATEGORY,
+    COLS.violation_description: _CATEGORY,
+    COLS.critical_flag: _CATEGORY,
+    # Inspection-level snapshots (server-side aggregation).
+    "n_violations_t": pa.int32(),
+    "n_critical_violations_t": pa.int32(),
+}
+
+
+def raw_arrow_schema(columns: list[str]) -> pa.Schema:
+    return pa.schema([pa.field(c, RAW_ARROW_TYPES.get(c, pa.string())) for c in columns])
+
+
+def _as_category(s: pd.Series) -> pd.Series:
+    # Sorted categories keep dtypes identical regardless of row order or row groups.
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        return s.astype("category")
+    cats = s.cat.categories
+    return s if cats.is_monotonic_increasing else s.cat.reorder_categories(sorted(cats))
+
+
+def apply_raw_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coerce a raw/inspection-level snapshot frame to the native dtypes of `RAW_ARROW_TYPES`.
+
+    Columns already in the target dtype are passed through without conversion.
+    """
+    out = {c: coerce_raw_column(cast(pd.Series, df[c])) for c in df.columns}
+    return pd.DataFrame(out, index=df.index)
+
+
+def coerce_raw_column(s: pd.Series) -> pd.Series:
+    # Single-column `apply_raw_schema`, keyed by the series name; typed input is returned as is.
+    t = RAW_ARROW_TYPES.get(str(s.name))
+    if t is None:
+        return s
+    if t == pa.date32():
+        return s if s.dtype == "datetime64[ns]" else _to_datetime(s)
+    if pa.types.is_dictionary(t):
+        return _as_category(s)
+    if t == pa.float32():
+        return s if s.dtype == np.float32 else _to_numeric(s, errors="coerce").astype("float32")
+    return s if s.dtype == np.int32 else _to_numeric(s).astype("int32")
+
+
+def _to_numeric(s: pd.Series, errors: Any = "raise") -> pd.Series:
+    return cast(pd.Series, pd.to_numeric(s, errors=errors))
+
+
+def _to_datetime(s: pd.Series) -> pd.Series:
+    return pd.to_datetime(s, errors="coerce").astype("datetime64[ns]").dt.normalize()
+
+
+def read_raw(
+    path: Path, columns: list[str] | None = None, filters: Any = None
+) -> pd.DataFrame:
+    # Enforce the compact schema on read, upgrading snapshots written before it existed.
+    table = pq.read_table(path, columns=columns, filters=filters)
+    table = table.cast(raw_arrow_schema(table.schema.names))
+    df = table.to_pandas(date_as_object=False, coerce_temporal_nanoseconds=True)
+    return apply_raw_schema(df)
+
+
+def normalize_grades(grades: pd.Series) -> pd.Series:
+    # Vectorized `normalize_grade`; works on the categories when the column is categorical.
+    if isinstance(grades.dtype, pd.CategoricalDtype):
+        # Remap category codes; the trailing -1 entry keeps missing values missing.
+        lookup = np.array(
+            [GRADES.index(g) if (g := normalize_grade(c)) else -1 for c in grades.cat.categories]
+            + [-1]
+        )
+        codes = lookup[grades.cat.codes.to_numpy()]
+        out = pd.Categorical.from_codes(codes, dtype=GRADE_DTYPE)
+        return pd.Series(out, index=grades.index, name=grades.name)
+    values = grades.astype("string").str.strip().str.upper()
+    return values.where(values.isin(GRADES)).astype(object).astype(GRADE_DTYPE)
+
+
+def normalize_grade(value: object) -> str | None:
+    if not isinstance(value, str):
         return None
     v = value.strip().upper()
     if v in {"A", "B", "C"}:
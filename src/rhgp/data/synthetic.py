@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from rhgp.data.schema import COLS, apply_raw_schema
+
+# Deterministic synthetic raw snapshots (one row per violation, like the Socrata feed) for
+# offline tests and benchmarks.
+
+INSPECTION_TYPES = [
+    "Cycle Inspection / Initial Inspection",
+    "Cycle Inspection / Re-inspection",
+    "Pre-permit (Operational) / Initial Inspection",
+    "Pre-permit (Operational) / Re-inspection",
+    "Administrative Miscellaneous / Initial Inspection",
+]
+INSPECTION_TYPE_WEIGHTS = [0.45, 0.3, 0.12, 0.08, 0.05]
+VIOLATION_CODES = ["02B", "02G", "04L", "04N", "06C", "06D", "08A", "09C", "10B", "10F"]
+
+
+FIRST_CAMIS = 40_000_000
+
+
+def _categorical(codes: np.ndarray, categories: list[str]) -> pd.Categorical:
+    # Built from codes so large frames never hold per-row Python strings; `apply_raw_schema`
+    # then sorts the categories as it would for string input.
+    return pd.Categorical.from_codes(codes, categories=categories).remove_unused_categories()
+
+
+def synthetic_raw(
+    n_restaurants: int = 1_000,
+    start: date = date(2022, 1, 1),
+    end: date = date(2025, 1, 1),
+    seed: int = 0,
+    days_between_inspections: float = 180.0,
+    points_per_violation: float = 8.0,
+) -> pd.DataFrame:
+    """
+    Violation-level rows for `n_restaurants` over [start, end), in the `rhgp.data.schema`
+    dtypes. Each restaurant gets on average one inspection per `days_between_inspections`
+    (plus one), and each inspection one violation per `points_per_violation` score points
+    (plus one).
+    """
+    rng = np.random.default_rng(seed)
+    span_days = (end - start).days
+
+    # Roughly two inspections per restaurant-year by default.
+    n_insp = 1 + rng.poisson(span_days / days_between_inspections, size=n_restaurants)
+    camis = np.repeat(np.arange(FIRST_CAMIS, FIRST_CAMIS + n_restaurants), n_insp)
+    offsets = rng.integers(0, span_days, size=len(camis))
+    insp = pd.DataFrame({"camis": camis, "offset": offsets}).drop_duplicates()
+    insp = insp.sort_values(["camis", "offset"], kind="mergesort").reset_index(drop=True)
+    n = len(insp)
+
+    # Restaurant-level quality drives correlated scores across inspections.
+    quality = rng.gamma(2.0, 5.0, size=n_restaurants)
+    base = quality[insp["camis"].to_numpy() - FIRST_CAMIS]
+    score = np.clip(np.round(base + rng.normal(0, 6, size=n)), 0, None).astype(int)
+    grade = np.where(score < 14, 0, np.where(score < 28, 1, 2))
+    grade[rng.random(n) < 0.25] = -1
+    itype = rng.choice(len(INSPECTION_TYPES), size=n, p=INSPECTION_TYPE_WEIGHTS)
+
+    # Violations per inspection scale with score; clean inspections still emit one row.
+    n_viol = np.where(score == 0, 0, 1 + rng.poisson(score / points_per_violation))
+    n_rows = np.maximum(n_viol, 1)
+    idx = np.repeat(np.arange(n), n_rows)
+    has_violation = np.repeat(n_viol > 0, n_rows)
+    codes = np.where(has_violation, rng.integers(0, len(VIOLATION_CODES), size=len(idx)), -1)
+    critical = np.where(rng.random(len(idx)) < 0.45, 0, 1)
+    critical[~has_violation] = 2
+
+    days = pd.to_datetime(start) + pd.to_timedelta(insp["offset"].to_numpy()[idx], unit="D")
+    raw = pd.DataFrame(
+        {
+            COLS.camis: insp["camis"].to_numpy()[idx].astype(np.int32),
+            COLS.inspection_date: days,
+            COLS.inspection_type: _categorical(itype[idx], INSPECTION_TYPES),
+            COLS.grade: _categorical(grade[idx], ["A", "B", "C"]),
+            COLS.score: score[idx].astype(np.float32),
+            COLS.violation_code: _categorical(codes, VIOLATION_CODES),
+            COLS.violation_description: _categorical(
+                codes, [f"Violation {c}" for c in VIOLATION_CODES]
+            ),
+            COLS.critical_flag: _categorical(
+                critical, ["Critical", "Not Critical", "Not Applicable"]
+            ),
+        }
+    )
+    return apply_raw_schema(raw)
+
+
+def restaurants_for_rows(rows: int, **kwargs: Any) -> int:
+    """
+    Restaurants for about `rows` violation rows under the `synthetic_raw` settings in
+    `kwargs`, from the rows per restaurant of a fixed-size sample.
+    """
+    sample = 2_000
+    per_restaurant = len(synthetic_raw(n_restaurants=sample, **{**kwargs, "seed": 0})) / sample
+    return max(1, round(rows / per_restaurant))
+
+
+def synthetic_raw_rows(rows: int, seed: int = 0, **kwargs: Any) -> pd.DataFrame:
+    """`synthetic_raw` sized for about `rows` violation rows (e.g. 100k to 20M)."""
+    return synthetic_raw(n_restaurants=restaurants_for_rows(rows, **kwargs), seed=seed, **kwargs)
+
+
+def to_socrata_records(raw: pd.DataFrame) -> list[dict[str, Any]]:
+    # JSON rows as Socrata serves them: every value a string, null fields omitted.
+    df = pd.DataFrame(
+        {
+            c: raw[c].map(lambda v: f"{v:g}", na_action="ignore")
+            if raw[c].dtype.kind == "f"
+            else raw[c].astype(object).where(raw[c].notna()).map(str, na_action="ignore")
+            for c in raw.columns
+        }
+    )
+    df[COLS.inspection_date] = pd.to_datetime(raw[COLS.inspection_date]).dt.strftime(
+        "%Y-%m-%dT%H:%M:%S.000"
+    )
+    return [
+        {str(k): v for k, v in r.items() if isinstance(v, str)} for r in df.to_dict("records")
+    ]
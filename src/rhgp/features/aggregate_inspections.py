@@ -2,46 +2,182 @@ from __future__ import annotations
 
 from typing import cast
 
+import numpy as np
 import pandas as pd
 
-from rhgp.data.schema import COLS, normalize_grade
+from rhgp.data.schema import (
+    COLS,
+    GRADE_DTYPE,
+    apply_raw_schema,
+    coerce_raw_column,
+    normalize_grades,
+)
 
 
-def aggregate_to_inspections(raw: pd.DataFrame) -> pd.DataFrame:
-    df = raw.copy()
-    if COLS.grade in df.columns:
-        df[COLS.grade] = df[COLS.grade].map(normalize_grade)
+def _missing_grades(index: pd.Index) -> pd.Series:
+    return pd.Series(pd.Categorical([None] * len(index), dtype=GRADE_DTYPE), index=index)
+
+
+def _is_critical(flags: pd.Series) -> pd.Series:
+    # Compare the (few) categories once instead of every row.
+    cats = flags.cat.categories.astype(str).str.upper() == "CRITICAL"
+    hit = np.append(np.asarray(cats, dtype=bool), False)[flags.cat.codes.to_numpy()]
+    return pd.Series(hit, index=flags.index)
+
+
+def _column(raw: pd.DataFrame, name: str) -> pd.Series:
+    return coerce_raw_column(cast(pd.Series, raw[name]))
+
+
+_NS_PER_DAY = 86_400_000_000_000
+
+
+def _compact_key(camis: np.ndarray, dates: np.ndarray) -> np.ndarray | None:
+    # (camis, day) packed into one non-negative int64 that sorts like the pair, with missing
+    # dates last within a restaurant. None when dates carry a time of day or it won't fit.
+    nat = np.isnat(dates)
+    ns = dates.view(np.int64)
+    if not len(camis) or (ns[~nat] % _NS_PER_DAY).any():
+        return None
+    day = ns // _NS_PER_DAY
+    first, last = day[~nat].min(initial=0), day[~nat].max(initial=0)
+    day = np.where(nat, last - first + 1, day - first)
+    span = int(last - first) + 2
+    c = camis.astype(np.int64) - int(camis.min())
+    if int(c.max()) >= np.iinfo(np.int64).max // span:
+        return None
+    return c * span + day
+
+
+def _radix_argsort(key: np.ndarray) -> np.ndarray:
+    # Stable LSD radix sort over 16-bit digits: NumPy's stable sort of uint16 is a radix
+    # sort, so each pass is linear instead of a comparison sort of the full key.
+    order = np.arange(len(key))
+    for shift in range(0, int(key.max()).bit_length(), 16):
+        digit = ((key[order] >> shift) & 0xFFFF).astype(np.uint16)
+        order = order[np.argsort(digit, kind="stable")]
+    return order
+
+
+def _group_starts(camis: np.ndarray, dates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Row order sorting by (camis, inspection_date) and the start offset of every group.
+
+    Missing dates sort last within a restaurant, matching `groupby(..., dropna=False)`.
+    The sort is skipped when the rows are already in key order.
+    """
+    key = _compact_key(camis, dates)
+    if key is None:
+        day = np.where(np.isnat(dates), np.iinfo(np.int64).max, dates.view(np.int64))
+        order = np.lexsort((day, camis))
+        camis, day = camis[order], day[order]
+        new_group = (camis[1:] != camis[:-1]) | (day[1:] != day[:-1])
     else:
-        df[COLS.grade] = None
+        sorted_already = bool((key[1:] >= key[:-1]).all())
+        order = np.arange(len(key)) if sorted_already else _radix_argsort(key)
+        key = key[order]
+        new_group = key[1:] != key[:-1]
+    return order, np.flatnonzero(np.concatenate([[len(order) > 0], new_group]))
 
-    df[COLS.score] = pd.to_numeric(df.get(COLS.score), errors="coerce")
 
-    # Normalize and ensure date typed.
-    df[COLS.inspection_date] = pd.to_datetime(df[COLS.inspection_date], errors="coerce").dt.date
+def _first(s: pd.Series, order: np.ndarray, starts: np.ndarray) -> pd.Series:
+    # groupby `first`: the first non-null value of each group, in original row order.
+    n = len(order)
+    valid_pos = np.where(s.notna().to_numpy()[order], np.arange(n), n)
+    first = np.minimum.reduceat(valid_pos, starts) if n else starts
+    found = first < n
+    rows = order[np.where(found, first, 0)] if n else first
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = np.where(found, s.cat.codes.to_numpy()[rows], -1)
+        return pd.Series(pd.Categorical.from_codes(codes, dtype=s.dtype))
+    values = s.to_numpy()[rows]
+    return pd.Series(np.where(found, values, np.array(np.nan, dtype=values.dtype)))
 
-    key_cols = [COLS.camis, COLS.inspection_date]
-    # Violation aggregates at inspection t (allowed features).
-    if COLS.violation_code in df.columns:
-        df["_has_violation"] = df[COLS.violation_code].notna()
+
+def _sum(flags: np.ndarray, order: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    if not len(order):
+        return np.zeros(0, dtype=np.int64)
+    return np.add.reduceat(flags[order].astype(np.int64), starts)
+
+
+def aggregate_to_inspections(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduce violation rows to one row per (camis, inspection_date).
+
+    Columnar: only the needed columns are coerced to the compact schema (a no-op when the
+    snapshot is already typed), grades and critical flags are normalized on category codes,
+    and the per-inspection reductions run over one stable sort of the keys.
+    """
+    camis = _column(raw, COLS.camis).to_numpy()
+    dates = _column(raw, COLS.inspection_date).to_numpy()
+    order, starts = _group_starts(camis, dates)
+
+    if COLS.grade in raw.columns:
+        grade = normalize_grades(_column(raw, COLS.grade))
     else:
-        df["_has_violation"] = True
+        grade = _missing_grades(raw.index)
+    if COLS.score in raw.columns:
+        score = _column(raw, COLS.score)
+    else:
+        score = pd.Series(np.full(len(raw), np.nan, dtype=np.float32))
 
-    if COLS.critical_flag in df.columns:
-        df["_is_critical"] = df[COLS.critical_flag].astype(str).str.upper().eq("CRITICAL")
+    # Violation aggregates at inspection t (allowed features).
+    if COLS.violation_code in raw.columns:
+        has_violation = raw[COLS.violation_code].notna().to_numpy()
     else:
-        df["_is_critical"] = False
-
-    agg = (
-        df.groupby(key_cols, dropna=False)
-        .agg(
-            inspection_type=(COLS.inspection_type, "first"),
-            grade_t=(COLS.grade, "first"),
-            score_t=(COLS.score, "first"),
-            n_violations_t=("_has_violation", "sum"),
-            n_critical_violations_t=("_is_critical", "sum"),
-        )
-        .reset_index()
-        .rename(columns={COLS.camis: "camis", COLS.inspection_date: "inspection_date_t"})
+        has_violation = np.ones(len(raw), dtype=bool)
+    if COLS.critical_flag in raw.columns:
+        is_critical = _is_critical(_column(raw, COLS.critical_flag)).to_numpy()
+    else:
+        is_critical = np.zeros(len(raw), dtype=bool)
+
+    grouping = (order, starts)
+    first_rows = order[starts]
+    return pd.DataFrame(
+        {
+            "camis": camis[first_rows],
+            "inspection_date_t": dates[first_rows],
+            "inspection_type": _first(_column(raw, COLS.inspection_type), *grouping),
+            "grade_t": _first(grade, *grouping),
+            "score_t": _first(score, *grouping),
+            "n_violations_t": _sum(has_violation, *grouping),
+            "n_critical_violations_t": _sum(is_critical, *grouping),
+        }
     )
 
-    return cast(pd.DataFrame, agg)
+
+def is_inspection_level(df: pd.DataFrame) -> bool:
+    # Snapshots fetched with server-side aggregation already carry the violation counts.
+    return "n_violations_t" in df.columns
+
+
+def _counts(values: object) -> pd.Series:
+    return cast(pd.Series, pd.to_numeric(cast(pd.Series, values))).fillna(0).astype(int)
+
+
+def normalize_inspection_level(pre: pd.DataFrame) -> pd.DataFrame:
+    # Same output as `aggregate_to_inspections` for rows already reduced per
+    # (camis, inspection_date), e.g. by `rhgp.data.fetch` with `server_aggregate`.
+    pre = apply_raw_schema(pre)
+    grade = (
+        normalize_grades(cast(pd.Series, pre[COLS.grade]))
+        if COLS.grade in pre.columns
+        else _missing_grades(pre.index)
+    )
+    n_critical = (
+        _counts(pre["n_critical_violations_t"]) if "n_critical_violations_t" in pre.columns else 0
+    )
+    score = pre[COLS.score] if COLS.score in pre.columns else np.float32(np.nan)
+    df = pd.DataFrame(
+        {
+            "camis": pre[COLS.camis],
+            "inspection_date_t": pre[COLS.inspection_date],
+            "inspection_type": pre[COLS.inspection_type],
+            "grade_t": grade,
+            "score_t": score,
+            "n_violations_t": _counts(pre["n_violations_t"]),
+            "n_critical_violations_t": n_critical,
+        }
+    )
+    df = df.sort_values(["camis", "inspection_date_t"], kind="mergesort")
+    return cast(pd.DataFrame, df.reset_index(drop=True))
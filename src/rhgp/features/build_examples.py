@@ -1,26 +1,66 @@
 from __future__ import annotations
 
 import argparse
+import json
+import multiprocessing
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import cast
+from typing import Any, cast
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
 
 from rhgp.config import FAIL_GRADES
-from rhgp.features.aggregate_inspections import aggregate_to_inspections
-from rhgp.features.features import add_history_features
+from rhgp.data.dataset import (
+    PARTITION_COLUMN,
+    date_filter,
+    partition_dir,
+    read_dataset,
+    replace_dataset,
+    replace_partitions,
+    staging_path,
+    write_dataset,
+    write_fragments,
+)
+from rhgp.data.schema import read_raw
+from rhgp.features.aggregate_inspections import (
+    aggregate_to_inspections,
+    is_inspection_level,
+    normalize_inspection_level,
+)
+from rhgp.features.features import DEFAULT_HISTORY, HistoryConfig, add_history_features
+from rhgp.features.shards import split_raw
+from rhgp.features.state import (
+    emit_from,
+    merge_inspections,
+    pending_partitions,
+    read_state,
+    retained_state,
+    union_categories,
+    write_state,
+    write_state_meta,
+)
+from rhgp.perf import PerfRecorder, add_profile_argument
 
 
-def build_supervised_dataset(raw: pd.DataFrame) -> pd.DataFrame:
-    t = cast(pd.DataFrame, aggregate_to_inspections(raw))
-    t = add_history_features(t)
+def to_inspections(raw: pd.DataFrame) -> pd.DataFrame:
+    # Accepts violation-level snapshots or inspection-level ones (server-side aggregation).
+    if is_inspection_level(raw):
+        return normalize_inspection_level(raw)
+    return cast(pd.DataFrame, aggregate_to_inspections(raw))
 
+
+def attach_labels(t: pd.DataFrame) -> pd.DataFrame:
     t = t.sort_values(["camis", "inspection_date_t"]).copy()
     t["inspection_date_t1"] = t.groupby("camis")["inspection_date_t"].shift(-1)
     t["grade_t1"] = t.groupby("camis")["grade_t"].shift(-1)
 
     # Label is based on next grade only; rows without a next inspection are dropped.
-    t = t[t["grade_t1"].notna()].copy()
+    t = cast(pd.DataFrame, t[t["grade_t1"].notna()]).copy()
     grade_t1 = cast(pd.Series, t["grade_t1"])
     t["y_t1"] = grade_t1.isin(list(FAIL_GRADES)).astype(int)
 
@@ -29,18 +69,324 @@ def build_supervised_dataset(raw: pd.DataFrame) -> pd.DataFrame:
     return cast(pd.DataFrame, t.reset_index(drop=True))
 
 
+def write_features(features: pd.DataFrame, path: Path) -> None:
+    # Unlabelled features of every inspection, including each restaurant's latest (the one
+    # that needs a prediction), sorted by restaurant and date.
+    out = features.sort_values(["camis", "inspection_date_t"], kind="mergesort", ignore_index=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    out.to_parquet(tmp, index=False)
+    tmp.replace(path)
+
+
+def build_supervised_dataset(
+    raw: pd.DataFrame, history: HistoryConfig = DEFAULT_HISTORY
+) -> pd.DataFrame:
+    return attach_labels(add_history_features(to_inspections(raw), history))
+
+
+def update_supervised_dataset(
+    dataset: pd.DataFrame,
+    state: pd.DataFrame,
+    raw_delta: pd.DataFrame,
+    history: HistoryConfig = DEFAULT_HISTORY,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Apply a raw delta to a dataset from `build_supervised_dataset`, returning (dataset, state).
+
+    Only restaurants present in the delta are recomputed, from their stored state (see
+    `rhgp.features.state`); the result equals a full rebuild over all raw rows. Deltas may
+    not predate a restaurant's latest stored inspection, which holds for snapshots appended
+    by `rhgp.data.fetch --incremental`; backfills need a full rebuild.
+    """
+    update = _delta_update(state, raw_delta, history)
+    if update is None:
+        return dataset, state
+    out = _replace_rows(dataset, update.replaced(dataset), update.fresh)
+    return cast(pd.DataFrame, out.reset_index(drop=True)), update.state
+
+
+@dataclass
+class _Update:
+    # Examples recomputed for the restaurants of a delta, which replace their stored
+    # examples dated on or after `start` (all of them for restaurants without one).
+    camis: pd.Series
+    start: dict[Any, Any]
+    fresh: pd.DataFrame
+    state: pd.DataFrame
+
+    def replaced(self, df: pd.DataFrame) -> np.ndarray:
+        return df["camis"].isin(self.camis).to_numpy() & _rows_since(df, self.start)
+
+
+def _delta_update(
+    state: pd.DataFrame, raw_delta: pd.DataFrame, history: HistoryConfig
+) -> _Update | None:
+    delta = to_inspections(raw_delta)
+    if delta.empty:
+        return None
+
+    camis = cast(pd.Series, delta["camis"])
+    affected = state["camis"].isin(camis).to_numpy()
+    prior = cast(pd.DataFrame, state[affected])
+    dates = cast(pd.Series, delta["inspection_date_t"])
+    if dates.isna().any() or cast(pd.Series, prior["inspection_date_t"]).isna().any():
+        raise ValueError("Incremental updates need inspection dates; rebuild the dataset in full")
+    latest = prior.groupby("camis")["inspection_date_t"].max().to_dict()
+    stale = dates < camis.map(latest)
+    if stale.any():
+        raise ValueError(
+            f"{int(stale.sum())} delta inspections predate the stored state; "
+            "rebuild the dataset in full"
+        )
+
+    # Examples of affected restaurants are recomputed from their second-to-last stored
+    # inspection onward, with the same feature and label code as a full build.
+    history_t = merge_inspections(prior, delta)
+    fresh = attach_labels(add_history_features(history_t, history))
+    start = emit_from(prior).to_dict()
+    fresh = cast(pd.DataFrame, fresh[_rows_since(fresh, start)])
+
+    unaffected = cast(pd.DataFrame, state[~affected])
+    new_state = pd.concat(
+        union_categories([unaffected, retained_state(history_t, history)]), ignore_index=True
+    )
+    new_state = new_state.sort_values(["camis", "inspection_date_t"], kind="mergesort")
+    return _Update(camis, start, fresh, cast(pd.DataFrame, new_state.reset_index(drop=True)))
+
+
+def _replace_rows(df: pd.DataFrame, replaced: np.ndarray, fresh: pd.DataFrame) -> pd.DataFrame:
+    kept = cast(pd.DataFrame, df[~replaced])
+    out = pd.concat(union_categories([kept, fresh]), ignore_index=True)
+    return cast(pd.DataFrame, out.sort_values(["camis", "inspection_date_t"], kind="mergesort"))
+
+
+def _rows_since(df: pd.DataFrame, start: dict[Any, Any]) -> np.ndarray:
+    # Rows on or after their restaurant's start date; restaurants without one match fully.
+    since = cast(pd.Series, df["camis"]).map(start)
+    return (since.isna() | (df["inspection_date_t"] >= since)).to_numpy()
+
+
+def update_dataset_partitions(
+    out_path: Path,
+    state: pd.DataFrame,
+    raw_delta: pd.DataFrame,
+    history: HistoryConfig = DEFAULT_HISTORY,
+) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Apply a raw delta to the partitioned dataset at `out_path` in place, returning the new
+    state and the `t1_month` partitions that were rewritten.
+
+    Same rows as `update_supervised_dataset`, but only months holding replaced or new
+    examples are read and rewritten. Applying a delta twice against the same `state` gives
+    the same dataset (its examples are replaced, not appended), so a run interrupted before
+    its state is committed can simply be repeated.
+    """
+    update = _delta_update(state, raw_delta, history)
+    if update is None:
+        return state, []
+    fresh_months = pd.to_datetime(update.fresh["inspection_date_t1"]).dt.strftime("%Y-%m")
+    months = set(fresh_months)
+    if update.start:
+        # Replaced examples are labelled after their restaurant's start date.
+        since = cast(pd.Timestamp, min(update.start.values()))
+        stored = read_dataset(
+            out_path,
+            columns=["camis", "inspection_date_t", PARTITION_COLUMN],
+            filter=ds.field("camis").isin(pa.array(update.camis.unique()))
+            & date_filter("inspection_date_t1", ">", since, out_path),
+        )
+        months |= set(stored.loc[update.replaced(stored), PARTITION_COLUMN])
+
+    parts = {}
+    for month in sorted(months):
+        path = partition_dir(out_path, month)
+        fresh = cast(pd.DataFrame, update.fresh[(fresh_months == month).to_numpy()])
+        old = read_dataset(path) if path.exists() else fresh.iloc[:0]
+        rows = _replace_rows(old, update.replaced(old), fresh)
+        parts[month] = cast(pd.DataFrame, rows.reset_index(drop=True))
+    replace_partitions(parts, out_path)
+    return update.state, sorted(months)
+
+
+def dataset_meta_path(path: Path) -> Path:
+    # Run metadata of the last build (mode, rows, per-stage perf) next to the dataset.
+    return path.with_suffix(".meta.json")
+
+
+def _state_meta(in_path: Path, history: HistoryConfig, partitions: list[str]) -> dict[str, Any]:
+    return {
+        "source": str(in_path),
+        "windows": list(history.windows),
+        "day_windows": list(history.day_windows),
+        "partitions": partitions,
+    }
+
+
+def build_incremental(
+    in_path: Path, out_path: Path, state_path: Path, history: HistoryConfig = DEFAULT_HISTORY
+) -> dict[str, Any]:
+    """
+    Build `out_path` from a partitioned raw snapshot, processing only partitions not yet in
+    the state at `state_path`.
+
+    Falls back to a full rebuild when there is no usable state: no prior output, a
+    single-file snapshot, or a state built from another source or history config.
+    """
+    parts = sorted(p.name for p in in_path.glob("part-*.parquet")) if in_path.is_dir() else []
+    meta = _state_meta(in_path, history, parts)
+    if parts and out_path.exists() and state_path.exists():
+        state, prev = read_state(state_path)
+        done = list(prev.get("partitions", []))
+        same = all(prev.get(k) == meta[k] for k in ("source", "windows", "day_windows"))
+        if same and done == parts[: len(done)]:
+            new = parts[len(done) :]
+            # A delta marked pending but missing from the committed state was cut off after
+            # rewriting some dataset months; it is among `new` and is applied again.
+            resumed = [n for n in pending_partitions(state_path) if n not in done]
+            months: list[str] = []
+            if new:
+                write_state_meta(state_path, {**prev, "pending": new})
+                delta = pd.concat([read_raw(in_path / n) for n in new], ignore_index=True)
+                state, months = update_dataset_partitions(out_path, state, delta, history)
+            # Committed last: until then the state still describes the previous run.
+            write_state(state_path, state, meta)
+            return {
+                **meta,
+                "mode": "incremental",
+                "new_partitions": new,
+                "rewritten_months": months,
+                "resumed_partitions": resumed,
+            }
+
+    t = to_inspections(read_raw(in_path))
+    dataset = attach_labels(add_history_features(t, history))
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    write_dataset(dataset, out_path)
+    write_state(state_path, retained_state(t, history), meta)
+    return {**meta, "mode": "full", "new_partitions": parts}
+
+
+def _build_shard(task: tuple[Path, Path, int, HistoryConfig, list[str]]) -> int:
+    shard_path, out_root, shard, history, inspection_types = task
+    t = to_inspections(read_raw(shard_path))
+    # One category set across shards keeps dtypes equal to a single-process build.
+    t["inspection_type"] = t["inspection_type"].cat.set_categories(inspection_types)
+    dataset = attach_labels(add_history_features(t, history))
+    write_fragments(dataset, out_root, name=f"part-{shard:05d}")
+    return len(dataset)
+
+
+def build_sharded(
+    in_path: Path,
+    out_path: Path,
+    history: HistoryConfig = DEFAULT_HISTORY,
+    workers: int = 1,
+    shards: int = 16,
+    batch_rows: int = 1_000_000,
+) -> int:
+    """
+    Build `out_path` with restaurants hash-partitioned into `shards`, each built in a pool
+    of `workers` processes; returns the number of examples.
+
+    Every step is per `camis`, so shards are independent and each writes its own fragments
+    (`t1_month=.../part-<shard>-<i>.parquet`). The files depend on `shards` but not on
+    `workers`, and hold the same rows as `build_supervised_dataset`. Peak memory is about
+    one shard per worker (plus one `batch_rows` batch while splitting).
+    """
+    staged = staging_path(out_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths, inspection_types = split_raw(in_path, Path(tmp), shards, batch_rows)
+        tasks = [(p, staged, s, history, inspection_types) for s, p in paths.items()]
+        if workers > 1:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                rows = sum(pool.map(_build_shard, tasks))
+        else:
+            rows = sum(map(_build_shard, tasks))
+    replace_dataset(staged, out_path)
+    return rows
+
+
 def main(argv: list[str] | None = None) -> int:
     p = argparse.ArgumentParser(
         description="Build supervised dataset: features at t, label from t+1."
     )
     p.add_argument("--in", dest="in_path", type=Path, required=True)
     p.add_argument("--out", dest="out_path", type=Path, required=True)
+    p.add_argument(
+        "--windows",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_HISTORY.windows),
+        help="Prior-inspection count windows for history means (e.g. 1 3 5).",
+    )
+    p.add_argument(
+        "--day-windows",
+        type=int,
+        nargs="*",
+        default=list(DEFAULT_HISTORY.day_windows),
+        help="Time windows in days for history means (e.g. 365).",
+    )
+    p.add_argument(
+        "--state",
+        type=Path,
+        default=None,
+        help="Per-restaurant feature state; with a partitioned --in directory, later runs "
+        "only process new partitions.",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Build in restaurant shards with this many processes (output is identical for "
+        "any worker count).",
+    )
+    p.add_argument("--shards", type=int, default=16, help="Restaurant shards for --workers.")
+    p.add_argument(
+        "--features-out",
+        type=Path,
+        default=None,
+        help="Also write unlabelled features for every inspection (parquet), for scoring.",
+    )
+    add_profile_argument(p)
     args = p.parse_args(argv)
+    if args.workers is not None and args.state is not None:
+        p.error("--workers cannot be combined with --state")
+    if args.features_out is not None and (args.workers is not None or args.state is not None):
+        p.error("--features-out requires a full build (no --workers or --state)")
+
+    history = HistoryConfig(windows=tuple(args.windows), day_windows=tuple(args.day_windows))
+    perf = PerfRecorder(args.profile)
+    if args.state is not None:
+        with perf.stage("build"):
+            meta = build_incremental(args.in_path, args.out_path, args.state, history)
+    elif args.workers is not None:
+        with perf.stage("build") as stage:
+            stage.rows = build_sharded(
+                args.in_path, args.out_path, history, args.workers, args.shards
+            )
+        meta = {"mode": "sharded", "workers": args.workers, "shards": args.shards}
+    else:
+        with perf.stage("read") as stage:
+            raw = read_raw(args.in_path)
+            stage.rows = len(raw)
+        with perf.stage("aggregate", rows=len(raw)):
+            t = to_inspections(raw)
+        with perf.stage("features", rows=len(t)):
+            features = add_history_features(t, history)
+            ds = attach_labels(features)
+        args.out_path.parent.mkdir(parents=True, exist_ok=True)
+        with perf.stage("write", rows=len(ds)):
+            write_dataset(ds, args.out_path)
+        meta = {"mode": "full", "rows": len(ds)}
+        if args.features_out is not None:
+            with perf.stage("write_features", rows=len(features)):
+                write_features(features, args.features_out)
+            meta["features_rows"] = len(features)
 
-    raw = pd.read_parquet(args.in_path)
-    ds = build_supervised_dataset(raw)
-    args.out_path.parent.mkdir(parents=True, exist_ok=True)
-    ds.to_parquet(args.out_path, index=False)
+    meta_path = dataset_meta_path(args.out_path)
+    meta_path.write_text(json.dumps({**meta, "perf": perf.to_dict()}, indent=2) + "\n")
     return 0
 
 
@@ -1,23 +1,112 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import cast
+
+import numpy as np
 import pandas as pd
 
 
-def add_history_features(inspections_t: pd.DataFrame) -> pd.DataFrame:
-    df = inspections_t.sort_values(["camis", "inspection_date_t"]).copy()
+@dataclass(frozen=True)
+class HistoryConfig:
+    # Previous-inspection values (prev1), e.g. grade_t -> prev_grade.
+    lag_columns: tuple[str, ...] = (
+        "grade_t",
+        "score_t",
+        "n_violations_t",
+        "n_critical_violations_t",
+    )
+    # Means over prior inspections, e.g. score_t -> score_t_mean_prev3.
+    mean_columns: tuple[str, ...] = ("score_t", "n_violations_t", "n_critical_violations_t")
+    # Count windows: the last N prior inspections.
+    windows: tuple[int, ...] = (3,)
+    # Time windows: prior inspections in (t - N days, t), e.g. score_t_mean_prev365d; also
+    # adds the count n_inspections_prevNd.
+    day_windows: tuple[int, ...] = ()
+
+    def feature_names(self) -> list[str]:
+        names = [lag_name(c) for c in self.lag_columns]
+        names += [f"{c}_mean_prev{w}" for w in self.windows for c in self.mean_columns]
+        for d in self.day_windows:
+            names += [f"{c}_mean_prev{d}d" for c in self.mean_columns]
+            names.append(f"n_inspections_prev{d}d")
+        return names
+
+
+DEFAULT_HISTORY = HistoryConfig()
+
+
+def lag_name(col: str) -> str:
+    return "prev_" + col.removesuffix("_t")
+
+
+def _lagged(s: pd.Series, prev: np.ndarray, valid: np.ndarray) -> pd.Series:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes = np.where(valid, s.cat.codes.to_numpy()[prev], -1)
+        return pd.Series(pd.Categorical.from_codes(codes, dtype=s.dtype), index=s.index)
+    if s.dtype.kind in "iufb":
+        values = s.to_numpy(dtype=np.float32 if s.dtype == np.float32 else np.float64)
+        missing = np.array(np.nan, dtype=values.dtype)
+        return pd.Series(np.where(valid, values[prev], missing), index=s.index)
+    return s.iloc[prev].where(valid).set_axis(s.index)
+
+
+def _window_mean(values: np.ndarray, lo: np.ndarray) -> np.ndarray:
+    # Mean of non-null values at positions [lo, i) for every row i via prefix sums.
+    present = ~np.isnan(values)
+    csum = np.concatenate([[0.0], np.cumsum(np.where(present, values, 0.0))])
+    ccnt = np.concatenate([[0], np.cumsum(present)])
+    hi = np.arange(len(values))
+    n = ccnt[hi] - ccnt[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (csum[hi] - csum[lo]) / np.maximum(n, 1), np.nan)
+
+
+def add_history_features(
+    inspections_t: pd.DataFrame, config: HistoryConfig = DEFAULT_HISTORY
+) -> pd.DataFrame:
+    """
+    Attach history features built strictly from inspections before `t` (per `camis`).
+
+    Sorts once, then computes every lag and window mean with offset arithmetic on group
+    start positions, so the cost is a handful of vectorized passes regardless of the number
+    of restaurants.
+    """
+    df = inspections_t.sort_values(["camis", "inspection_date_t"], kind="mergesort").copy()
+    n = len(df)
+    pos = np.arange(n)
+    camis = df["camis"].to_numpy()
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = camis[1:] != camis[:-1]
+    start = np.maximum.accumulate(np.where(new_group, pos, 0))
 
     # Previous inspection summaries (strictly < t).
-    df["prev_grade"] = df.groupby("camis")["grade_t"].shift(1)
-    df["prev_score"] = df.groupby("camis")["score_t"].shift(1)
-    df["prev_n_violations"] = df.groupby("camis")["n_violations_t"].shift(1)
-    df["prev_n_critical_violations"] = df.groupby("camis")["n_critical_violations_t"].shift(1)
-
-    # Rolling means over prior inspections (exclude current via shift(1)).
-    for col in ["score_t", "n_violations_t", "n_critical_violations_t"]:
-        df[f"{col}_mean_prev3"] = (
-            df.groupby("camis")[col]
-            .apply(lambda s: s.shift(1).rolling(3, min_periods=1).mean())
-            .reset_index(level=0, drop=True)
-        )
-    return df
+    prev = np.maximum(pos - 1, 0)
+    has_prev = pos > start
+    for col in config.lag_columns:
+        df[lag_name(col)] = _lagged(cast(pd.Series, df[col]), prev, has_prev)
 
+    # Means over prior inspections (exclude current): window rows are [lo, i).
+    lows = {f"prev{w}": np.maximum(pos - w, start) for w in config.windows}
+    if config.day_windows:
+        dates = df["inspection_date_t"].to_numpy(dtype="datetime64[D]")
+        nat = np.isnat(dates)
+        days = dates.astype(np.int64)
+        valid_days = days[~nat]
+        # Missing dates sort last within a restaurant; pin them to the max to keep keys sorted.
+        days = np.where(nat, valid_days.max(initial=0), days) - valid_days.min(initial=0)
+        # Offset each restaurant into its own key range so one global searchsorted finds
+        # every window start without crossing restaurants.
+        stride = int(days.max(initial=0)) + max(config.day_windows) + 1
+        key = (np.cumsum(new_group) - 1) * stride + days
+        for d in config.day_windows:
+            lo = np.maximum(np.searchsorted(key, key - d, side="right"), start)
+            lows[f"prev{d}d"] = np.where(nat, pos, lo)
+
+    means = {c: df[c].to_numpy(dtype=np.float64, na_value=np.nan) for c in config.mean_columns}
+    for suffix, lo in lows.items():
+        for col, values in means.items():
+            df[f"{col}_mean_{suffix}"] = _window_mean(values, lo)
+        if suffix.endswith("d"):
+            df[f"n_inspections_{suffix}"] = pos - lo
+    return df
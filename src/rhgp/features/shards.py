@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from rhgp.data.schema import COLS, raw_arrow_schema
+
+# Hash-partitioning of raw snapshots by restaurant for sharded dataset builds: every
+# transformation is per `camis`, so each shard can be built independently.
+
+
+def shard_of(camis: np.ndarray, n_shards: int) -> np.ndarray:
+    # Multiplicative (Knuth) hash: stable across runs and machines, unlike Python's `hash`,
+    # and spreads sequential ids evenly.
+    h = (camis.astype(np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)
+    return (h % np.uint64(n_shards)).astype(np.int64)
+
+
+def split_raw(
+    in_path: Path, out_dir: Path, n_shards: int, batch_rows: int = 1_000_000
+) -> tuple[dict[int, Path], list[str]]:
+    """
+    Stream a raw snapshot (file or partition directory) into per-shard parquet files.
+
+    Holds one batch of `batch_rows` rows at a time; rows keep their snapshot order within a
+    shard. Returns the non-empty shard files and every `inspection_type` value seen, so
+    shards can share one category set.
+    """
+    dataset = ds.dataset(in_path, format="parquet")
+    schema = raw_arrow_schema(dataset.schema.names)
+    writers: dict[int, pq.ParquetWriter] = {}
+    types: set[str] = set()
+    try:
+        for batch in dataset.to_batches(batch_size=batch_rows, use_threads=False):
+            table = pa.Table.from_batches([batch]).cast(schema)
+            if COLS.inspection_type in schema.names:
+                for chunk in table.column(COLS.inspection_type).chunks:
+                    types.update(chunk.dictionary.to_pylist())
+            shard = shard_of(table.column(COLS.camis).to_numpy(), n_shards)
+            order = np.argsort(shard, kind="stable")
+            bounds = np.searchsorted(shard[order], np.arange(n_shards + 1))
+            table = table.take(order)
+            for s in range(n_shards):
+                lo, hi = int(bounds[s]), int(bounds[s + 1])
+                if hi == lo:
+                    continue
+                if s not in writers:
+                    writers[s] = pq.ParquetWriter(out_dir / f"shard-{s:05d}.parquet", schema)
+                writers[s].write_table(table.slice(lo, hi - lo))
+    finally:
+        for w in writers.values():
+            w.close()
+    return {s: out_dir / f"shard-{s:05d}.parquet" for s in sorted(writers)}, sorted(types)
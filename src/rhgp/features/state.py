@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from rhgp.features.features import HistoryConfig
+
+# Per-restaurant feature state for incremental dataset builds: the most recent inspection
+# summaries of every `camis`, i.e. exactly the inspection-level rows that history features
+# and labels of future inspections can still depend on.
+
+STATE_COLUMNS = [
+    "camis",
+    "inspection_date_t",
+    "inspection_type",
+    "grade_t",
+    "score_t",
+    "n_violations_t",
+    "n_critical_violations_t",
+]
+_COUNT_COLUMNS = ["n_violations_t", "n_critical_violations_t"]
+
+
+def state_meta_path(path: Path) -> Path:
+    return path.with_suffix(".meta.json")
+
+
+def union_categories(frames: list[pd.DataFrame]) -> list[pd.DataFrame]:
+    # Align categorical columns to one sorted category set so concat keeps them categorical.
+    out = [f.copy() for f in frames]
+    for c in out[0].columns:
+        dtypes = [f[c].dtype for f in out if c in f.columns]
+        if not all(isinstance(d, pd.CategoricalDtype) for d in dtypes):
+            continue
+        cats = sorted(set().union(*(cast(pd.CategoricalDtype, d).categories for d in dtypes)))
+        dtype = pd.CategoricalDtype(cats)
+        for f in out:
+            if c in f.columns:
+                f[c] = f[c].cat.set_categories(dtype.categories)
+    return out
+
+
+def _from_end(t: pd.DataFrame) -> np.ndarray:
+    # 0 for each restaurant's latest inspection, 1 for the one before, ...
+    return t.groupby("camis", sort=False).cumcount(ascending=False).to_numpy()
+
+
+def retained_state(inspections_t: pd.DataFrame, history: HistoryConfig) -> pd.DataFrame:
+    """
+    Rows to keep per `camis` so the next update can recompute its affected examples.
+
+    An update re-emits examples from each restaurant's second-to-last inspection onward
+    (its label is the next grade, which a same-day delta may still change), so the state
+    keeps that inspection's full history window: the prior `max(windows)` inspections and
+    every inspection inside the longest day window.
+    """
+    t = inspections_t.sort_values(["camis", "inspection_date_t"], kind="mergesort")
+    from_end = _from_end(t)
+    keep = from_end < max([1, *history.windows]) + 2
+    if history.day_windows:
+        dates = cast(pd.Series, t["inspection_date_t"])
+        second_last = dates.where(from_end == 1).groupby(t["camis"]).transform("max")
+        horizon = cast(pd.Series, second_last) - pd.Timedelta(days=max(history.day_windows))
+        keep |= (dates > horizon).to_numpy()
+    return cast(pd.DataFrame, t.loc[keep, STATE_COLUMNS].reset_index(drop=True))
+
+
+def emit_from(state_rows: pd.DataFrame) -> pd.Series:
+    # Per-camis date from which examples must be recomputed: the second-to-last inspection.
+    rows = state_rows.sort_values(["camis", "inspection_date_t"], kind="mergesort")
+    second_last = rows.loc[_from_end(rows) == 1]
+    return cast(pd.Series, second_last.set_index("camis")["inspection_date_t"])
+
+
+def merge_inspections(state_rows: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """
+    Stored inspection summaries plus a delta, as the full-snapshot aggregation would see them.
+
+    A delta may carry further violation rows of an already stored inspection (the watermark
+    day is re-fetched): counts add up and the other fields keep the first non-null value,
+    stored rows first.
+    """
+    combined = pd.concat(union_categories([state_rows, delta]), ignore_index=True)
+    merged = (
+        combined.groupby(["camis", "inspection_date_t"], dropna=False, sort=True)
+        .agg(
+            inspection_type=("inspection_type", "first"),
+            grade_t=("grade_t", "first"),
+            score_t=("score_t", "first"),
+            n_violations_t=("n_violations_t", "sum"),
+            n_critical_violations_t=("n_critical_violations_t", "sum"),
+        )
+        .reset_index()
+    )
+    return cast(pd.DataFrame, merged[STATE_COLUMNS])
+
+
+_META_KEY = b"rhgp.state"
+
+
+def write_state_meta(path: Path, meta: dict[str, Any]) -> None:
+    # Readable sidecar copy of the state meta (and the marker of a delta being applied).
+    meta_path = state_meta_path(path)
+    tmp = meta_path.with_name(meta_path.name + ".tmp")
+    tmp.write_text(json.dumps(meta, indent=2, sort_keys=True) + "\n")
+    tmp.replace(meta_path)
+
+
+def write_state(path: Path, state: pd.DataFrame, meta: dict[str, Any]) -> None:
+    """
+    Write `state` with its `meta` embedded in the parquet footer, so both are committed by
+    one rename; the `.meta.json` sidecar is refreshed afterwards.
+    """
+    # Compact on disk: counts fit int32 (dates, categories and float32 scores already do).
+    table = pa.Table.from_pandas(state, preserve_index=False)
+    for c in _COUNT_COLUMNS:
+        table = table.set_column(
+            table.schema.get_field_index(c), c, table.column(c).cast(pa.int32())
+        )
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), _META_KEY: json.dumps(meta, sort_keys=True).encode()}
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(table, tmp)
+    tmp.replace(path)
+    write_state_meta(path, meta)
+
+
+def read_state(path: Path) -> tuple[pd.DataFrame, dict[str, Any]]:
+    state = pd.read_parquet(path)
+    for c in _COUNT_COLUMNS:
+        state[c] = state[c].astype(np.int64)
+    embedded = (pq.read_schema(path).metadata or {}).get(_META_KEY)
+    if embedded is None:
+        # States written before the meta was embedded only have the sidecar.
+        return state, json.loads(state_meta_path(path).read_text())
+    return state, json.loads(embedded)
+
+
+def pending_partitions(path: Path) -> list[str]:
+    # Raw partitions of a delta whose run stopped before committing the state at `path`.
+    meta_path = state_meta_path(path)
+    if not meta_path.exists():
+        return []
+    return list(json.loads(meta_path.read_text()).get("pending", []))
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from rhgp.data.dataset import read_dataset
+from rhgp.models.baselines import always_a_proba, grade_conditional_fail_rate, persistence_proba
+from rhgp.models.sweep import threshold_sweep
+from rhgp.models.train import LABEL_COLUMNS, build_pipeline, feature_columns
+from rhgp.models.train_rf import build_rf_pipeline
+
+# Rolling-origin backtest: for each monthly cutoff, train on examples whose label date is
+# before it and test on the following `horizon` months. The dataset is loaded once and
+# sorted by label date, so every fold is a pair of row ranges. Parallel runs write its
+# columns once as .npy files that every worker memory-maps, so tasks only ship row ranges.
+
+MODELS = ("logreg", "rf")
+
+
+@dataclass(frozen=True)
+class Fold:
+    fold: int
+    cutoff: pd.Timestamp
+    test_end: pd.Timestamp
+    train_lo: int
+    train_hi: int
+    test_lo: int
+    test_hi: int
+
+
+def sort_by_label_date(df: pd.DataFrame) -> pd.DataFrame:
+    # Stable, so ties keep file order.
+    order = np.argsort(df["inspection_date_t1"].to_numpy(), kind="stable")
+    return df.take(order).reset_index(drop=True)
+
+
+def load_sorted(path: Path) -> pd.DataFrame:
+    # Only the modelled columns, ordered by label date.
+    return sort_by_label_date(read_dataset(path, columns=feature_columns() + LABEL_COLUMNS))
+
+
+def monthly_cutoffs(t1: pd.Series, folds: int, start: str | None = None) -> list[pd.Timestamp]:
+    # Month starts from `start` (or the last `folds` months with labels) onward.
+    months = pd.DatetimeIndex(t1.dropna()).to_period("M").unique().sort_values().to_timestamp()
+    if start is not None:
+        months = months[months >= pd.Timestamp(start)]
+        return list(months[:folds])
+    return list(months[-folds:])
+
+
+def make_folds(
+    t1: pd.Series,
+    cutoffs: list[pd.Timestamp],
+    horizon_months: int = 1,
+    train_months: int | None = None,
+) -> list[Fold]:
+    """
+    Row ranges of a label-date-sorted frame: training is everything before the cutoff (or
+    the last `train_months` months), testing the `horizon_months` months from it.
+    """
+    values = t1.to_numpy()
+
+    def position(ts: pd.Timestamp) -> int:
+        return int(np.searchsorted(values, np.datetime64(ts, "ns")))
+
+    folds = []
+    for i, cutoff in enumerate(cutoffs):
+        test_end = cast(pd.Timestamp, cutoff + pd.DateOffset(months=horizon_months))
+        lo = 0
+        if train_months is not None:
+            lo = position(cast(pd.Timestamp, cutoff - pd.DateOffset(months=train_months)))
+        hi = position(cutoff)
+        folds.append(Fold(i, cutoff, test_end, lo, hi, hi, position(test_end)))
+    return folds
+
+
+def build_model(model: str, n_jobs: int | None = None) -> Pipeline:
+    if model == "rf":
+        pipe = build_rf_pipeline()
+        if n_jobs is not None:
+            pipe.set_params(clf__n_jobs=n_jobs)
+        return pipe
+    return build_pipeline()
+
+
+def fold_metrics(
+    df: pd.DataFrame, fold: Fold, model: str, threshold: float, n_jobs: int | None = None
+) -> list[dict[str, Any]]:
+    # Fit on the fold's training rows and score the model and every baseline on its test rows.
+    train = df.iloc[fold.train_lo : fold.train_hi]
+    test = df.iloc[fold.test_lo : fold.test_hi]
+    y_train = train["y_t1"].astype(int)
+    y_test = test["y_t1"].astype(int).to_numpy()
+
+    t0 = time.perf_counter()
+    pipe = build_model(model, n_jobs)
+    pipe.fit(train.loc[:, feature_columns()], y_train)
+    fit_s = time.perf_counter() - t0
+    probas = {
+        model: pipe.predict_proba(test.loc[:, feature_columns()])[:, 1],
+        "always_a": always_a_proba(test).to_numpy(),
+        "persistence": persistence_proba(test).to_numpy(),
+        "grade_conditional": grade_conditional_fail_rate(train, test).to_numpy(),
+    }
+
+    rows = []
+    for name, proba in probas.items():
+        sweep = threshold_sweep(y_test, proba)
+        row = sweep.rows([threshold])[0]
+        rows.append(
+            {
+                "fold": fold.fold,
+                "cutoff": fold.cutoff.date().isoformat(),
+                "test_end": fold.test_end.date().isoformat(),
+                "n_train": fold.train_hi - fold.train_lo,
+                "n_test": fold.test_hi - fold.test_lo,
+                "model": name,
+                "precision_fail": row["precision_fail"],
+                "recall_fail": row["recall_fail"],
+                "f1_fail": row["f1_fail"],
+                "pr_auc": sweep.pr_auc(),
+                "roc_auc": sweep.roc_auc(),
+                "fold_s": time.perf_counter() - t0,
+                "fit_s": fit_s if name == model else None,
+            }
+        )
+    return rows
+
+
+# Column name -> categories of a categorical column (stored as its codes), or None.
+ColumnSpec = dict[str, list[Any] | None]
+
+
+def share_columns(df: pd.DataFrame, work_dir: Path) -> ColumnSpec:
+    # One .npy per column; categoricals are stored as their integer codes.
+    spec: ColumnSpec = {}
+    for name in df.columns:
+        col = df[name]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            np.save(work_dir / f"{name}.npy", col.cat.codes.to_numpy())
+            spec[name] = list(col.cat.categories)
+        else:
+            np.save(work_dir / f"{name}.npy", col.to_numpy())
+            spec[name] = None
+    return spec
+
+
+def open_columns(work_dir: Path, spec: ColumnSpec) -> pd.DataFrame:
+    """
+    Frame over the memory-mapped columns written by `share_columns`. Columns are not
+    consolidated and categoricals wrap the mapped codes, so neither the frame nor its row
+    slices copy the data.
+    """
+    columns: dict[str, Any] = {}
+    for name, categories in spec.items():
+        # Plain ndarray views of the maps, so the frame behaves like a loaded one.
+        arr = np.asarray(np.load(work_dir / f"{name}.npy", mmap_mode="r"))
+        if categories is not None:
+            dtype = pd.CategoricalDtype(categories)
+            arr = pd.Categorical.from_codes(arr, dtype=dtype, validate=False)
+        columns[name] = arr
+    return pd.DataFrame(columns, copy=False)
+
+
+# Worker-process view of the shared dataset, opened once by `_init_worker`.
+_DATA: pd.DataFrame | None = None
+
+
+def _init_worker(work_dir: Path, spec: ColumnSpec) -> None:
+    global _DATA
+    _DATA = open_columns(work_dir, spec)
+
+
+def _run_fold(task: tuple[Fold, str, float]) -> list[dict[str, Any]]:
+    assert _DATA is not None
+    fold, model, threshold = task
+    return fold_metrics(_DATA, fold, model, threshold, n_jobs=1)
+
+
+def backtest(
+    path: Path,
+    model: str = "logreg",
+    folds: int = 12,
+    start: str | None = None,
+    horizon_months: int = 1,
+    train_months: int | None = None,
+    threshold: float = 0.5,
+    workers: int = 1,
+) -> tuple[pd.DataFrame, list[Fold]]:
+    """
+    Per-fold metrics for `model` and the baselines over monthly cutoffs.
+
+    With `workers > 1`, folds run in a process pool whose workers memory-map one shared copy
+    of the dataset; the result is the same as a serial run.
+    """
+    df = load_sorted(path)
+    t1 = cast(pd.Series, df["inspection_date_t1"])
+    cutoffs = monthly_cutoffs(t1, folds, start)
+    fold_list = [
+        f
+        for f in make_folds(t1, cutoffs, horizon_months, train_months)
+        if f.train_hi > f.train_lo and f.test_hi > f.test_lo
+    ]
+    if workers <= 1 or len(fold_list) <= 1:
+        parts = [fold_metrics(df, f, model, threshold) for f in fold_list]
+    else:
+        ctx = mp.get_context("spawn")
+        tasks = [(f, model, threshold) for f in fold_list]
+        # Largest folds first, so the pool is not left waiting on a late long fold.
+        order = sorted(range(len(tasks)), key=lambda i: -fold_list[i].train_hi)
+        with tempfile.TemporaryDirectory(prefix="rhgp-backtest-") as tmp:
+            spec = share_columns(df, Path(tmp))
+            del df, t1
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(Path(tmp), spec),
+            ) as pool:
+                done = pool.map(_run_fold, [tasks[i] for i in order])
+                results = dict(zip(order, done, strict=True))
+        parts = [results[i] for i in range(len(tasks))]
+    return pd.DataFrame([row for part in parts for row in part]), fold_list
+
+
+def summarize(table: pd.DataFrame) -> dict[str, dict[str, dict[str, float]]]:
+    # Mean/std/min/max of each metric per model across folds.
+    metrics = ["precision_fail", "recall_fail", "f1_fail", "pr_auc", "roc_auc"]
+    out: dict[str, dict[str, dict[str, float]]] = {}
+    for name, g in table.groupby("model", sort=False):
+        out[str(name)] = {
+            m: {
+                "mean": float(g[m].mean()),
+                "std": float(g[m].std(ddof=0)),
+                "min": float(g[m].min()),
+                "max": float(g[m].max()),
+            }
+            for m in metrics
+        }
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Rolling-origin backtest over monthly cutoffs.")
+    p.add_argument("--data", type=Path, required=True)
+    p.add_argument("--out-dir", type=Path, required=True)
+    p.add_argument("--model", choices=MODELS, default="logreg")
+    p.add_argument("--folds", type=int, default=12, help="Number of monthly cutoffs.")
+    p.add_argument(
+        "--start",
+        type=str,
+        default=None,
+        help="First cutoff month (YYYY-MM; default: the last --folds label months).",
+    )
+    p.add_argument("--horizon-months", type=int, default=1)
+    p.add_argument(
+        "--train-months",
+        type=int,
+        default=None,
+        help="Sliding training window in months (default: expanding window).",
+    )
+    p.add_argument("--threshold", type=float, default=0.5)
+    p.add_argument("--workers", type=int, default=1, help="Processes running folds in parallel.")
+    args = p.parse_args(argv)
+
+    t0 = time.perf_counter()
+    table, fold_list = backtest(
+        args.data,
+        model=args.model,
+        folds=args.folds,
+        start=args.start,
+        horizon_months=args.horizon_months,
+        train_months=args.train_months,
+        threshold=args.threshold,
+        workers=args.workers,
+    )
+    wall_s = time.perf_counter() - t0
+
+    fold_s = table.groupby("fold")["fold_s"].max()
+    summary = {
+        "model": args.model,
+        "n_folds": len(fold_list),
+        "horizon_months": args.horizon_months,
+        "train_months": args.train_months,
+        "threshold": float(args.threshold),
+        "workers": args.workers,
+        "wall_s": wall_s,
+        "fold_s_total": float(fold_s.sum()),
+        "folds": [
+            {
+                **asdict(f),
+                "cutoff": f.cutoff.date().isoformat(),
+                "test_end": f.test_end.date().isoformat(),
+            }
+            for f in fold_list
+        ],
+        "metrics": summarize(table),
+    }
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    table.to_csv(args.out_dir / "backtest.csv", index=False)
+    (args.out_dir / "backtest.json").write_text(json.dumps(summary, indent=2))
+    cols = ["cutoff", "model", "n_test", "precision_fail", "recall_fail", "f1_fail", "pr_auc"]
+    print(table.loc[:, cols].round(3).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
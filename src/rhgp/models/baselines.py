@@ -31,10 +31,11 @@ def grade_conditional_fail_rate(train_df: pd.DataFrame, test_df: pd.DataFrame) -
     train_grade = cast(pd.Series, train_df["grade_t"])
     train_y = cast(pd.Series, train_df["y_t1"]).astype(int)
 
-    rates = cast(pd.Series, train_y.groupby(train_grade).mean())
+    rates = cast(pd.Series, train_y.groupby(train_grade, observed=True).mean())
     overall = float(train_y.mean()) if len(train_y) else 0.0
 
-    test_grade = cast(pd.Series, test_df["grade_t"])
+    # Map through object values so categorical grades yield a float series.
+    test_grade = cast(pd.Series, test_df["grade_t"]).astype(object)
     out = test_grade.map(rates).fillna(overall).astype(float)
     out.name = "p_fail"
     return out
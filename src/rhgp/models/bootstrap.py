@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+
+# Restaurant-clustered bootstrap for FAIL precision/recall/F1. Inspections of one restaurant
+# are correlated, so a resample draws whole restaurants (`camis`) with replacement. Each
+# restaurant is reduced once to its (tp, fp, fn) counts per model; a resample is then a
+# weight vector over restaurants and its totals are one matrix product.
+
+METRICS = ("precision_fail", "recall_fail", "f1_fail")
+_DRAWS_PER_BATCH = 4_000_000
+_RESAMPLES_PER_TASK = 500
+
+
+def cluster_counts(
+    clusters: np.ndarray, y_true: np.ndarray, preds: dict[str, np.ndarray]
+) -> np.ndarray:
+    """
+    (n_clusters, 3 * len(preds)) matrix of per-cluster tp, fp, fn for each predictor, with
+    clusters in sorted order (so the same seed resamples the same restaurants across runs).
+    """
+    _, codes = np.unique(clusters, return_inverse=True)
+    n_clusters = int(codes.max()) + 1 if len(codes) else 0
+    y = np.asarray(y_true).astype(bool)
+    cols = []
+    for pred in preds.values():
+        pred = np.asarray(pred).astype(bool)
+        for hit in (pred & y, pred & ~y, ~pred & y):
+            cols.append(np.bincount(codes, weights=hit, minlength=n_clusters))
+    return np.column_stack(cols) if cols else np.zeros((n_clusters, 0))
+
+
+def _resample_totals(task: tuple[np.ndarray, int, np.random.SeedSequence]) -> np.ndarray:
+    counts, n_resamples, seed = task
+    rng = np.random.default_rng(seed)
+    n_clusters = counts.shape[0]
+    batch = max(1, _DRAWS_PER_BATCH // max(n_clusters, 1))
+    out = np.empty((n_resamples, counts.shape[1]))
+    for lo in range(0, n_resamples, batch):
+        b = min(batch, n_resamples - lo)
+        draws = rng.integers(0, n_clusters, size=(b, n_clusters))
+        draws += (np.arange(b) * n_clusters)[:, None]
+        weights = np.bincount(draws.ravel(), minlength=b * n_clusters).reshape(b, n_clusters)
+        out[lo : lo + b] = weights @ counts
+    return out
+
+
+def resample_totals(
+    counts: np.ndarray, n_resamples: int, seed: int = 0, workers: int = 1
+) -> np.ndarray:
+    """
+    (n_resamples, n_columns) column totals of `counts` over cluster resamples.
+
+    Resamples are cut into fixed tasks with their own child seeds, so the result depends on
+    `seed` only, never on `workers`.
+    """
+    sizes = [
+        min(_RESAMPLES_PER_TASK, n_resamples - lo)
+        for lo in range(0, n_resamples, _RESAMPLES_PER_TASK)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(counts, n, s) for n, s in zip(sizes, seeds, strict=True)]
+    if workers <= 1 or len(tasks) <= 1:
+        parts = [_resample_totals(t) for t in tasks]
+    else:
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            parts = list(pool.map(_resample_totals, tasks))
+    return np.concatenate(parts) if parts else np.empty((0, counts.shape[1]))
+
+
+def _metrics(tp: np.ndarray, fp: np.ndarray, fn: np.ndarray) -> dict[str, np.ndarray]:
+    def ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+        return np.divide(num, den, out=np.zeros_like(num, dtype=np.float64), where=den > 0)
+
+    return {
+        "precision_fail": ratio(tp, tp + fp),
+        "recall_fail": ratio(tp, tp + fn),
+        "f1_fail": ratio(2 * tp, 2 * tp + fp + fn),
+    }
+
+
+def _interval(samples: np.ndarray, level: float) -> dict[str, float]:
+    lo, hi = np.quantile(samples, [(1 - level) / 2, (1 + level) / 2])
+    return {"low": float(lo), "high": float(hi), "std": float(np.std(samples))}
+
+
+def bootstrap_metrics(
+    clusters: np.ndarray,
+    y_true: np.ndarray,
+    preds: dict[str, np.ndarray],
+    n_resamples: int = 1000,
+    level: float = 0.95,
+    seed: int = 0,
+    workers: int = 1,
+) -> dict[str, Any]:
+    """
+    Percentile CIs of FAIL precision/recall/F1 for each named 0/1 prediction vector, plus CIs
+    of the difference between the first predictor and each other one on the same resamples.
+    """
+    counts = cluster_counts(clusters, y_true, preds)
+    totals = resample_totals(counts, n_resamples, seed=seed, workers=workers)
+    names = list(preds)
+    samples = {
+        name: _metrics(totals[:, 3 * i], totals[:, 3 * i + 1], totals[:, 3 * i + 2])
+        for i, name in enumerate(names)
+    }
+    out: dict[str, Any] = {
+        "n_resamples": n_resamples,
+        "level": level,
+        "seed": seed,
+        "n_clusters": int(counts.shape[0]),
+    }
+    for name in names:
+        out[name] = {m: _interval(samples[name][m], level) for m in METRICS}
+    for name in names[1:]:
+        out[f"{names[0]}_minus_{name}"] = {
+            m: _interval(samples[names[0]][m] - samples[name][m], level) for m in METRICS
+        }
+    return out
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+
+# Content-addressed cache of fitted preprocessors and transformed design matrices. An entry
+# is keyed by everything its contents depend on (dataset fingerprint, split cutoff, feature
+# list, preprocessor spec), so a changed input simply misses; stale entries are evicted.
+
+
+@dataclass
+class DesignMatrices:
+    key: str
+    preprocessor: Any
+    X_train: Any
+    y_train: np.ndarray
+    X_test: Any
+    y_test: np.ndarray
+
+
+@dataclass
+class DesignCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stored: int = 0
+    evicted: int = 0
+
+
+def design_key(parts: dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _save_matrix(path: Path, X: Any) -> Path:
+    if sp.issparse(X):
+        out = path.with_suffix(".npz")
+        sp.save_npz(out, sp.csr_matrix(X), compressed=False)
+    else:
+        out = path.with_suffix(".npy")
+        np.save(out, np.asarray(X))
+    return out
+
+
+def _load_matrix(path: Path) -> Any:
+    npz = path.with_suffix(".npz")
+    return sp.load_npz(npz) if npz.exists() else np.load(path.with_suffix(".npy"))
+
+
+class DesignCache:
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int = 4 * 1024**3,
+        max_age_s: float = 14 * 24 * 3600,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.stats = DesignCacheStats()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _entries(self) -> dict[str, dict[str, Any]]:
+        entries = {}
+        for meta_path in self.root.glob("*/entry.json"):
+            try:
+                entries[meta_path.parent.name] = json.loads(meta_path.read_text())
+            except json.JSONDecodeError:
+                continue
+        return entries
+
+    def get(self, key: str) -> DesignMatrices | None:
+        entry = self.root / key
+        meta_path = entry / "entry.json"
+        try:
+            meta = json.loads(meta_path.read_text())
+            dm = DesignMatrices(
+                key=key,
+                preprocessor=joblib.load(entry / "preprocessor.joblib"),
+                X_train=_load_matrix(entry / "X_train"),
+                y_train=np.load(entry / "y_train.npy"),
+                X_test=_load_matrix(entry / "X_test"),
+                y_test=np.load(entry / "y_test.npy"),
+            )
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.stats.misses += 1
+            return None
+        meta_path.write_text(json.dumps({**meta, "last_used": time.time()}))
+        self.stats.hits += 1
+        return dm
+
+    def put(self, dm: DesignMatrices, parts: dict[str, Any]) -> None:
+        entry = self.root / dm.key
+        tmp = self.root / f"{dm.key}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        joblib.dump(dm.preprocessor, tmp / "preprocessor.joblib")
+        _save_matrix(tmp / "X_train", dm.X_train)
+        _save_matrix(tmp / "X_test", dm.X_test)
+        np.save(tmp / "y_train.npy", dm.y_train)
+        np.save(tmp / "y_test.npy", dm.y_test)
+        now = time.time()
+        size = sum(p.stat().st_size for p in tmp.iterdir())
+        meta = {"parts": parts, "size": size, "stored_at": now, "last_used": now}
+        (tmp / "entry.json").write_text(json.dumps(meta, default=str))
+        shutil.rmtree(entry, ignore_errors=True)
+        tmp.replace(entry)
+        self.stats.stored += 1
+        self.evict(keep=dm.key)
+
+    def evict(self, keep: str | None = None) -> None:
+        """
+        Drop entries superseded by `keep` (same dataset path, different fingerprint), entries
+        unused for longer than max_age_s, then least-recently-used entries until the cache
+        fits in max_bytes.
+        """
+        entries = self._entries()
+        dataset = entries.get(keep, {}).get("parts", {}).get("dataset", {}) if keep else {}
+        now = time.time()
+        total = sum(int(m.get("size", 0)) for m in entries.values())
+        for key, meta in sorted(entries.items(), key=lambda kv: kv[1].get("last_used", 0)):
+            if key == keep:
+                continue
+            other = meta.get("parts", {}).get("dataset", {})
+            superseded = bool(dataset) and other.get("path") == dataset.get("path") and (
+                other != dataset
+            )
+            fresh = now - float(meta.get("last_used", 0)) <= self.max_age_s
+            if not superseded and fresh and total <= self.max_bytes:
+                continue
+            shutil.rmtree(self.root / key, ignore_errors=True)
+            total -= int(meta.get("size", 0))
+            self.stats.evicted += 1
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from rhgp.data.dataset import dataset_fingerprint
+from rhgp.models.baselines import always_a_proba, grade_conditional_fail_rate, persistence_proba
+from rhgp.models.bootstrap import bootstrap_metrics
+from rhgp.models.cache import DesignCache, design_key
+from rhgp.models.eval import curve_summary, infer_model_key, parse_thresholds
+from rhgp.models.sweep import threshold_sweep
+from rhgp.models.train import (
+    LABEL_COLUMNS,
+    design_matrices,
+    design_parts,
+    feature_columns,
+    read_model_design_key,
+    read_side,
+    resolve_cutoff,
+)
+
+# Evaluates several model artifacts and every baseline on one read of the test split. The
+# split, baselines and (for models trained from the design cache) the transformed test
+# matrix are shared, so each extra model only adds its own inference.
+
+
+def model_keys(paths: list[Path]) -> list[str]:
+    # `infer_model_key`, falling back to the file stem when two models would share a key.
+    keys = [infer_model_key(p) for p in paths]
+    return [p.stem if keys.count(k) > 1 else k for k, p in zip(keys, paths, strict=True)]
+
+
+def baseline_scores(train_df: pd.DataFrame, test_df: pd.DataFrame) -> dict[str, np.ndarray]:
+    return {
+        "always_a": always_a_proba(test_df).to_numpy(),
+        "persistence": persistence_proba(test_df).to_numpy(),
+        "grade_conditional": grade_conditional_fail_rate(train_df, test_df).to_numpy(),
+    }
+
+
+def score_models(
+    models: dict[str, tuple[Any, bool]], X_test: pd.DataFrame, X_design: Any, jobs: int = 1
+) -> dict[str, np.ndarray]:
+    """
+    P(fail) per model, scored concurrently on threads (sklearn inference releases the GIL in
+    its numeric kernels). Models flagged `(pipeline, True)` score the shared design matrix
+    with their final step; others run their whole pipeline on the feature frame.
+    """
+
+    def score(item: tuple[Any, bool]) -> np.ndarray:
+        model, use_design = item
+        if use_design:
+            return model.steps[-1][1].predict_proba(X_design)[:, 1]
+        return model.predict_proba(X_test)[:, 1]
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        return dict(zip(models, pool.map(score, models.values()), strict=True))
+
+
+def comparison_table(scores: dict[str, dict[str, Any]]) -> pd.DataFrame:
+    rows = []
+    for name, m in scores.items():
+        for row in m["rows"]:
+            rows.append(
+                {
+                    "model": name,
+                    "threshold": row["threshold"],
+                    "precision_fail": row["precision_fail"],
+                    "recall_fail": row["recall_fail"],
+                    "f1_fail": row["f1_fail"],
+                    "pr_auc": m["curve"]["pr_auc"],
+                    "roc_auc": m["curve"]["roc_auc"],
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Evaluate several models and all baselines at once.")
+    p.add_argument("--data", type=Path, required=True)
+    p.add_argument(
+        "--model", type=Path, action="append", required=True, help="Model artifact (repeatable)."
+    )
+    p.add_argument("--out-dir", type=Path, required=True)
+    p.add_argument("--test-start", type=str, default=None)
+    p.add_argument("--threshold", type=float, default=0.5)
+    p.add_argument(
+        "--thresholds",
+        type=str,
+        default=None,
+        help="Comma-separated thresholds for the comparison table (default: --threshold).",
+    )
+    p.add_argument("--target-precision", type=float, default=0.5)
+    p.add_argument("--jobs", type=int, default=1, help="Threads scoring models concurrently.")
+    p.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Share the cached test design matrix among models trained from it.",
+    )
+    p.add_argument("--bootstrap", type=int, default=0)
+    p.add_argument("--ci-level", type=float, default=0.95)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--workers", type=int, default=1, help="Processes for bootstrap resamples.")
+    args = p.parse_args(argv)
+
+    thresholds = parse_thresholds(args.thresholds) if args.thresholds else [args.threshold]
+    cutoff, split_method, split_fraction = resolve_cutoff(args.data, args.test_start)
+    columns = feature_columns() + LABEL_COLUMNS + (["camis"] if args.bootstrap else [])
+    test_df = read_side(args.data, "test", columns, cutoff)
+    train_df = read_side(args.data, "train", ["grade_t", "y_t1"], cutoff)
+    y_test = test_df["y_t1"].astype(int).to_numpy()
+
+    keys = model_keys(args.model)
+    current_key = design_key(design_parts(args.data, cutoff)) if args.cache_dir else None
+    models: dict[str, tuple[Any, bool]] = {}
+    for key, path in zip(keys, args.model, strict=True):
+        trained_key = read_model_design_key(path)
+        models[key] = (joblib.load(path), current_key is not None and trained_key == current_key)
+    X_design = None
+    if args.cache_dir is not None and any(shared for _, shared in models.values()):
+        X_design = design_matrices(args.data, cutoff, DesignCache(args.cache_dir)).X_test
+
+    probas = score_models(models, test_df.loc[:, feature_columns()], X_design, jobs=args.jobs)
+    probas.update(baseline_scores(train_df, test_df))
+
+    scores: dict[str, dict[str, Any]] = {}
+    for name, proba in probas.items():
+        sweep = threshold_sweep(y_test, proba)
+        scores[name] = {
+            **sweep.rows([args.threshold])[0],
+            "curve": curve_summary(sweep, args.target_precision),
+            "rows": sweep.rows(thresholds),
+        }
+
+    metrics: dict[str, object] = {"n_test": int(len(test_df))}
+    metrics["run_metadata"] = {
+        "models": {k: p.name for k, p in zip(keys, args.model, strict=True)},
+        "split_method": split_method,
+        "test_fraction": split_fraction,
+        "cutoff_date": pd.to_datetime(cutoff).date().isoformat(),
+        "dataset_fingerprint": dataset_fingerprint(args.data),
+        "feature_columns": feature_columns(),
+        "threshold": float(args.threshold),
+    }
+    metrics["scores"] = scores
+    if args.bootstrap:
+        preds = {k: (v >= args.threshold).astype(int) for k, v in probas.items()}
+        metrics["bootstrap"] = {
+            "cluster": "camis",
+            "threshold": float(args.threshold),
+            **bootstrap_metrics(
+                test_df["camis"].to_numpy(),
+                y_test,
+                preds,
+                n_resamples=args.bootstrap,
+                level=args.ci_level,
+                seed=args.seed,
+                workers=args.workers,
+            ),
+        }
+
+    table = comparison_table(scores)
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    (args.out_dir / "metrics.json").write_text(json.dumps(metrics, indent=2))
+    table.to_csv(args.out_dir / "comparison.csv", index=False)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
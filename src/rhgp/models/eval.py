@@ -2,17 +2,28 @@ from __future__ import annotations
 
 import argparse
 import json
-from datetime import datetime
 from pathlib import Path
 from typing import Any, cast
 
 import joblib
 import numpy as np
 import pandas as pd
-from sklearn.metrics import classification_report, confusion_matrix, precision_recall_fscore_support
+from sklearn.metrics import classification_report, confusion_matrix
 
+from rhgp.data.dataset import dataset_fingerprint
 from rhgp.models.baselines import always_a_proba, persistence_proba
-from rhgp.models.train import feature_columns, time_split
+from rhgp.models.bootstrap import bootstrap_metrics
+from rhgp.models.cache import DesignCache, design_key
+from rhgp.models.sweep import ThresholdSweep, threshold_sweep
+from rhgp.models.train import (
+    LABEL_COLUMNS,
+    design_matrices,
+    design_parts,
+    feature_columns,
+    read_model_design_key,
+    read_split,
+)
+from rhgp.perf import PerfRecorder, add_profile_argument
 
 
 def parse_thresholds(spec: str) -> list[float]:
@@ -28,22 +39,31 @@ def parse_thresholds(spec: str) -> list[float]:
     return thresholds
 
 
+def infer_model_key(model_path: Path) -> str:
+    name = model_path.stem.lower()
+    if "logreg" in name:
+        return "logreg"
+    if "rf" in name or "randomforest" in name:
+        return "rf"
+    if "hgb" in name:
+        return "hgb"
+    return "model"
+
+
 def evaluate_threshold(
     y_true: np.ndarray, p_fail: np.ndarray, threshold: float
 ) -> dict[str, float]:
-    y_pred = (p_fail >= threshold).astype(int)
-    p, r, f1, _ = precision_recall_fscore_support(
-        y_true,
-        y_pred,
-        average="binary",
-        pos_label=1,
-        zero_division=cast(Any, 0),
-    )
+    return threshold_sweep(y_true, p_fail).rows([threshold])[0]
+
+
+def curve_summary(sweep: ThresholdSweep, target_precision: float) -> dict[str, object]:
     return {
-        "threshold": threshold,
-        "precision_fail": float(p),
-        "recall_fail": float(r),
-        "f1_fail": float(f1),
+        "pr_auc": sweep.pr_auc(),
+        "roc_auc": sweep.roc_auc(),
+        "n_thresholds": int(len(sweep.thresholds)),
+        "best_f1": sweep.best_f1(),
+        "target_precision": target_precision,
+        "at_target_precision": sweep.at_precision(target_precision),
     }
 
 
@@ -57,19 +77,6 @@ def format_threshold_table(rows: list[dict[str, float]]) -> str:
     return "\n".join(lines)
 
 
-def dataset_fingerprint(path: Path) -> dict[str, object]:
-    try:
-        stat = path.stat()
-    except FileNotFoundError:
-        return {"path": str(path), "exists": False}
-    return {
-        "path": str(path),
-        "exists": True,
-        "size_bytes": int(stat.st_size),
-        "mtime_utc": datetime.utcfromtimestamp(stat.st_mtime).isoformat() + "Z",
-    }
-
-
 def main(argv: list[str] | None = None) -> int:
     p = argparse.ArgumentParser(description="Evaluate model and baselines.")
     p.add_argument("--data", type=Path, required=True)
@@ -89,30 +96,57 @@ def main(argv: list[str] | None = None) -> int:
         default=None,
         help="Comma-separated thresholds to print a FAIL precision/recall/F1 table.",
     )
+    p.add_argument(
+        "--target-precision",
+        type=float,
+        default=0.5,
+        help="Report the highest-recall threshold reaching this FAIL precision.",
+    )
+    p.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Reuse the cached test design matrix when the model was trained from it.",
+    )
+    p.add_argument(
+        "--bootstrap",
+        type=int,
+        default=0,
+        help="Number of restaurant-clustered bootstrap resamples for metric CIs (0: off).",
+    )
+    p.add_argument("--ci-level", type=float, default=0.95)
+    p.add_argument("--seed", type=int, default=0, help="Bootstrap seed.")
+    p.add_argument("--workers", type=int, default=1, help="Processes for bootstrap resamples.")
+    add_profile_argument(p)
     args = p.parse_args(argv)
 
-    df = pd.read_parquet(args.data)
-    _, test_df, cutoff, split_method, split_fraction = time_split(
-        df, test_start=args.test_start
-    )
+    perf = PerfRecorder(args.profile)
+    columns = feature_columns() + LABEL_COLUMNS + (["camis"] if args.bootstrap else [])
+    with perf.stage("split") as stage:
+        test_df, cutoff, split_method, split_fraction = read_split(
+            args.data, "test", columns, test_start=args.test_start
+        )
+        stage.rows = len(test_df)
     X_test = test_df[feature_columns()]
     y_test = test_df["y_t1"].astype(int).to_numpy()
 
-    model_key = args.model_key
-    if not model_key:
-        name = args.model.stem.lower()
-        if "logreg" in name:
-            model_key = "logreg"
-        elif "rf" in name or "randomforest" in name:
-            model_key = "rf"
+    model_key = args.model_key or infer_model_key(args.model)
+
+    with perf.stage("load_model"):
+        model = joblib.load(args.model)
+    trained_key = read_model_design_key(args.model)
+    with perf.stage("predict", rows=len(test_df)):
+        if args.cache_dir is not None and trained_key == design_key(
+            design_parts(args.data, cutoff)
+        ):
+            # Same dataset, cutoff and preprocessor as training: skip re-transforming the test set.
+            dm = design_matrices(args.data, cutoff, DesignCache(args.cache_dir))
+            p_fail = model.steps[-1][1].predict_proba(dm.X_test)[:, 1]
         else:
-            model_key = "model"
-
-    model = joblib.load(args.model)
-    p_fail = model.predict_proba(X_test)[:, 1]
+            p_fail = model.predict_proba(X_test)[:, 1]
 
     metrics: dict[str, object] = {"n_test": int(len(test_df))}
-    metrics["run_metadata"] = {
+    run_metadata: dict[str, object] = {
         "model_key": model_key,
         "model_name": args.model.name,
         "split_method": split_method,
@@ -121,17 +155,46 @@ def main(argv: list[str] | None = None) -> int:
         "dataset_fingerprint": dataset_fingerprint(args.data),
         "feature_columns": feature_columns(),
     }
-    metrics[model_key] = evaluate_threshold(y_test, p_fail, threshold=args.threshold)
-
-    p_fail_always_a = always_a_proba(test_df).to_numpy()
-    metrics["always_a"] = evaluate_threshold(y_test, p_fail_always_a, threshold=args.threshold)
+    metrics["run_metadata"] = run_metadata
+    with perf.stage("metrics", rows=len(test_df)):
+        sweep = threshold_sweep(y_test, p_fail)
+        metrics[model_key] = sweep.rows([args.threshold])[0]
+        metrics[f"{model_key}_curve"] = curve_summary(sweep, args.target_precision)
+
+        p_fail_always_a = always_a_proba(test_df).to_numpy()
+        metrics["always_a"] = evaluate_threshold(y_test, p_fail_always_a, threshold=args.threshold)
+
+        p_fail_persist = persistence_proba(test_df).to_numpy()
+        metrics["persistence"] = evaluate_threshold(
+            y_test, p_fail_persist, threshold=args.threshold
+        )
 
-    p_fail_persist = persistence_proba(test_df).to_numpy()
-    metrics["persistence"] = evaluate_threshold(y_test, p_fail_persist, threshold=args.threshold)
+        if args.bootstrap:
+            preds = {
+                key: (proba >= args.threshold).astype(int)
+                for key, proba in [
+                    (model_key, p_fail),
+                    ("always_a", p_fail_always_a),
+                    ("persistence", p_fail_persist),
+                ]
+            }
+            metrics["bootstrap"] = {
+                "cluster": "camis",
+                "threshold": float(args.threshold),
+                **bootstrap_metrics(
+                    test_df["camis"].to_numpy(),
+                    y_test,
+                    preds,
+                    n_resamples=args.bootstrap,
+                    level=args.ci_level,
+                    seed=args.seed,
+                    workers=args.workers,
+                ),
+            }
 
     if args.thresholds:
         thresholds = parse_thresholds(args.thresholds)
-        rows = [evaluate_threshold(y_test, p_fail, threshold=t) for t in thresholds]
+        rows = sweep.rows(thresholds)
         best = max(rows, key=lambda r: r["f1_fail"])
         metrics[f"{model_key}_threshold_tuning"] = {
             "thresholds": thresholds,
@@ -156,9 +219,11 @@ def main(argv: list[str] | None = None) -> int:
         columns=pd.Index(["pred_ok(A)", "pred_fail(BC+)"]),
     )
 
+    run_metadata["perf"] = perf.to_dict()
     args.out_dir.mkdir(parents=True, exist_ok=True)
     (args.out_dir / "metrics.json").write_text(json.dumps(metrics, indent=2))
     cm_df.to_csv(args.out_dir / "confusion_matrix.csv", index=True)
+    sweep.to_frame().to_csv(args.out_dir / "threshold_curve.csv", index=False)
     return 0
 
 
@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Any, cast
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from rhgp.models.train import FEATURE_COLUMNS_CAT, FEATURE_COLUMNS_NUM
+
+# Array export of a fitted `train_rf` pipeline. The preprocessor parameters (medians,
+# scales, modes, one-hot vocabularies) and every tree's nodes are flattened into one file:
+# a JSON header followed by contiguous, 64-byte aligned arrays that are memory-mapped on
+# load, so opening a forest costs a few page faults instead of unpickling every tree.
+
+MAGIC = b"RHGPFRST"
+ALIGN = 64
+FOREST_SUFFIX = ".forest"
+
+
+def _pipeline_arrays(pipe: Any) -> tuple[dict[str, Any], dict[str, np.ndarray]]:
+    pre, clf = pipe.named_steps["pre"], pipe.named_steps["clf"]
+    if list(clf.classes_) != [0, 1]:
+        raise ValueError(f"Expected classes [0, 1], got {list(clf.classes_)}.")
+    num = pre.named_transformers_["num"]
+    cat = pre.named_transformers_["cat"]
+    onehot = cat.named_steps["onehot"]
+    meta: dict[str, Any] = {
+        "num_columns": FEATURE_COLUMNS_NUM,
+        "cat_columns": FEATURE_COLUMNS_CAT,
+        "cat_modes": [str(v) for v in cat.named_steps["imputer"].statistics_],
+        "categories": [[str(v) for v in c] for c in onehot.categories_],
+        "n_trees": len(clf.estimators_),
+    }
+
+    features, thresholds, right, values, roots = [], [], [], [], []
+    offset = 0
+    for est in clf.estimators_:
+        tree = est.tree_
+        leaf = tree.children_left < 0
+        ids = np.arange(tree.node_count)
+        # Trees are built depth first, so a split's left child is the next node and only
+        # the right child needs storing. Leaves are marked by feature -1.
+        if not (tree.children_left[~leaf] == ids[~leaf] + 1).all():
+            raise ValueError("Expected depth-first node order in every tree.")
+        counts = tree.value[:, 0, :]
+        roots.append(offset)
+        features.append(np.where(leaf, -1, tree.feature))
+        thresholds.append(tree.threshold)
+        right.append(np.where(leaf, -1, tree.children_right + offset))
+        values.append(counts[:, 1] / counts.sum(axis=1))
+        offset += tree.node_count
+
+    arrays = {
+        "median": np.asarray(num.named_steps["imputer"].statistics_, dtype=np.float64),
+        "scale": np.asarray(num.named_steps["scaler"].scale_, dtype=np.float64),
+        "feature": np.concatenate(features).astype(np.int32),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "right": np.concatenate(right).astype(np.int32),
+        "value": np.concatenate(values).astype(np.float64),
+        "root": np.asarray(roots, dtype=np.int32),
+    }
+    return meta, arrays
+
+
+def export_forest(pipe: Any, path: Path) -> Path:
+    """
+    Write a fitted `build_rf_pipeline` pipeline to `path` as a flat, memory-mappable file
+    readable by `ForestModel.load`.
+    """
+    meta, arrays = _pipeline_arrays(pipe)
+    blobs, specs, pos = [], {}, 0
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        pad = -pos % ALIGN
+        blobs.append(b"\0" * pad + a.tobytes())
+        pos += pad
+        specs[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": pos}
+        pos += a.nbytes
+    header = json.dumps({**meta, "arrays": specs}).encode()
+    # Data starts at the first aligned offset after magic, header length and header.
+    start = len(MAGIC) + 8 + len(header)
+    start += -start % ALIGN
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        f.write(b"\0" * (start - f.tell()))
+        for blob in blobs:
+            f.write(blob)
+    return path
+
+
+class ForestModel:
+    """
+    Memory-mapped forest with a `predict_proba` matching the exported sklearn pipeline.
+    Rows are scored in blocks; within a block all (row, tree) pairs descend one level per
+    step and pairs that reach a leaf are dropped, so the cost is a handful of array
+    operations per tree level rather than per tree.
+    """
+
+    def __init__(self, meta: dict[str, Any], arrays: dict[str, np.ndarray]) -> None:
+        self.meta = meta
+        self.num_columns: list[str] = meta["num_columns"]
+        self.cat_columns: list[str] = meta["cat_columns"]
+        self.categories: list[pd.Index] = [pd.Index(c) for c in meta["categories"]]
+        self.n_trees: int = meta["n_trees"]
+        self.median = arrays["median"]
+        self.scale = arrays["scale"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.root = arrays["root"]
+        self.n_features = len(self.num_columns) + sum(len(c) for c in self.categories)
+
+    @classmethod
+    def load(cls, path: Path) -> ForestModel:
+        buf = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(buf[: len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not an exported forest.")
+        n = int.from_bytes(bytes(buf[len(MAGIC) : len(MAGIC) + 8]), "little")
+        head = len(MAGIC) + 8
+        meta = json.loads(bytes(buf[head : head + n]))
+        start = head + n + (-(head + n) % ALIGN)
+        arrays = {}
+        for name, spec in meta.pop("arrays").items():
+            dtype = np.dtype(spec["dtype"])
+            lo = start + spec["offset"]
+            size = int(np.prod(spec["shape"])) * dtype.itemsize
+            arrays[name] = buf[lo : lo + size].view(dtype).reshape(spec["shape"])
+        return cls(meta, arrays)
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        The exported preprocessor as one dense float32 matrix (the dtype trees split on).
+        """
+        num = X.loc[:, self.num_columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        num = np.where(np.isnan(num), self.median, num) / self.scale
+        out = np.zeros((len(X), self.n_features), dtype=np.float32)
+        out[:, : num.shape[1]] = num
+        col = num.shape[1]
+        rows = np.arange(len(X))
+        for name, mode, cats in zip(
+            self.cat_columns, self.meta["cat_modes"], self.categories, strict=True
+        ):
+            values = X[name].to_numpy(dtype=object)
+            values[pd.isna(values)] = mode
+            codes = cats.get_indexer(cast(Any, values))
+            hit = codes >= 0
+            out[rows[hit], col + codes[hit]] = 1.0
+            col += len(cats)
+        return out
+
+    def _mean_leaf_value(self, Xt: np.ndarray) -> np.ndarray:
+        n = len(Xt)
+        flat = Xt.ravel()
+        # Tree-major pair order keeps consecutive lookups within one tree's nodes.
+        row = np.tile(np.arange(n, dtype=np.intp), self.n_trees)
+        base = row * self.n_features
+        node = np.repeat(self.root.astype(np.intp), n)
+        total = np.zeros(n, dtype=np.float64)
+        while len(node):
+            f = self.feature[node]
+            done = f < 0
+            if done.any():
+                total += np.bincount(row[done], weights=self.value[node[done]], minlength=n)
+                keep = ~done
+                node, base, row, f = node[keep], base[keep], row[keep], f[keep]
+            go_left = flat[base + f] <= self.threshold[node]
+            node = np.where(go_left, node + 1, self.right[node])
+        return total / self.n_trees
+
+    def predict_proba(self, X: pd.DataFrame, block_rows: int = 2048) -> np.ndarray:
+        Xt = self.transform(X)
+        p_fail = np.empty(len(Xt), dtype=np.float64)
+        for lo in range(0, len(Xt), block_rows):
+            p_fail[lo : lo + block_rows] = self._mean_leaf_value(Xt[lo : lo + block_rows])
+        return np.column_stack([1.0 - p_fail, p_fail])
+
+
+def load_model(path: Path) -> Any:
+    """An exported forest if `path` has the `.forest` suffix, else a joblib pipeline."""
+    return ForestModel.load(path) if path.suffix == FOREST_SUFFIX else joblib.load(path)
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Export a RandomForest pipeline to flat arrays.")
+    p.add_argument("--model", type=Path, required=True, help="train_rf joblib pipeline.")
+    p.add_argument("--out", type=Path, required=True, help=f"Output `{FOREST_SUFFIX}` file.")
+    args = p.parse_args(argv)
+
+    export_forest(joblib.load(args.model), args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import resource
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from rhgp.data.dataset import open_dataset
+from rhgp.models.forest import load_model
+from rhgp.models.train import feature_columns
+from rhgp.perf import PerfRecorder, add_profile_argument
+
+# Batch scoring: a features parquet (file or partitioned dataset) is streamed in chunks and
+# scored by a pool of processes that each load the model once. Output rows keep input
+# order, whatever the worker count, and only a bounded number of chunks is in flight.
+
+KEY_COLUMNS = ["camis", "inspection_date_t"]
+OUTPUT_SCHEMA = pa.schema(
+    [
+        ("camis", pa.int32()),
+        ("inspection_date_t", pa.timestamp("ns")),
+        ("p_fail", pa.float64()),
+    ]
+)
+
+_MODEL: Any = None
+
+
+def _init_worker(model_path: Path) -> None:
+    global _MODEL
+    _MODEL = load_model(model_path)
+
+
+def score_batch(model: Any, batch: pa.RecordBatch) -> pa.Table:
+    df = batch.to_pandas()
+    p_fail = model.predict_proba(df.loc[:, feature_columns()])[:, 1]
+    return pa.table(
+        {
+            "camis": pa.array(df["camis"].to_numpy(), type=pa.int32()),
+            "inspection_date_t": pa.array(
+                df["inspection_date_t"].to_numpy(dtype="datetime64[ns]"), type=pa.timestamp("ns")
+            ),
+            "p_fail": pa.array(np.asarray(p_fail, dtype=np.float64)),
+        },
+        schema=OUTPUT_SCHEMA,
+    )
+
+
+def _score(batch: pa.RecordBatch) -> pa.Table:
+    return score_batch(_MODEL, batch)
+
+
+def iter_feature_batches(path: Path, chunk_rows: int) -> Iterator[pa.RecordBatch]:
+    dataset = cast(Any, open_dataset(path))
+    for batch in dataset.to_batches(
+        columns=KEY_COLUMNS + feature_columns(), batch_size=chunk_rows, use_threads=False
+    ):
+        if batch.num_rows:
+            yield batch
+
+
+def peak_rss_mb() -> dict[str, float]:
+    # ru_maxrss is in KiB on Linux. For children it is the largest peak of any single
+    # (finished) worker process, not their total.
+    kib = 1024.0
+    return {
+        "parent": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / kib,
+        "max_worker": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / kib,
+    }
+
+
+def predict(
+    model_path: Path, in_path: Path, out_path: Path, chunk_rows: int = 200_000, workers: int = 1
+) -> dict[str, Any]:
+    """
+    Score every row of `in_path` and write `camis`, `inspection_date_t`, `p_fail` to
+    `out_path` in input order. Returns throughput and peak memory figures.
+    """
+    t0 = time.perf_counter()
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    counts = {"rows": 0, "chunks": 0}
+    with pq.ParquetWriter(tmp, OUTPUT_SCHEMA) as writer:
+
+        def write(table: pa.Table) -> None:
+            writer.write_table(table)
+            counts["rows"] += table.num_rows
+            counts["chunks"] += 1
+
+        batches = iter_feature_batches(in_path, chunk_rows)
+        if workers <= 1:
+            model = load_model(model_path)
+            for batch in batches:
+                write(score_batch(model, batch))
+        else:
+            ctx = mp.get_context("spawn")
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(model_path,),
+            ) as pool:
+                # Two chunks per worker in flight; results are written in submission order.
+                pending: deque[Future[pa.Table]] = deque()
+                for batch in batches:
+                    pending.append(pool.submit(_score, batch))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    tmp.replace(out_path)
+    seconds = time.perf_counter() - t0
+    return {
+        **counts,
+        "workers": workers,
+        "seconds": seconds,
+        "rows_per_s": counts["rows"] / seconds if seconds > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Score a features parquet in chunks.")
+    p.add_argument(
+        "--model", type=Path, required=True, help="joblib pipeline or exported `.forest`."
+    )
+    p.add_argument("--in", dest="in_path", type=Path, required=True)
+    p.add_argument("--out", type=Path, required=True)
+    p.add_argument("--chunk-rows", type=int, default=200_000)
+    p.add_argument("--workers", type=int, default=1, help="Scoring processes.")
+    p.add_argument("--report", type=Path, default=None, help="Write throughput JSON here.")
+    add_profile_argument(p)
+    args = p.parse_args(argv)
+
+    # With --workers > 1 the profile and peak RSS cover the parent process only.
+    perf = PerfRecorder(args.profile)
+    with perf.stage("predict") as stage:
+        report = predict(args.model, args.in_path, args.out, args.chunk_rows, args.workers)
+        stage.rows = report["rows"]
+    report["perf"] = perf.to_dict()
+    text = json.dumps(report, indent=2)
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(text)
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Threshold sweeps over a score vector: one sort, then cumulative TP/FP counts give the
+# confusion matrix of `p_fail >= t` at every distinct score t. Precision/recall/F1 follow
+# sklearn's binary definitions with `zero_division=0`.
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    num = np.asarray(num, dtype=np.float64)
+    den = np.asarray(den, dtype=np.float64)
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+
+@dataclass(frozen=True)
+class ThresholdSweep:
+    # Distinct scores in descending order, and counts of predicted positives at each.
+    thresholds: np.ndarray
+    tp: np.ndarray
+    fp: np.ndarray
+    n_pos: int
+    n_neg: int
+
+    @property
+    def precision(self) -> np.ndarray:
+        return _ratio(self.tp, self.tp + self.fp)
+
+    @property
+    def recall(self) -> np.ndarray:
+        return _ratio(self.tp, np.full_like(self.tp, self.n_pos))
+
+    @property
+    def f1(self) -> np.ndarray:
+        return _ratio(2 * self.tp, self.tp + self.fp + self.n_pos)
+
+    def pr_auc(self) -> float | None:
+        # Average precision: sum of precision weighted by recall increments (as sklearn).
+        if self.n_pos == 0:
+            return None
+        recall = self.recall
+        return float(np.sum(np.diff(recall, prepend=0.0) * self.precision))
+
+    def roc_auc(self) -> float | None:
+        if self.n_pos == 0 or self.n_neg == 0:
+            return None
+        tpr = np.concatenate([[0.0], self.tp / self.n_pos])
+        fpr = np.concatenate([[0.0], self.fp / self.n_neg])
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def _row(self, threshold: float, i: int) -> dict[str, float]:
+        # Row `i` of the curve, or "predict nothing" when i < 0 (threshold above every score).
+        tp = int(self.tp[i]) if i >= 0 else 0
+        fp = int(self.fp[i]) if i >= 0 else 0
+        return {
+            "threshold": float(threshold),
+            "precision_fail": float(_ratio(np.array(tp), np.array(tp + fp))),
+            "recall_fail": float(_ratio(np.array(tp), np.array(self.n_pos))),
+            "f1_fail": float(_ratio(np.array(2 * tp), np.array(tp + fp + self.n_pos))),
+            "tp": tp,
+            "fp": fp,
+        }
+
+    def rows(self, thresholds: list[float]) -> list[dict[str, float]]:
+        # Metrics at arbitrary thresholds: the last distinct score >= t decides the counts.
+        idx = np.searchsorted(-self.thresholds, -np.asarray(thresholds, dtype=np.float64), "right")
+        return [self._row(t, int(i) - 1) for t, i in zip(thresholds, idx, strict=True)]
+
+    def best_f1(self) -> dict[str, float] | None:
+        if len(self.thresholds) == 0:
+            return None
+        i = int(np.argmax(self.f1))
+        return self._row(self.thresholds[i], i)
+
+    def at_precision(self, target: float) -> dict[str, float] | None:
+        # Highest-recall operating point whose precision reaches `target` (None if none does).
+        ok = np.flatnonzero(self.precision >= target)
+        if len(ok) == 0:
+            return None
+        i = int(ok[np.argmax(self.recall[ok])])
+        return self._row(self.thresholds[i], i)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "threshold": self.thresholds,
+                "precision_fail": self.precision,
+                "recall_fail": self.recall,
+                "f1_fail": self.f1,
+                "tp": self.tp,
+                "fp": self.fp,
+            }
+        )
+
+
+def threshold_sweep(y_true: np.ndarray, p_fail: np.ndarray) -> ThresholdSweep:
+    y = np.asarray(y_true).astype(bool)
+    p = np.asarray(p_fail, dtype=np.float64)
+    order = np.argsort(-p, kind="stable")
+    p_sorted = p[order]
+    tp = np.cumsum(y[order], dtype=np.int64)
+    # The last position of each run of equal scores carries the counts for that threshold.
+    last = np.flatnonzero(np.diff(p_sorted, append=-np.inf) != 0)
+    tp = tp[last]
+    fp = last + 1 - tp
+    n_pos = int(y.sum())
+    return ThresholdSweep(
+        thresholds=p_sorted[last], tp=tp, fp=fp, n_pos=n_pos, n_neg=int(len(y) - n_pos)
+    )
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import argparse
+import json
 from pathlib import Path
-from typing import cast
+from typing import Any, Literal, cast
 
 import joblib
 import pandas as pd
+import sklearn
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
+from rhgp.data.dataset import dataset_fingerprint, date_filter, read_dataset
+from rhgp.models.cache import DesignCache, DesignMatrices, design_key
+from rhgp.perf import PerfRecorder, add_profile_argument
+
 FEATURE_COLUMNS_NUM = [
     "score_t",
     "n_violations_t",
@@ -53,28 +59,179 @@ def build_preprocessor() -> ColumnTransformer:
     )
 
 
+LABEL_COLUMNS = ["inspection_date_t1", "y_t1"]
+
+
+def split_cutoff(
+    inspection_date_t1: pd.Series, test_start: str | None = None, test_frac: float = 0.2
+) -> tuple[pd.Timestamp, str, float | None]:
+    if test_start:
+        return cast(pd.Timestamp, pd.to_datetime(test_start)), "time-cutoff", None
+    t1 = pd.to_datetime(inspection_date_t1, errors="coerce")
+    cutoff = pd.to_datetime(t1.quantile(1.0 - test_frac))
+    return cast(pd.Timestamp, cutoff), "time-quantile", float(test_frac)
+
+
 def time_split(
     df: pd.DataFrame, test_start: str | None = None, test_frac: float = 0.2
 ) -> tuple[pd.DataFrame, pd.DataFrame, pd.Timestamp, str, float | None]:
     d = df.copy()
     d["inspection_date_t1"] = pd.to_datetime(d["inspection_date_t1"], errors="coerce")
-    if test_start:
-        cutoff = pd.to_datetime(test_start)
-        split_method = "time-cutoff"
-        split_fraction = None
-    else:
-        cutoff = pd.to_datetime(d["inspection_date_t1"].quantile(1.0 - test_frac))
-        split_method = "time-quantile"
-        split_fraction = float(test_frac)
-    cutoff = cast(pd.Timestamp, cutoff)
+    cutoff, split_method, split_fraction = split_cutoff(
+        cast(pd.Series, d["inspection_date_t1"]), test_start=test_start, test_frac=test_frac
+    )
     train = cast(pd.DataFrame, d.loc[d["inspection_date_t1"] < cutoff].copy())
     test = cast(pd.DataFrame, d.loc[d["inspection_date_t1"] >= cutoff].copy())
     return (train, test, cutoff, split_method, split_fraction)
 
 
-def build_pipeline() -> Pipeline:
+def resolve_cutoff(
+    path: Path, test_start: str | None = None, test_frac: float = 0.2
+) -> tuple[pd.Timestamp, str, float | None]:
+    # `split_cutoff` for a dataset on disk; a quantile cutoff reads the label date column only.
+    if test_start:
+        return split_cutoff(pd.Series(dtype="object"), test_start)
+    t1 = read_dataset(path, columns=["inspection_date_t1"])["inspection_date_t1"]
+    return split_cutoff(cast(pd.Series, t1), test_frac=test_frac)
+
+
+def read_side(
+    path: Path, side: Literal["train", "test"], columns: list[str], cutoff: pd.Timestamp
+) -> pd.DataFrame:
+    # Only `columns` (plus the label date), only from `t1_month` partitions on that side.
+    op = "<" if side == "train" else ">="
+    return read_dataset(
+        path,
+        columns=list(dict.fromkeys([*columns, "inspection_date_t1"])),
+        filter=date_filter("inspection_date_t1", op, cutoff, path),
+    )
+
+
+def read_split(
+    path: Path,
+    side: Literal["train", "test"],
+    columns: list[str],
+    test_start: str | None = None,
+    test_frac: float = 0.2,
+) -> tuple[pd.DataFrame, pd.Timestamp, str, float | None]:
+    """
+    Read one side of `time_split` from a processed dataset on disk.
+
+    Only `columns` (plus the label date) are read, and only from the `t1_month` partitions
+    on that side of the cutoff; a quantile cutoff first reads the label date column alone.
+    """
+    cutoff, split_method, split_fraction = resolve_cutoff(path, test_start, test_frac)
+    return read_side(path, side, columns, cutoff), cutoff, split_method, split_fraction
+
+
+def design_parts(path: Path, cutoff: pd.Timestamp) -> dict[str, Any]:
+    # Everything the fitted preprocessor and design matrices depend on.
+    return {
+        "dataset": dataset_fingerprint(path),
+        "cutoff": cutoff.isoformat(),
+        "features": feature_columns(),
+        "preprocessor": {"sklearn": sklearn.__version__, **build_preprocessor().get_params()},
+    }
+
+
+def design_matrices(
+    path: Path, cutoff: pd.Timestamp, cache: DesignCache | None = None
+) -> DesignMatrices:
+    """
+    Fitted preprocessor and transformed train/test matrices for the split of `path` at
+    `cutoff`, reused from `cache` when it holds an entry with the same `design_parts`.
+    """
+    parts = design_parts(path, cutoff)
+    key = design_key(parts)
+    if cache is not None and (cached := cache.get(key)) is not None:
+        return cached
+
+    cols = feature_columns() + LABEL_COLUMNS
+    train_df = read_side(path, "train", cols, cutoff)
+    test_df = read_side(path, "test", cols, cutoff)
+    pre = build_preprocessor()
+    dm = DesignMatrices(
+        key=key,
+        preprocessor=pre,
+        X_train=pre.fit_transform(train_df[feature_columns()]),
+        y_train=train_df["y_t1"].astype(int).to_numpy(),
+        X_test=pre.transform(test_df[feature_columns()]),
+        y_test=test_df["y_t1"].astype(int).to_numpy(),
+    )
+    if cache is not None:
+        cache.put(dm, parts)
+    return dm
+
+
+def fit_with_design(pipe: Pipeline, dm: DesignMatrices) -> Pipeline:
+    # Same fitted pipeline as `pipe.fit(X_train, y_train)`, reusing the fitted preprocessor.
+    pipe.steps[0] = ("pre", dm.preprocessor)
+    pipe.steps[-1][1].fit(dm.X_train, dm.y_train)
+    return pipe
+
+
+def model_meta_path(model_path: Path) -> Path:
+    return model_path.with_suffix(".meta.json")
+
+
+def write_model_meta(
+    model_path: Path, design_key: str | None, perf: dict[str, Any] | None = None
+) -> None:
+    # Records which cached design the model was fitted on, so eval can reuse its matrices,
+    # and the training run's per-stage perf.
+    meta_path = model_meta_path(model_path)
+    meta: dict[str, Any] = {}
+    if design_key is not None:
+        meta["design_key"] = design_key
+    if perf is not None:
+        meta["perf"] = perf
+    if not meta:
+        meta_path.unlink(missing_ok=True)
+        return
+    meta_path.write_text(json.dumps(meta, indent=2) + "\n")
+
+
+def read_model_design_key(model_path: Path) -> str | None:
+    meta_path = model_meta_path(model_path)
+    if not meta_path.exists():
+        return None
+    return json.loads(meta_path.read_text()).get("design_key")
+
+
+def fit_model(
+    pipe: Pipeline,
+    data: Path,
+    test_start: str | None,
+    cache_dir: Path | None,
+    perf: PerfRecorder | None = None,
+) -> tuple[Pipeline, str | None]:
+    # Fit on the training split; returns the design key when the cache was used.
+    perf = perf or PerfRecorder()
+    if cache_dir is not None:
+        with perf.stage("split") as stage:
+            cutoff, _, _ = resolve_cutoff(data, test_start)
+            dm = design_matrices(data, cutoff, DesignCache(cache_dir))
+            stage.rows = len(dm.y_train)
+        with perf.stage("fit", rows=len(dm.y_train)):
+            return fit_with_design(pipe, dm), dm.key
+    with perf.stage("split") as stage:
+        train_df, _, _, _ = read_split(
+            data, "train", feature_columns() + LABEL_COLUMNS, test_start=test_start
+        )
+        stage.rows = len(train_df)
+    with perf.stage("fit", rows=len(train_df)):
+        pipe.fit(train_df[feature_columns()], train_df["y_t1"].astype(int))
+    return pipe, None
+
+
+def build_pipeline(
+    *,
+    C: float = 1.0,
+    class_weight: str | None = "balanced",
+    max_iter: int = 2000,
+) -> Pipeline:
     pre = build_preprocessor()
-    clf = LogisticRegression(max_iter=2000, class_weight="balanced")
+    clf = LogisticRegression(C=C, max_iter=max_iter, class_weight=class_weight)
     return Pipeline([("pre", pre), ("clf", clf)])
 
 
@@ -83,19 +240,21 @@ def main(argv: list[str] | None = None) -> int:
     p.add_argument("--data", type=Path, required=True)
     p.add_argument("--out", type=Path, required=True)
     p.add_argument("--test-start", type=str, default=None, help="YYYY-MM-DD cutoff for t+1 date")
+    p.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Reuse the fitted preprocessor and design matrices across runs.",
+    )
+    add_profile_argument(p)
     args = p.parse_args(argv)
 
-    df = pd.read_parquet(args.data)
-    train_df, _, _, _, _ = time_split(df, test_start=args.test_start)
-
-    X_train = train_df[feature_columns()]
-    y_train = train_df["y_t1"].astype(int)
-
-    pipe = build_pipeline()
-    pipe.fit(X_train, y_train)
+    perf = PerfRecorder(args.profile)
+    pipe, key = fit_model(build_pipeline(), args.data, args.test_start, args.cache_dir, perf)
 
     args.out.parent.mkdir(parents=True, exist_ok=True)
     joblib.dump(pipe, args.out)
+    write_model_meta(args.out, key, perf.to_dict())
     return 0
 
 
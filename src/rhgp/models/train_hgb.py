@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import argparse
+import math
+from pathlib import Path
+from typing import Any, cast
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.metrics import log_loss
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+from sklearn.utils.class_weight import compute_sample_weight
+
+from rhgp.models.backtest import sort_by_label_date
+from rhgp.models.train import (
+    FEATURE_COLUMNS_CAT,
+    LABEL_COLUMNS,
+    feature_columns,
+    read_split,
+    write_model_meta,
+)
+from rhgp.perf import PerfRecorder, add_profile_argument
+
+# Histogram gradient boosting on the raw feature frame: categorical columns are split on
+# natively (from their pandas dtype) and missing values are routed by the trees, so there is
+# no imputer or one-hot stage. Categories are matched by value, so train and test frames
+# with different category sets score consistently.
+
+
+def as_categories(X: pd.DataFrame) -> pd.DataFrame:
+    # Categorical features arrive as `category` from parquet, but may be plain strings
+    # (e.g. frames built by hand); the model reads categoricals from the dtype.
+    if all(isinstance(X[c].dtype, pd.CategoricalDtype) for c in FEATURE_COLUMNS_CAT):
+        return X
+    X = X.copy()
+    for c in FEATURE_COLUMNS_CAT:
+        X[c] = X[c].astype("category")
+    return X
+
+
+def build_hgb_pipeline(
+    *,
+    learning_rate: float = 0.1,
+    max_iter: int = 500,
+    max_leaf_nodes: int = 31,
+    min_samples_leaf: int = 20,
+    l2_regularization: float = 0.0,
+    random_state: int = 42,
+) -> Pipeline:
+    pre = FunctionTransformer(as_categories)
+    clf = HistGradientBoostingClassifier(
+        learning_rate=learning_rate,
+        max_iter=max_iter,
+        max_leaf_nodes=max_leaf_nodes,
+        min_samples_leaf=min_samples_leaf,
+        l2_regularization=l2_regularization,
+        categorical_features="from_dtype",
+        early_stopping=cast(Any, False),
+        class_weight="balanced",
+        random_state=random_state,
+    )
+    return Pipeline([("pre", pre), ("clf", clf)])
+
+
+def early_stopping_iterations(
+    pipe: Pipeline,
+    train_df: pd.DataFrame,
+    val_frac: float = 0.1,
+    n_iter_no_change: int = 20,
+    step: int = 10,
+) -> tuple[int, list[float]]:
+    """
+    Number of boosting iterations for `pipe`, chosen on the most recent `val_frac` of the
+    (label-date-sorted) training rows: boosting grows `step` iterations at a time on the
+    earlier rows, and stops once the class-balanced validation log loss has not improved
+    for `n_iter_no_change` iterations. Returns the best count and the loss curve.
+    """
+    n_val = max(1, math.ceil(len(train_df) * val_frac))
+    fit_df, val_df = train_df.iloc[:-n_val], train_df.iloc[-n_val:]
+    X_fit = as_categories(fit_df.loc[:, feature_columns()])
+    X_val = as_categories(val_df.loc[:, feature_columns()])
+    y_fit = fit_df["y_t1"].astype(int).to_numpy()
+    y_val = val_df["y_t1"].astype(int).to_numpy()
+    w_val = compute_sample_weight("balanced", y_val)
+
+    clf = pipe.named_steps["clf"]
+    max_iter = int(clf.max_iter)
+    stage = HistGradientBoostingClassifier(**{**clf.get_params(), "warm_start": True})
+    best_iter, best_loss, losses = 0, np.inf, []
+    for n in range(step, max_iter + step, step):
+        n = min(n, max_iter)
+        stage.set_params(max_iter=n).fit(X_fit, y_fit)
+        loss = log_loss(y_val, stage.predict_proba(X_val)[:, 1], sample_weight=w_val, labels=[0, 1])
+        losses.append(float(loss))
+        if loss < best_loss - 1e-7:
+            best_iter, best_loss = n, loss
+        elif n - best_iter >= n_iter_no_change:
+            break
+    return max(best_iter, step), losses
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Train histogram gradient boosting model.")
+    p.add_argument("--data", type=Path, required=True)
+    p.add_argument("--out", type=Path, required=True)
+    p.add_argument("--test-start", type=str, default=None, help="YYYY-MM-DD cutoff for t+1 date")
+    p.add_argument("--learning-rate", type=float, default=0.1)
+    p.add_argument("--max-iter", type=int, default=500)
+    p.add_argument("--max-leaf-nodes", type=int, default=31)
+    p.add_argument(
+        "--val-frac",
+        type=float,
+        default=0.1,
+        help="Most recent fraction of training rows used for early stopping (0: off).",
+    )
+    p.add_argument("--n-iter-no-change", type=int, default=20)
+    add_profile_argument(p)
+    args = p.parse_args(argv)
+
+    perf = PerfRecorder(args.profile)
+    with perf.stage("split") as stage:
+        train_df, _, _, _ = read_split(
+            args.data, "train", feature_columns() + LABEL_COLUMNS, test_start=args.test_start
+        )
+        stage.rows = len(train_df)
+    pipe = build_hgb_pipeline(
+        learning_rate=args.learning_rate,
+        max_iter=args.max_iter,
+        max_leaf_nodes=args.max_leaf_nodes,
+    )
+    if args.val_frac > 0:
+        with perf.stage("early_stopping", rows=len(train_df)):
+            n_iter, _ = early_stopping_iterations(
+                pipe,
+                sort_by_label_date(train_df),
+                val_frac=args.val_frac,
+                n_iter_no_change=args.n_iter_no_change,
+            )
+        # Refit on all training rows, including the validation slice, for the chosen length.
+        pipe.set_params(clf__max_iter=n_iter)
+    with perf.stage("fit", rows=len(train_df)):
+        pipe.fit(train_df.loc[:, feature_columns()], train_df["y_t1"].astype(int))
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(pipe, args.out)
+    write_model_meta(args.out, None, perf.to_dict())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
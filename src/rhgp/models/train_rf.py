@@ -4,23 +4,27 @@ import argparse
 from pathlib import Path
 
 import joblib
-import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.pipeline import Pipeline
 
-from rhgp.models.train import build_preprocessor, feature_columns, time_split
+from rhgp.models.train import build_preprocessor, fit_model, write_model_meta
+from rhgp.perf import PerfRecorder, add_profile_argument
 
 
 def build_rf_pipeline(
     *,
     n_estimators: int = 400,
     max_depth: int | None = None,
+    min_samples_leaf: int = 1,
+    max_features: str = "sqrt",
     random_state: int = 42,
 ) -> Pipeline:
     pre = build_preprocessor()
     clf = RandomForestClassifier(
         n_estimators=n_estimators,
         max_depth=max_depth,
+        min_samples_leaf=min_samples_leaf,
+        max_features=max_features,
         random_state=random_state,
         n_jobs=-1,
         class_weight="balanced_subsample",
@@ -35,19 +39,22 @@ def main(argv: list[str] | None = None) -> int:
     p.add_argument("--test-start", type=str, default=None, help="YYYY-MM-DD cutoff for t+1 date")
     p.add_argument("--n-estimators", type=int, default=400)
     p.add_argument("--max-depth", type=int, default=None)
+    p.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Reuse the fitted preprocessor and design matrices across runs.",
+    )
+    add_profile_argument(p)
     args = p.parse_args(argv)
 
-    df = pd.read_parquet(args.data)
-    train_df, _, _, _, _ = time_split(df, test_start=args.test_start)
-
-    X_train = train_df[feature_columns()]
-    y_train = train_df["y_t1"].astype(int)
-
+    perf = PerfRecorder(args.profile)
     pipe = build_rf_pipeline(n_estimators=args.n_estimators, max_depth=args.max_depth)
-    pipe.fit(X_train, y_train)
+    pipe, key = fit_model(pipe, args.data, args.test_start, args.cache_dir, perf)
 
     args.out.parent.mkdir(parents=True, exist_ok=True)
     joblib.dump(pipe, args.out)
+    write_model_meta(args.out, key, perf.to_dict())
     return 0
 
 
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, cast
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from rhgp.data.dataset import date_filter, iter_batches
+from rhgp.models.train import (
+    FEATURE_COLUMNS_CAT,
+    FEATURE_COLUMNS_NUM,
+    LABEL_COLUMNS,
+    feature_columns,
+    resolve_cutoff,
+    write_model_meta,
+)
+from rhgp.perf import PerfRecorder, add_profile_argument
+
+# Out-of-core logistic regression: the training split is streamed batch by batch, so peak
+# memory depends on the batch size, not the dataset. A first pass collects the numeric
+# moments and category vocabularies that fix the preprocessor; later passes (epochs) feed
+# transformed batches to `SGDClassifier.partial_fit`. The artifact is a regular pipeline.
+
+
+@dataclass
+class StreamStats:
+    n_rows: int = 0
+    num_count: dict[str, int] = field(default_factory=dict)
+    num_sum: dict[str, float] = field(default_factory=dict)
+    num_sumsq: dict[str, float] = field(default_factory=dict)
+    cat_counts: dict[str, Counter[str]] = field(default_factory=dict)
+    class_counts: Counter[int] = field(default_factory=Counter)
+
+    def update(self, batch: pd.DataFrame) -> None:
+        self.n_rows += len(batch)
+        for c in FEATURE_COLUMNS_NUM:
+            v = batch[c].to_numpy(dtype=np.float64, na_value=np.nan)
+            v = v[~np.isnan(v)]
+            self.num_count[c] = self.num_count.get(c, 0) + len(v)
+            self.num_sum[c] = self.num_sum.get(c, 0.0) + float(v.sum())
+            self.num_sumsq[c] = self.num_sumsq.get(c, 0.0) + float(np.square(v).sum())
+        for c in FEATURE_COLUMNS_CAT:
+            counts = batch[c].astype(object).dropna().value_counts()
+            self.cat_counts.setdefault(c, Counter()).update(
+                {str(k): int(n) for k, n in counts.items()}
+            )
+        self.class_counts.update(batch["y_t1"].astype(int).tolist())
+
+    def means(self) -> np.ndarray:
+        return np.array(
+            [self.num_sum[c] / max(self.num_count[c], 1) for c in FEATURE_COLUMNS_NUM]
+        )
+
+    def imputed_vars(self) -> np.ndarray:
+        # Variance after mean imputation: missing values add rows but no squared deviation.
+        out = []
+        for c, mean in zip(FEATURE_COLUMNS_NUM, self.means(), strict=True):
+            ssd = self.num_sumsq[c] - self.num_count[c] * mean**2
+            out.append(max(ssd, 0.0) / self.n_rows if self.n_rows else 0.0)
+        return np.array(out)
+
+    def class_weight(self) -> dict[int, float]:
+        # sklearn's "balanced" weights, which `partial_fit` cannot compute itself.
+        n = sum(self.class_counts.values())
+        return {k: n / (2 * self.class_counts[k]) for k in (0, 1) if self.class_counts[k]}
+
+
+def collect_stats(batches: Iterable[pd.DataFrame]) -> StreamStats:
+    stats = StreamStats()
+    for batch in batches:
+        stats.update(batch)
+    return stats
+
+
+def build_stream_preprocessor(stats: StreamStats, sample: pd.DataFrame) -> ColumnTransformer:
+    """
+    `build_preprocessor`'s layout (with mean instead of median imputation, which cannot be
+    streamed exactly), fitted from `stats`. Fitting on `sample` only sets up the column
+    bookkeeping; every learned statistic is then replaced by the full-pass value.
+    """
+    vocab = [sorted(stats.cat_counts.get(c, {})) for c in FEATURE_COLUMNS_CAT]
+    numeric = Pipeline(
+        [
+            ("imputer", SimpleImputer(strategy="mean", keep_empty_features=True)),
+            ("scaler", StandardScaler(with_mean=False)),
+        ]
+    )
+    categorical = Pipeline(
+        [
+            ("imputer", SimpleImputer(strategy="most_frequent", keep_empty_features=True)),
+            (
+                "onehot",
+                OneHotEncoder(
+                    categories=cast(Any, vocab), handle_unknown="ignore", sparse_output=True
+                ),
+            ),
+        ]
+    )
+    pre = ColumnTransformer(
+        transformers=[
+            ("num", numeric, FEATURE_COLUMNS_NUM),
+            ("cat", categorical, FEATURE_COLUMNS_CAT),
+        ]
+    )
+    pre.fit(sample.loc[:, feature_columns()])
+
+    num = pre.named_transformers_["num"]
+    num.named_steps["imputer"].statistics_ = stats.means()
+    var = stats.imputed_vars()
+    scaler = num.named_steps["scaler"]
+    scaler.var_ = var
+    scaler.scale_ = np.where(var > 0, np.sqrt(var), 1.0)
+    scaler.n_samples_seen_ = stats.n_rows
+    modes = [
+        stats.cat_counts[c].most_common(1)[0][0] if stats.cat_counts.get(c) else None
+        for c in FEATURE_COLUMNS_CAT
+    ]
+    cat = pre.named_transformers_["cat"]
+    cat.named_steps["imputer"].statistics_ = np.array(modes, dtype=object)
+    return pre
+
+
+def train_streaming(
+    path: Path,
+    cutoff: pd.Timestamp,
+    batch_rows: int = 100_000,
+    epochs: int = 5,
+    alpha: float = 1e-4,
+    seed: int = 0,
+) -> Pipeline:
+    """
+    Logistic regression (SGD, log loss) on the rows labelled before `cutoff`, streamed in
+    batches of at most `batch_rows`. Each epoch visits the dataset files in a new shuffled
+    order and shuffles rows within each batch.
+    """
+    columns = feature_columns() + LABEL_COLUMNS
+    flt = date_filter("inspection_date_t1", "<", cutoff, path)
+    stats = collect_stats(iter_batches(path, columns, flt, batch_rows))
+    if stats.n_rows == 0:
+        raise ValueError("No training rows before the cutoff.")
+    sample = next(iter_batches(path, columns, flt, batch_rows=1_000))
+    pre = build_stream_preprocessor(stats, sample)
+
+    clf = SGDClassifier(
+        loss="log_loss", alpha=alpha, class_weight=stats.class_weight(), random_state=seed
+    )
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        for batch in iter_batches(path, columns, flt, batch_rows, seed=seed + epoch):
+            order = rng.permutation(len(batch))
+            X = pre.transform(batch.loc[:, feature_columns()].iloc[order])
+            y = batch["y_t1"].astype(int).to_numpy()[order]
+            clf.partial_fit(X, y, classes=np.array([0, 1]))
+    return Pipeline([("pre", pre), ("clf", clf)])
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Train logistic regression out of core.")
+    p.add_argument("--data", type=Path, required=True)
+    p.add_argument("--out", type=Path, required=True)
+    p.add_argument("--test-start", type=str, default=None, help="YYYY-MM-DD cutoff for t+1 date")
+    p.add_argument("--batch-rows", type=int, default=100_000)
+    p.add_argument("--epochs", type=int, default=5)
+    p.add_argument("--alpha", type=float, default=1e-4, help="L2 regularization strength.")
+    p.add_argument("--seed", type=int, default=0)
+    add_profile_argument(p)
+    args = p.parse_args(argv)
+
+    perf = PerfRecorder(args.profile)
+    cutoff, _, _ = resolve_cutoff(args.data, args.test_start)
+    with perf.stage("fit"):
+        pipe = train_streaming(
+            args.data,
+            cutoff,
+            batch_rows=args.batch_rows,
+            epochs=args.epochs,
+            alpha=args.alpha,
+            seed=args.seed,
+        )
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(pipe, args.out)
+    write_model_meta(args.out, None, perf.to_dict())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, cast
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from sklearn.pipeline import Pipeline
+
+from rhgp.models.backtest import make_folds, monthly_cutoffs, sort_by_label_date
+from rhgp.models.sweep import threshold_sweep
+from rhgp.models.train import (
+    LABEL_COLUMNS,
+    build_pipeline,
+    build_preprocessor,
+    feature_columns,
+    fit_model,
+    read_split,
+    write_model_meta,
+)
+from rhgp.models.train_rf import build_rf_pipeline
+
+# Hyperparameter search by successive halving over time-ordered validation folds inside the
+# training split (the test split is never touched). Each fold's preprocessor is fitted once
+# and its design matrices are written as .npy files (sparse ones as their CSR arrays) that
+# every worker memory-maps, so tasks only ship parameters. Candidates are first scored on
+# the most recent slice of each fold's training rows; only the best 1/eta move on to a
+# larger slice.
+
+SEARCH_SPACES: dict[str, dict[str, list[Any]]] = {
+    "logreg": {
+        "C": [0.001, 0.01, 0.1, 0.3, 1.0, 3.0, 10.0, 100.0],
+        "class_weight": ["balanced", None],
+    },
+    "rf": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [None, 8, 16, 24],
+        "min_samples_leaf": [1, 5, 20],
+        "max_features": ["sqrt", "log2"],
+    },
+}
+METRICS = ("pr_auc", "roc_auc", "f1_fail")
+
+
+def build_candidate(model: str, params: dict[str, Any]) -> Pipeline:
+    return build_rf_pipeline(**params) if model == "rf" else build_pipeline(**params)
+
+
+def candidates(model: str, n_candidates: int, seed: int = 0) -> list[dict[str, Any]]:
+    # Random draws from the grid without replacement (the whole grid if it is small enough).
+    space = SEARCH_SPACES[model]
+    n = min(n_candidates, len(ParameterGrid(space)))
+    return [dict(c) for c in ParameterSampler(space, n_iter=n, random_state=seed)]
+
+
+@dataclass(frozen=True)
+class FoldMatrices:
+    fold: int
+    X_train: Path
+    y_train: Path
+    X_val: Path
+    y_val: Path
+    n_train: int
+
+
+def save_matrix(path: Path, X: Any) -> Path:
+    """
+    Write `X` for `load_matrix`: a dense array as `<path>.npy`, a sparse one as the
+    `<path>.{data,indices,indptr,shape}.npy` arrays of its CSR form, so it stays sparse on
+    disk and in memory. Returns the path to pass to `load_matrix`.
+    """
+    if not sp.issparse(X):
+        out = path.with_suffix(".npy")
+        np.save(out, np.asarray(X))
+        return out
+    csr = sp.csr_matrix(X)
+    for part in ("data", "indices", "indptr"):
+        np.save(path.with_suffix(f".{part}.npy"), getattr(csr, part))
+    np.save(path.with_suffix(".shape.npy"), np.asarray(csr.shape))
+    return path
+
+
+def load_matrix(path: Path, last_rows: int | None = None) -> Any:
+    # Memory-mapped matrix from `save_matrix`, optionally only its last rows (a view).
+    if path.suffix == ".npy":
+        X = np.load(path, mmap_mode="r")
+        return X if last_rows is None else X[-last_rows:]
+    n_rows, n_cols = (int(n) for n in np.load(path.with_suffix(".shape.npy")))
+    lo = 0 if last_rows is None else n_rows - last_rows
+    indptr = np.load(path.with_suffix(".indptr.npy"), mmap_mode="r")[lo:]
+    start = int(indptr[0])
+    data = np.load(path.with_suffix(".data.npy"), mmap_mode="r")[start:]
+    indices = np.load(path.with_suffix(".indices.npy"), mmap_mode="r")[start:]
+    return sp.csr_matrix((data, indices, indptr - start), shape=(n_rows - lo, n_cols))
+
+
+def prepare_folds(
+    train_df: pd.DataFrame, n_folds: int, fold_months: int, work_dir: Path
+) -> list[FoldMatrices]:
+    """
+    Validation folds over a label-date-sorted training split: fold i validates on the i-th of
+    the last `n_folds` blocks of `fold_months` months and trains on everything before it.
+    """
+    t1 = cast(pd.Series, train_df["inspection_date_t1"])
+    cutoffs = monthly_cutoffs(t1, n_folds * fold_months)[::fold_months]
+    out = []
+    for f in make_folds(t1, cutoffs, horizon_months=fold_months):
+        if f.train_hi == 0 or f.test_hi == f.test_lo:
+            continue
+        train = train_df.iloc[f.train_lo : f.train_hi]
+        val = train_df.iloc[f.test_lo : f.test_hi]
+        pre = build_preprocessor()
+        arrays = {
+            "X_train": pre.fit_transform(train.loc[:, feature_columns()]),
+            "y_train": train["y_t1"].astype(int).to_numpy(),
+            "X_val": pre.transform(val.loc[:, feature_columns()]),
+            "y_val": val["y_t1"].astype(int).to_numpy(),
+        }
+        paths = {
+            name: save_matrix(work_dir / f"fold{f.fold}-{name}", arr)
+            for name, arr in arrays.items()
+        }
+        out.append(FoldMatrices(fold=f.fold, n_train=f.train_hi - f.train_lo, **paths))
+    return out
+
+
+def score(y_true: np.ndarray, p_fail: np.ndarray, metric: str) -> float:
+    sweep = threshold_sweep(y_true, p_fail)
+    if metric == "f1_fail":
+        best = sweep.best_f1()
+        return best["f1_fail"] if best else 0.0
+    value = sweep.pr_auc() if metric == "pr_auc" else sweep.roc_auc()
+    return float("nan") if value is None else value
+
+
+def _fit_score(task: tuple[str, dict[str, Any], FoldMatrices, int, str]) -> tuple[float, float]:
+    # Runs in a worker: the fold matrices are memory-mapped, and slicing the most recent
+    # `n_rows` training rows is a view, not a copy (only a sparse matrix's indptr is copied).
+    model, params, fm, n_rows, metric = task
+    t0 = time.perf_counter()
+    X = load_matrix(fm.X_train, n_rows)
+    y = load_matrix(fm.y_train, n_rows)
+    clf = build_candidate(model, params).named_steps["clf"]
+    if model == "rf":
+        clf.set_params(n_jobs=1)
+    clf.fit(X, y)
+    p_fail = clf.predict_proba(load_matrix(fm.X_val))[:, 1]
+    return score(np.asarray(load_matrix(fm.y_val)), p_fail, metric), time.perf_counter() - t0
+
+
+def successive_halving(
+    model: str,
+    params: list[dict[str, Any]],
+    folds: list[FoldMatrices],
+    metric: str = "pr_auc",
+    eta: int = 3,
+    min_rows: int = 2000,
+    pool: Executor | None = None,
+) -> pd.DataFrame:
+    """
+    Leaderboard of every (rung, candidate) evaluation. Rung k trains on a fraction
+    eta**(k - last) of each fold's most recent rows (at least `min_rows`), and keeps the best
+    ceil(n / eta) candidates by mean validation `metric`; the last rung uses all rows.
+    """
+    alive = list(range(len(params)))
+    last = 0
+    while eta**last < len(params):
+        last += 1
+    rows: list[dict[str, Any]] = []
+    for rung in range(last + 1):
+        frac = float(eta ** (rung - last))
+        sizes = [min(fm.n_train, max(min_rows, math.ceil(frac * fm.n_train))) for fm in folds]
+        tasks = [
+            (model, params[c], fm, n, metric)
+            for c in alive
+            for fm, n in zip(folds, sizes, strict=True)
+        ]
+        results = list(pool.map(_fit_score, tasks)) if pool else [_fit_score(t) for t in tasks]
+        means: dict[int, float] = {}
+        for i, c in enumerate(alive):
+            fold_results = results[i * len(folds) : (i + 1) * len(folds)]
+            fold_scores = [s for s, _ in fold_results]
+            means[c] = float(np.nanmean(fold_scores))
+            rows.append(
+                {
+                    "rung": rung,
+                    "candidate": c,
+                    "params": json.dumps(params[c], sort_keys=True),
+                    "train_fraction": frac,
+                    "n_train_rows": int(sum(sizes)),
+                    metric: means[c],
+                    f"{metric}_std": float(np.nanstd(fold_scores)),
+                    "fold_scores": json.dumps([round(s, 6) for s in fold_scores]),
+                    "fit_s": float(sum(t for _, t in fold_results)),
+                }
+            )
+        if rung < last:
+            # Stable sort: ties keep candidate order, so the search is deterministic.
+            ranked = sorted(alive, key=lambda c: -means[c])
+            alive = ranked[: max(1, math.ceil(len(alive) / eta))]
+    board = pd.DataFrame(rows)
+    return board.sort_values(["rung", metric], ascending=[False, False], ignore_index=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Tune hyperparameters with successive halving.")
+    p.add_argument("--data", type=Path, required=True)
+    p.add_argument("--model", choices=sorted(SEARCH_SPACES), default="logreg")
+    p.add_argument("--out", type=Path, required=True, help="Best pipeline artifact.")
+    p.add_argument("--out-dir", type=Path, required=True, help="Leaderboard directory.")
+    p.add_argument("--test-start", type=str, default=None, help="YYYY-MM-DD cutoff for t+1 date")
+    p.add_argument("--n-candidates", type=int, default=24)
+    p.add_argument("--folds", type=int, default=3, help="Time-ordered validation folds.")
+    p.add_argument("--fold-months", type=int, default=2)
+    p.add_argument("--metric", choices=METRICS, default="pr_auc")
+    p.add_argument("--eta", type=int, default=3, help="Keep the best 1/eta per rung.")
+    p.add_argument("--min-rows", type=int, default=2000)
+    p.add_argument("--workers", type=int, default=1, help="Processes evaluating candidates.")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Reuse the fitted preprocessor and design matrices for the final fit.",
+    )
+    args = p.parse_args(argv)
+
+    t0 = time.perf_counter()
+    train_df, cutoff, _, _ = read_split(
+        args.data, "train", feature_columns() + LABEL_COLUMNS, test_start=args.test_start
+    )
+    train_df = sort_by_label_date(train_df)
+    params = candidates(args.model, args.n_candidates, seed=args.seed)
+
+    with tempfile.TemporaryDirectory(prefix="rhgp-tune-") as tmp:
+        folds = prepare_folds(train_df, args.folds, args.fold_months, Path(tmp))
+        if not folds:
+            raise ValueError("Training split too short for the requested validation folds.")
+        del train_df
+        if args.workers > 1:
+            ctx = mp.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx) as pool:
+                board = successive_halving(
+                    args.model, params, folds, args.metric, args.eta, args.min_rows, pool
+                )
+        else:
+            board = successive_halving(
+                args.model, params, folds, args.metric, args.eta, args.min_rows
+            )
+
+    best = cast(dict[str, Any], json.loads(str(board.loc[0, "params"])))
+    pipe, key = fit_model(
+        build_candidate(args.model, best), args.data, args.test_start, args.cache_dir
+    )
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(pipe, args.out)
+    write_model_meta(args.out, key)
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    board.to_csv(args.out_dir / "leaderboard.csv", index=False)
+    summary = {
+        "model": args.model,
+        "metric": args.metric,
+        "best_params": best,
+        "best_score": float(cast(float, board.loc[0, args.metric])),
+        "cutoff_date": pd.to_datetime(cutoff).date().isoformat(),
+        "n_candidates": len(params),
+        "n_folds": len(folds),
+        "n_evaluations": int(len(board)) * len(folds),
+        "eta": args.eta,
+        "workers": args.workers,
+        "wall_s": time.perf_counter() - t0,
+    }
+    (args.out_dir / "tune.json").write_text(json.dumps(summary, indent=2))
+    cols = ["rung", "candidate", "params", "train_fraction", args.metric]
+    print(board.loc[:, cols].head(10).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import argparse
+import cProfile
+import resource
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+# Lightweight per-stage instrumentation for the CLIs: wall and CPU time, peak memory and
+# rows/s of each named stage, written into the command's existing metadata output
+# (`*.meta.json`, `metrics.json`) under "perf". With a profile directory, every stage is
+# also run under cProfile and dumped to `<dir>/<stage>.prof` (pstats format, readable by
+# `python -m pstats`, snakeviz, or flamegraph converters such as flameprof).
+#
+# Peak RSS is per stage on Linux, where the high-water mark can be reset through
+# /proc/self/clear_refs; elsewhere it is the process peak so far. The tracemalloc peak is
+# recorded only when tracing is already on (`python -X tracemalloc ...`), since tracing
+# slows allocation-heavy code severalfold.
+
+_CLEAR_REFS = Path("/proc/self/clear_refs")
+_STATUS = Path("/proc/self/status")
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        _CLEAR_REFS.write_text("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_mb() -> float:
+    try:
+        for line in _STATUS.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux (bytes on macOS, where this is only a rough figure).
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@dataclass
+class StageStats:
+    name: str
+    rows: int | None = None
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_mb: float = 0.0
+    rss_is_stage_peak: bool = False
+    traced_peak_mb: float | None = None
+    profile: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "wall_s": round(self.wall_s, 4),
+            "cpu_s": round(self.cpu_s, 4),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "rss_is_stage_peak": self.rss_is_stage_peak,
+        }
+        if self.rows is not None:
+            out["rows"] = self.rows
+            out["rows_per_s"] = round(self.rows / self.wall_s, 1) if self.wall_s > 0 else None
+        if self.traced_peak_mb is not None:
+            out["traced_peak_mb"] = round(self.traced_peak_mb, 1)
+        if self.profile is not None:
+            out["profile"] = self.profile
+        return out
+
+
+class PerfRecorder:
+    """Collects `StageStats` for the stages of one command run, in execution order."""
+
+    def __init__(self, profile_dir: Path | None = None) -> None:
+        self.profile_dir = profile_dir
+        self.stages: list[StageStats] = []
+        self._profiling = False
+
+    @contextmanager
+    def stage(self, name: str, rows: int | None = None) -> Iterator[StageStats]:
+        """
+        Measure the enclosed block. `rows` (or `stats.rows`, set inside the block once the
+        row count is known) gives rows/s. Nested stages are measured but not profiled.
+        """
+        stats = StageStats(name, rows=rows)
+        stats.rss_is_stage_peak = _reset_peak_rss()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        profiler = None
+        if self.profile_dir is not None and not self._profiling:
+            profiler = cProfile.Profile()
+            self._profiling = True
+            profiler.enable()
+        t0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield stats
+        finally:
+            stats.wall_s = time.perf_counter() - t0
+            stats.cpu_s = time.process_time() - c0
+            if profiler is not None and self.profile_dir is not None:
+                profiler.disable()
+                self._profiling = False
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                path = self.profile_dir / f"{name}.prof"
+                profiler.dump_stats(path)
+                stats.profile = str(path)
+            stats.peak_rss_mb = peak_rss_mb()
+            if tracing:
+                stats.traced_peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+            self.stages.append(stats)
+
+    def to_dict(self) -> dict[str, dict[str, Any]]:
+        return {s.name: s.to_dict() for s in self.stages}
+
+
+def add_profile_argument(p: argparse.ArgumentParser) -> None:
+    p.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="Dump a cProfile file per stage (<DIR>/<stage>.prof).",
+    )
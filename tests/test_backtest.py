@@ -0,0 +1,59 @@
+from datetime import date
+from pathlib import Path
+from typing import cast
+
+import pandas as pd
+
+from rhgp.data.dataset import write_dataset
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset
+from rhgp.models.backtest import (
+    backtest,
+    load_sorted,
+    make_folds,
+    monthly_cutoffs,
+    open_columns,
+    share_columns,
+)
+
+
+def test_folds_are_label_date_ranges_and_parallel_matches_serial(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=200, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=4)
+    root = tmp_path / "dataset"
+    write_dataset(build_supervised_dataset(raw), root)
+
+    df = load_sorted(root)
+    t1 = cast(pd.Series, df["inspection_date_t1"])
+    cutoffs = monthly_cutoffs(t1, folds=3, start="2024-03")
+    assert cutoffs == list(pd.date_range("2024-03-01", periods=3, freq="MS"))
+    for fold in make_folds(t1, cutoffs, horizon_months=2, train_months=12):
+        train = t1.iloc[fold.train_lo : fold.train_hi]
+        test = t1.iloc[fold.test_lo : fold.test_hi]
+        window_start = fold.cutoff - pd.DateOffset(months=12)
+        assert len(train) == ((t1 >= window_start) & (t1 < fold.cutoff)).sum()
+        assert len(test) == ((t1 >= fold.cutoff) & (t1 < fold.test_end)).sum()
+        assert fold.test_end == fold.cutoff + pd.DateOffset(months=2)
+
+    serial, folds = backtest(root, folds=4, workers=1)
+    parallel, _ = backtest(root, folds=4, workers=2)
+    timing = ["fold_s", "fit_s"]
+    pd.testing.assert_frame_equal(serial.drop(columns=timing), parallel.drop(columns=timing))
+    assert len(folds) == 4
+    assert set(serial["model"]) == {"logreg", "always_a", "persistence", "grade_conditional"}
+    assert (serial.groupby("fold")["n_train"].first().diff().dropna() > 0).all()
+
+
+def test_shared_columns_round_trip_without_copies(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=50, start=date(2023, 1, 1), end=date(2025, 1, 1), seed=2)
+    root = tmp_path / "dataset"
+    write_dataset(build_supervised_dataset(raw), root)
+    df = load_sorted(root)
+
+    work = tmp_path / "shared"
+    work.mkdir()
+    shared = open_columns(work, share_columns(df, work))
+    pd.testing.assert_frame_equal(shared, df)
+    # Columns and their row slices are read-only views of the mapped files.
+    part = shared.iloc[10:20]
+    for col in (part["score_t"].to_numpy(), part["grade_t"].cat.codes.to_numpy()):
+        assert not col.flags.writeable
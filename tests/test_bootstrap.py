@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rhgp.models.bootstrap import bootstrap_metrics, cluster_counts
+from rhgp.models.sweep import threshold_sweep
+
+
+def _data(n_clusters: int, rows_per_cluster: int, seed: int) -> tuple[np.ndarray, ...]:
+    rng = np.random.default_rng(seed)
+    clusters = np.repeat(rng.permutation(n_clusters) + 40_000_000, rows_per_cluster)
+    y = (rng.random(len(clusters)) < 0.3).astype(int)
+    model = np.where(rng.random(len(y)) < 0.7, y, 1 - y)
+    baseline = (rng.random(len(y)) < 0.5).astype(int)
+    return clusters, y, model, baseline
+
+
+def test_cluster_counts_match_groupby() -> None:
+    clusters, y, model, _ = _data(50, 4, seed=0)
+    counts = cluster_counts(clusters, y, {"model": model})
+    df = pd.DataFrame({"camis": clusters, "y": y, "p": model})
+    expected = (
+        df.assign(tp=df.p & df.y, fp=df.p & (1 - df.y), fn=(1 - df.p) & df.y)
+        .groupby("camis")[["tp", "fp", "fn"]]
+        .sum()
+    )
+    np.testing.assert_array_equal(counts, expected.to_numpy())
+
+
+def test_bootstrap_cis_are_reproducible_and_cover_point_estimate() -> None:
+    clusters, y, model, baseline = _data(300, 3, seed=1)
+    preds = {"model": model, "always_a": baseline}
+    serial = bootstrap_metrics(clusters, y, preds, n_resamples=1200, seed=5)
+    parallel = bootstrap_metrics(clusters, y, preds, n_resamples=1200, seed=5, workers=2)
+    assert serial == parallel
+    assert serial["n_clusters"] == 300
+
+    point = threshold_sweep(y, model).rows([0.5])[0]
+    for metric in ("precision_fail", "recall_fail", "f1_fail"):
+        ci = serial["model"][metric]
+        assert ci["low"] < point[metric] < ci["high"]
+    assert set(serial["model_minus_always_a"]) == {"precision_fail", "recall_fail", "f1_fail"}
+
+
+def test_resampling_draws_whole_restaurants() -> None:
+    # Repeating every row of a restaurant scales all its counts, so ratio CIs are unchanged.
+    clusters, y, model, _ = _data(200, 1, seed=2)
+    once = bootstrap_metrics(clusters, y, {"model": model}, 300, seed=3)
+    repeated = bootstrap_metrics(
+        np.repeat(clusters, 4), np.repeat(y, 4), {"model": np.repeat(model, 4)}, 300, seed=3
+    )
+    for metric in ("precision_fail", "recall_fail", "f1_fail"):
+        assert repeated["model"][metric] == pytest.approx(once["model"][metric])
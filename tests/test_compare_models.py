@@ -0,0 +1,43 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from rhgp.data.dataset import write_dataset
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset
+from rhgp.models import compare, eval, train, train_rf
+
+
+def test_compare_matches_single_model_evals(tmp_path: Path) -> None:
+    data = tmp_path / "dataset"
+    raw = synthetic_raw(n_restaurants=200, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=2)
+    write_dataset(build_supervised_dataset(raw), data)
+    cache = ["--cache-dir", str(tmp_path / "cache")]
+    logreg, rf = tmp_path / "logreg.joblib", tmp_path / "rf.joblib"
+    train.main(["--data", str(data), "--out", str(logreg), *cache])
+    train_rf.main(["--data", str(data), "--out", str(rf), "--n-estimators", "20"])
+
+    out = tmp_path / "compare"
+    models = ["--model", str(logreg), "--model", str(rf)]
+    compare.main(
+        ["--data", str(data), *models, "--out-dir", str(out), "--jobs", "2", *cache]
+        + ["--thresholds", "0.5,0.7", "--bootstrap", "200"]
+    )
+    combined = json.loads((out / "metrics.json").read_text())
+    scores = combined["scores"]
+    assert list(scores) == ["logreg", "rf", "always_a", "persistence", "grade_conditional"]
+    assert {"logreg_minus_grade_conditional", "logreg_minus_rf"} <= set(combined["bootstrap"])
+    assert (out / "comparison.csv").read_text().count("\n") == 2 * len(scores) + 1
+
+    for key, path in [("logreg", logreg), ("rf", rf)]:
+        single = tmp_path / f"eval-{key}"
+        eval.main(["--data", str(data), "--model", str(path), "--out-dir", str(single)])
+        expected = json.loads((single / "metrics.json").read_text())
+        assert combined["n_test"] == expected["n_test"]
+        for name in (key, "always_a", "persistence"):
+            assert scores[name]["f1_fail"] == pytest.approx(expected[name]["f1_fail"])
+        assert scores[key]["curve"]["pr_auc"] == pytest.approx(
+            expected[f"{key}_curve"]["pr_auc"]
+        )
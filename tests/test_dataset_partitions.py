@@ -0,0 +1,53 @@
+import os
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from rhgp.data.dataset import dataset_files, date_filter, write_dataset
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset
+from rhgp.models.eval import dataset_fingerprint
+from rhgp.models.train import LABEL_COLUMNS, feature_columns, read_split, time_split
+
+
+def _sorted(df: pd.DataFrame) -> pd.DataFrame:
+    return df.sort_values(["inspection_date_t1", "score_t", "grade_t"], ignore_index=True)
+
+
+def test_read_split_matches_time_split_and_prunes_months(tmp_path: Path) -> None:
+    df = build_supervised_dataset(
+        synthetic_raw(n_restaurants=200, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=6)
+    )
+    root = tmp_path / "dataset"
+    write_dataset(df, root)
+    assert all(Path(f).parent.name.startswith("t1_month=") for f in dataset_files(root))
+
+    cols = feature_columns() + LABEL_COLUMNS
+    for test_start in (None, "2024-10-01"):
+        train, test, cutoff, method, frac = time_split(df, test_start=test_start)
+        got_train, *split = read_split(root, "train", cols, test_start)
+        got_test, *_ = read_split(root, "test", cols, test_start)
+        assert split == [cutoff, method, frac]
+        assert list(got_test.columns) == cols
+        pd.testing.assert_frame_equal(_sorted(got_train), _sorted(train.loc[:, cols]))
+        pd.testing.assert_frame_equal(_sorted(got_test), _sorted(test.loc[:, cols]))
+
+    # The recent test window (from 2024-10-01, the last cutoff) only opens a few files.
+    recent = date_filter("inspection_date_t1", ">=", cutoff, root)
+    assert len(dataset_files(root, recent)) <= 3 < len(dataset_files(root)) // 4
+
+    fp = dataset_fingerprint(root)
+    assert fp["exists"] and fp["files"] == len(dataset_files(root))
+
+
+def test_fingerprint_time_format_is_stable(tmp_path: Path) -> None:
+    # Design cache keys embed the fingerprint, so its string form must not change.
+    path = tmp_path / "data.parquet"
+    pd.DataFrame({"x": [1]}).to_parquet(path)
+    for ns, expected in [
+        (1_717_243_200_250_000_000, "2024-06-01T12:00:00.250000Z"),
+        (1_717_243_200_000_000_000, "2024-06-01T12:00:00Z"),
+    ]:
+        os.utime(path, ns=(ns, ns))
+        assert dataset_fingerprint(path)["mtime_utc"] == expected
@@ -0,0 +1,66 @@
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from rhgp.data.dataset import write_dataset
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset
+from rhgp.models.cache import DesignCache
+from rhgp.models.train import build_pipeline, design_matrices, fit_model, resolve_cutoff
+
+
+def _dataset(root: Path, seed: int, n_restaurants: int = 120) -> None:
+    raw = synthetic_raw(
+        n_restaurants=n_restaurants, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=seed
+    )
+    write_dataset(build_supervised_dataset(raw), root)
+
+
+def test_cached_design_matches_uncached_training(tmp_path: Path) -> None:
+    root = tmp_path / "dataset"
+    _dataset(root, seed=3)
+    cache_dir = tmp_path / "cache"
+
+    plain, key = fit_model(build_pipeline(), root, "2024-06-01", None)
+    assert key is None
+    first, key1 = fit_model(build_pipeline(), root, "2024-06-01", cache_dir)
+    second, key2 = fit_model(build_pipeline(), root, "2024-06-01", cache_dir)
+    assert key1 is not None and key1 == key2
+    expected = plain.named_steps["clf"]
+    for model in (first, second):
+        clf = model.named_steps["clf"]
+        np.testing.assert_array_equal(clf.coef_, expected.coef_)
+        np.testing.assert_array_equal(clf.intercept_, expected.intercept_)
+
+    cache = DesignCache(cache_dir)
+    cutoff, _, _ = resolve_cutoff(root, "2024-06-01")
+    dm = design_matrices(root, cutoff, cache)
+    assert cache.stats.hits == 1 and cache.stats.stored == 0
+    assert dm.X_train.shape[0] == len(dm.y_train)
+
+    # Rewriting the dataset changes its fingerprint: a miss that evicts the stale entry.
+    _dataset(root, seed=4, n_restaurants=130)
+    cutoff, _, _ = resolve_cutoff(root, "2024-06-01")
+    fresh = design_matrices(root, cutoff, cache)
+    assert fresh.key != dm.key
+    assert cache.stats.misses == 1 and cache.stats.evicted == 1
+    assert [p.name for p in cache_dir.iterdir()] == [fresh.key]
+
+
+def test_cache_evicts_least_recently_used_over_size_limit(tmp_path: Path) -> None:
+    roots = [tmp_path / f"dataset-{i}" for i in range(3)]
+    for i, root in enumerate(roots):
+        _dataset(root, seed=i)
+    cache = DesignCache(tmp_path / "cache")
+    keys = []
+    for root in roots:
+        cutoff, _, _ = resolve_cutoff(root)
+        keys.append(design_matrices(root, cutoff, cache).key)
+    assert cache.stats.evicted == 0
+
+    cache.max_bytes = sum(
+        p.stat().st_size for p in (tmp_path / "cache" / keys[-1]).iterdir()
+    ) + 1
+    cache.evict(keep=keys[-1])
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == [keys[-1]]
@@ -0,0 +1,100 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from rhgp.data import fetch
+from rhgp.data.fetch import FetchConfig, fetch_incremental, meta_path_for, read_watermark
+from rhgp.data.mock_socrata import MockSocrata
+
+
+def _row(camis: str, day: str, code: str, grade: str | None = "A") -> dict[str, str]:
+    r = {
+        "camis": camis,
+        "inspection_date": f"{day}T00:00:00.000",
+        "inspection_type": "Cycle Inspection / Initial Inspection",
+        "score": "12",
+        "violation_code": code,
+        "critical_flag": "Not Critical",
+    }
+    if grade:
+        r["grade"] = grade
+    return r
+
+
+def _run(mock: MockSocrata, out: Path) -> dict[str, object]:
+    cfg = FetchConfig(
+        since_date=date(2024, 1, 1), limit=2, base_url=mock.base_url, meta_url=mock.meta_url
+    )
+    meta = fetch_incremental(out, cfg)
+    meta_path_for(out).write_text(json.dumps(meta))
+    return meta
+
+
+def test_incremental_fetch_appends_only_new_rows(tmp_path: Path) -> None:
+    out = tmp_path / "snapshot"
+    records = [
+        _row("1", "2024-01-02", "10F"),
+        _row("2", "2024-01-05", "04L", grade=None),
+        _row("3", "2024-01-09", "06C"),
+        _row("3", "2024-01-09", "06C"),
+    ]
+    with MockSocrata(records) as mock:
+        meta = _run(mock, out)
+        assert meta["rows"] == 4
+        assert read_watermark(out) is not None
+
+        # Overlap day gains one row; a new day arrives.
+        mock.records = [*records, _row("3", "2024-01-09", "02B"), _row("1", "2024-01-11", "10F")]
+        meta = _run(mock, out)
+        assert mock.requests[-1]["$where"] == "inspection_date >= '2024-01-09'"
+
+    assert meta["rows"] == 6
+    assert meta["partitions"] == 2
+    assert meta["max_inspection_date"] == "2024-01-11"
+    assert len(pd.read_parquet(out / "part-00001.parquet")) == 2
+
+    snapshot = pd.read_parquet(out)
+    assert len(snapshot) == 6
+    # Repeated overlap-day rows that were already stored are not appended again.
+    assert int((snapshot["camis"] == 3).sum()) == 3
+
+
+class _Crash(Exception):
+    pass
+
+
+@pytest.mark.parametrize("crash_after_meta", [False, True])
+def test_incremental_fetch_recovers_from_crash_between_writes(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, crash_after_meta: bool
+) -> None:
+    out = tmp_path / "snapshot"
+    records = [_row("1", "2024-01-02", "10F"), _row("2", "2024-01-05", "04L")]
+    later = [_row("3", "2024-01-08", "06C"), _row("3", "2024-01-09", "02B")]
+    with MockSocrata(records) as mock:
+        _run(mock, out)
+        mock.records = [*records, *later]
+
+        # Die after the delta is written but before (or right after) the meta commit.
+        write_meta = fetch.write_meta
+
+        def crash(out: Path, meta: dict[str, object]) -> None:
+            if crash_after_meta:
+                write_meta(out, meta)
+            raise _Crash
+
+        with monkeypatch.context() as m:
+            m.setattr(fetch, "write_meta", crash)
+            with pytest.raises(_Crash):
+                _run(mock, out)
+        assert len(pd.read_parquet(out)) == 2
+
+        meta = _run(mock, out)
+
+    # Each later day is stored exactly once, whichever side of the commit the crash hit.
+    snapshot = pd.read_parquet(out)
+    assert len(snapshot) == meta["rows"] == 4
+    assert sorted(snapshot["inspection_date"].dt.day) == [2, 5, 8, 9]
+    assert not list(out.glob(".*.tmp"))
@@ -0,0 +1,49 @@
+from dataclasses import replace
+from datetime import date
+
+import pandas as pd
+
+from rhgp.data.fetch import FetchConfig, date_windows, fetch_all
+from rhgp.data.mock_socrata import MockSocrata
+from rhgp.data.synthetic import synthetic_raw, to_socrata_records
+
+
+def test_date_windows_are_disjoint_and_cover_range() -> None:
+    w = date_windows(date(2024, 1, 1), date(2024, 3, 1), days=30)
+    assert w[0] == (date(2024, 1, 1), date(2024, 1, 31))
+    assert w[-1][1] == date(2024, 3, 1)
+    assert all(a[1] == b[0] for a, b in zip(w, w[1:], strict=False))
+    assert date_windows(date(2024, 1, 1), None, days=30)[-1][1] is None
+
+
+def test_parallel_fetch_matches_serial_under_throttling() -> None:
+    raw = synthetic_raw(n_restaurants=40, start=date(2023, 1, 1), end=date(2024, 1, 1), seed=3)
+    with MockSocrata(to_socrata_records(raw), throttle_every=7) as mock:
+        base = FetchConfig(
+            since_date=date(2023, 1, 1), limit=25, base_url=mock.base_url, meta_url=mock.meta_url
+        )
+        serial = fetch_all(base)
+        parallel = fetch_all(replace(base, workers=4, window_days=20))
+        assert mock.throttled > 0
+
+    assert len(serial) == len(raw)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_throttled_requests_wait_for_retry_after() -> None:
+    raw = synthetic_raw(n_restaurants=5, start=date(2023, 1, 1), end=date(2024, 1, 1), seed=4)
+    # The 2nd request (the first resource page) is throttled with Retry-After: 1.
+    with MockSocrata(to_socrata_records(raw), throttle_every=2, retry_after_s=1) as mock:
+        cfg = FetchConfig(
+            since_date=date(2023, 1, 1),
+            limit=10_000,
+            base_url=mock.base_url,
+            meta_url=mock.meta_url,
+        )
+        df = fetch_all(cfg)
+        assert mock.throttled >= 1
+        # The retry came after the advertised delay, not the shorter 0.5 s backoff.
+        throttled = 1
+        assert mock.arrivals[throttled + 1] - mock.arrivals[throttled] >= 1.0
+
+    assert len(df) == len(raw)
@@ -0,0 +1,38 @@
+from dataclasses import replace
+from datetime import date
+
+import pandas as pd
+
+from rhgp.data.fetch import FetchConfig, build_params, fetch_all
+from rhgp.data.mock_socrata import MockSocrata
+from rhgp.data.synthetic import synthetic_raw, to_socrata_records
+from rhgp.features.aggregate_inspections import (
+    aggregate_to_inspections,
+    normalize_inspection_level,
+)
+from rhgp.features.build_examples import build_supervised_dataset
+
+
+def test_build_params_groups_by_inspection() -> None:
+    cfg = FetchConfig(since_date=date(2023, 1, 1), server_aggregate=True)
+    p = build_params(cfg, offset=0)
+    assert p["$group"] == "camis, inspection_date"
+    assert "count(violation_code) AS n_violations_t" in p["$select"]
+
+
+def test_server_aggregation_matches_client_side() -> None:
+    raw = synthetic_raw(n_restaurants=60, start=date(2022, 1, 1), end=date(2024, 1, 1), seed=4)
+    with MockSocrata(to_socrata_records(raw)) as mock:
+        cfg = FetchConfig(
+            since_date=date(2022, 1, 1), limit=50, base_url=mock.base_url, meta_url=mock.meta_url
+        )
+        violations = fetch_all(cfg)
+        inspections = fetch_all(replace(cfg, server_aggregate=True))
+
+    assert len(inspections) < len(violations)
+    pd.testing.assert_frame_equal(
+        normalize_inspection_level(inspections), aggregate_to_inspections(violations)
+    )
+    pd.testing.assert_frame_equal(
+        build_supervised_dataset(inspections), build_supervised_dataset(violations)
+    )
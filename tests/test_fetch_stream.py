@@ -0,0 +1,31 @@
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from rhgp.data.fetch import FetchConfig, fetch_all, fetch_to_parquet
+from rhgp.data.mock_socrata import MockSocrata
+from rhgp.data.schema import read_raw
+from rhgp.data.synthetic import synthetic_raw, to_socrata_records
+
+
+def test_streamed_snapshot_matches_buffered_fetch(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=30, start=date(2023, 1, 1), end=date(2024, 1, 1), seed=1)
+    out = tmp_path / "raw.parquet"
+    with MockSocrata(to_socrata_records(raw)) as mock:
+        cfg = FetchConfig(
+            since_date=date(2023, 1, 1), limit=40, base_url=mock.base_url, meta_url=mock.meta_url
+        )
+        buffered = fetch_all(cfg)
+        rows, max_date = fetch_to_parquet(cfg, out)
+
+    assert rows == len(buffered) == pq.ParquetFile(out).metadata.num_rows
+    assert max_date == buffered["inspection_date"].max().date()
+    # One row group per page.
+    assert pq.ParquetFile(out).num_row_groups == -(-rows // 40)
+    assert not out.with_name(out.name + ".tmp").exists()
+
+    buffered.to_parquet(tmp_path / "buffered.parquet", index=False)
+    pd.testing.assert_frame_equal(read_raw(out), read_raw(tmp_path / "buffered.parquet"))
+    pd.testing.assert_frame_equal(read_raw(out), buffered)
@@ -0,0 +1,50 @@
+from datetime import date
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from rhgp.data.dataset import write_dataset
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset
+from rhgp.models import forest, predict
+from rhgp.models.train import feature_columns, time_split
+from rhgp.models.train_rf import build_rf_pipeline
+
+
+def test_exported_forest_matches_pipeline(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=300, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=5)
+    df = build_supervised_dataset(raw)
+    train, test, *_ = time_split(df)
+    pipe = build_rf_pipeline(n_estimators=25)
+    pipe.fit(train.loc[:, feature_columns()], train["y_t1"].astype(int))
+
+    path = forest.export_forest(pipe, tmp_path / "rf.forest")
+    model = forest.load_model(path)
+    assert isinstance(model, forest.ForestModel) and model.n_trees == 25
+
+    # Missing numerics and categoricals, and an unseen category, take the pipeline's paths.
+    X = test.loc[:, feature_columns()].copy()
+    X.loc[X.index[:3], "prev_score"] = np.nan
+    X.loc[X.index[3:6], "grade_t"] = None
+    unseen = X.head(5).copy()
+    unseen["inspection_type"] = "Never seen / Initial"
+    for frame in (X, unseen, X.head(1)):
+        np.testing.assert_allclose(
+            model.predict_proba(frame, block_rows=64), pipe.predict_proba(frame), atol=1e-12
+        )
+
+    # The batch scorer accepts the exported file in place of the joblib pipeline.
+    data = tmp_path / "dataset"
+    write_dataset(df, data)
+    joblib.dump(pipe, tmp_path / "rf.joblib")
+    predict.predict(tmp_path / "rf.joblib", data, tmp_path / "a.parquet", chunk_rows=500)
+    predict.predict(path, data, tmp_path / "b.parquet", chunk_rows=500)
+    a, b = pd.read_parquet(tmp_path / "a.parquet"), pd.read_parquet(tmp_path / "b.parquet")
+    np.testing.assert_allclose(a["p_fail"].to_numpy(), b["p_fail"].to_numpy(), atol=1e-12)
+
+    (tmp_path / "bad.forest").write_bytes(b"not a forest")
+    with pytest.raises(ValueError):
+        forest.ForestModel.load(tmp_path / "bad.forest")
@@ -0,0 +1,66 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.aggregate_inspections import aggregate_to_inspections
+from rhgp.features.features import HistoryConfig, add_history_features
+
+
+def _reference(inspections_t: pd.DataFrame) -> pd.DataFrame:
+    # Previous groupby/apply implementation, kept as the parity oracle.
+    df = inspections_t.sort_values(["camis", "inspection_date_t"]).copy()
+    df["prev_grade"] = df.groupby("camis")["grade_t"].shift(1)
+    df["prev_score"] = df.groupby("camis")["score_t"].shift(1)
+    df["prev_n_violations"] = df.groupby("camis")["n_violations_t"].shift(1)
+    df["prev_n_critical_violations"] = df.groupby("camis")["n_critical_violations_t"].shift(1)
+    for col in ["score_t", "n_violations_t", "n_critical_violations_t"]:
+        df[f"{col}_mean_prev3"] = (
+            df.groupby("camis")[col]
+            .apply(lambda s: s.shift(1).rolling(3, min_periods=1).mean())
+            .reset_index(level=0, drop=True)
+        )
+    return df
+
+
+def _inspections() -> pd.DataFrame:
+    raw = synthetic_raw(n_restaurants=200, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=3)
+    t = aggregate_to_inspections(raw)
+    # Missing scores exercise the null handling in the window means.
+    t.loc[t.index % 7 == 0, "score_t"] = np.nan
+    return t.sample(frac=1.0, random_state=0)
+
+
+def test_default_history_matches_groupby_reference() -> None:
+    t = _inspections()
+    pd.testing.assert_frame_equal(add_history_features(t), _reference(t), check_exact=True)
+
+
+def test_configurable_count_and_day_windows() -> None:
+    t = _inspections()
+    cfg = HistoryConfig(windows=(1, 5), day_windows=(365,))
+    out = add_history_features(t, cfg)
+    assert set(cfg.feature_names()) <= set(out.columns)
+
+    ref = _reference(t)
+    for w in (1, 5):
+        expected = (
+            ref.groupby("camis")["score_t"]
+            .apply(lambda s, w=w: s.shift(1).rolling(w, min_periods=1).mean())
+            .reset_index(level=0, drop=True)
+        )
+        pd.testing.assert_series_equal(
+            out[f"score_t_mean_prev{w}"], expected, check_names=False, check_exact=True
+        )
+
+    # Time window: prior inspections of the same restaurant within the last 365 days.
+    for _, g in out.groupby("camis"):
+        dates = g["inspection_date_t"].to_numpy()
+        scores = g["score_t"].to_numpy(dtype=np.float64)
+        for i in range(len(g)):
+            prior = (dates < dates[i]) & (dates > dates[i] - np.timedelta64(365, "D"))
+            assert g["n_inspections_prev365d"].iloc[i] == prior.sum()
+            vals = scores[prior][~np.isnan(scores[prior])]
+            got = g["score_t_mean_prev365d"].iloc[i]
+            assert np.isnan(got) if len(vals) == 0 else np.isclose(got, vals.mean())
@@ -0,0 +1,44 @@
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from rhgp.data.fetch import FetchConfig, _build_session, fetch_all
+from rhgp.data.http_cache import ResponseCache
+from rhgp.data.mock_socrata import MockSocrata
+from rhgp.data.synthetic import synthetic_raw, to_socrata_records
+
+
+def test_rerun_on_unchanged_upstream_is_served_from_cache(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=20, start=date(2023, 1, 1), end=date(2024, 1, 1), seed=5)
+    with MockSocrata(to_socrata_records(raw)) as mock:
+        cfg = FetchConfig(
+            since_date=date(2023, 1, 1), limit=50, base_url=mock.base_url, meta_url=mock.meta_url
+        )
+        first = fetch_all(cfg, session=_build_session(cache=ResponseCache(tmp_path)))
+        sent_after_first = mock.bytes_sent
+
+        cache = ResponseCache(tmp_path)
+        second = fetch_all(cfg, session=_build_session(cache=cache))
+        assert mock.bytes_sent == sent_after_first
+        assert cache.stats.misses == 0
+        assert cache.stats.hits == mock.not_modified > 0
+
+        # Upstream change invalidates the affected pages only.
+        mock.records = to_socrata_records(raw.iloc[:-1])
+        cache = ResponseCache(tmp_path)
+        fetch_all(cfg, session=_build_session(cache=cache))
+        assert cache.stats.misses >= 1
+
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_cache_evicts_least_recently_used_past_size_limit(tmp_path: Path) -> None:
+    with MockSocrata([{"camis": str(i), "inspection_date": "2024-01-01"} for i in range(5)]) as m:
+        cache = ResponseCache(tmp_path, max_bytes=100)
+        sess = _build_session(cache=cache)
+        for i in range(5):
+            sess.get(m.base_url, params={"$limit": 1, "$offset": i}).raise_for_status()
+
+    assert cache.stats.evicted > 0
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.body")) <= 100
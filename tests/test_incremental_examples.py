@@ -0,0 +1,135 @@
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from rhgp.data.dataset import PARTITION_COLUMN, read_dataset
+from rhgp.data.schema import COLS, read_raw
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features import build_examples
+from rhgp.features import state as state_module
+from rhgp.features.build_examples import (
+    build_incremental,
+    build_supervised_dataset,
+    to_inspections,
+    update_supervised_dataset,
+)
+from rhgp.features.features import DEFAULT_HISTORY, HistoryConfig
+from rhgp.features.state import read_state, retained_state
+
+
+def _write_partitions(raw: pd.DataFrame, cuts: list[pd.Timestamp], out: Path) -> None:
+    # Date-sliced partitions like `fetch --incremental` writes; each cut day is split across
+    # two partitions, as when the watermark day is re-fetched.
+    out.mkdir()
+    dates = raw[COLS.inspection_date]
+    lo = None
+    for i, hi in enumerate([*cuts, None]):
+        keep = pd.Series(True, index=raw.index)
+        if lo is not None:
+            keep &= (dates > lo) | ((dates == lo) & (raw.index % 2 == 1))
+        if hi is not None:
+            keep &= (dates < hi) | ((dates == hi) & (raw.index % 2 == 0))
+        part = raw.loc[keep].copy()
+        for c in part.select_dtypes("category"):
+            part[c] = part[c].cat.remove_unused_categories()
+        part.to_parquet(out / f"part-{i:05d}.parquet", index=False)
+        lo = hi
+
+
+def _month_files(root: Path) -> dict[str, tuple[int, int]]:
+    # Identity of each month's file; a rewrite renames a new file into place.
+    files = root.glob(f"{PARTITION_COLUMN}=*/*.parquet")
+    return {f.parent.name.split("=")[1]: (f.stat().st_ino, f.stat().st_mtime_ns) for f in files}
+
+
+def _snapshot(tmp_path: Path) -> tuple[pd.DataFrame, Path]:
+    raw = synthetic_raw(n_restaurants=120, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=4)
+    snap = tmp_path / "raw"
+    # Cut on inspection days so those inspections straddle two partitions.
+    days = sorted(pd.unique(raw[COLS.inspection_date]))
+    _write_partitions(raw, [days[len(days) * k // 4] for k in (2, 3)] + [days[-5]], snap)
+    return raw, snap
+
+
+@pytest.mark.parametrize(
+    "history", [DEFAULT_HISTORY, HistoryConfig(windows=(1, 5), day_windows=(365,))]
+)
+def test_incremental_build_matches_full_rebuild(tmp_path: Path, history: HistoryConfig) -> None:
+    raw, snap = _snapshot(tmp_path)
+    out, state_path = tmp_path / "dataset", tmp_path / "state.parquet"
+
+    # First run builds from the initial partition only; later ones arrive one at a time.
+    pending = tmp_path / "pending"
+    pending.mkdir()
+    later = sorted(snap.glob("part-*.parquet"))[1:]
+    for p in later:
+        p.rename(pending / p.name)
+    assert build_incremental(snap, out, state_path, history)["mode"] == "full"
+
+    for p in later:
+        (pending / p.name).rename(p)
+        before = _month_files(out)
+        meta = build_incremental(snap, out, state_path, history)
+        assert meta["mode"] == "incremental"
+        assert meta["new_partitions"] == [p.name]
+        # Only months with replaced or new examples are rewritten.
+        after = _month_files(out)
+        changed = {m for m in after if before.get(m) != after[m]}
+        assert changed == set(meta["rewritten_months"])
+        assert 0 < len(changed) < len(after)
+
+    expected = build_supervised_dataset(read_raw(snap), history)
+    got = read_dataset(out).sort_values(["camis", "inspection_date_t"], ignore_index=True)
+    pd.testing.assert_frame_equal(got, expected)
+
+    # The state only keeps recent inspections per restaurant.
+    state, meta = read_state(state_path)
+    assert meta["partitions"] == [p.name for p in sorted(snap.glob("part-*.parquet"))]
+    assert state["camis"].nunique() == raw[COLS.camis].nunique()
+    assert len(state) < len(to_inspections(read_raw(snap)))
+
+
+@pytest.mark.parametrize("crash", ["dataset", "state_meta"])
+def test_interrupted_delta_is_applied_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, crash: str
+) -> None:
+    _, snap = _snapshot(tmp_path)
+    out, state_path = tmp_path / "dataset", tmp_path / "state.parquet"
+    last = sorted(snap.glob("part-*.parquet"))[-1]
+    held = last.rename(tmp_path / last.name)
+    build_incremental(snap, out, state_path)
+    held.rename(last)
+
+    def fail(*args: object) -> None:
+        raise OSError("killed")
+
+    if crash == "dataset":
+        # Dataset months rewritten, state not committed.
+        monkeypatch.setattr(build_examples, "write_state", fail)
+    else:
+        # State committed, its sidecar copy not refreshed.
+        monkeypatch.setattr(state_module, "write_state_meta", fail)
+    with pytest.raises(OSError, match="killed"):
+        build_incremental(snap, out, state_path)
+    monkeypatch.undo()
+
+    meta = build_incremental(snap, out, state_path)
+    if crash == "dataset":
+        assert meta["new_partitions"] == meta["resumed_partitions"] == [last.name]
+    else:
+        assert meta["new_partitions"] == meta["resumed_partitions"] == []
+    assert "pending" not in read_state(state_path)[1]
+    expected = build_supervised_dataset(read_raw(snap))
+    got = read_dataset(out).sort_values(["camis", "inspection_date_t"], ignore_index=True)
+    pd.testing.assert_frame_equal(got, expected)
+
+
+def test_delta_before_stored_inspections_is_rejected() -> None:
+    raw = synthetic_raw(n_restaurants=10, start=date(2023, 1, 1), end=date(2024, 1, 1), seed=0)
+    late = raw[COLS.inspection_date] >= pd.Timestamp(date(2023, 7, 1))
+    dataset = build_supervised_dataset(raw.loc[late])
+    state = retained_state(to_inspections(raw.loc[late]), DEFAULT_HISTORY)
+    with pytest.raises(ValueError, match="full"):
+        update_supervised_dataset(dataset, state, raw.loc[~late])
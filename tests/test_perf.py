@@ -0,0 +1,54 @@
+import json
+import pstats
+from datetime import date
+from pathlib import Path
+
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features import build_examples
+from rhgp.models import eval, train
+from rhgp.models.train import model_meta_path
+from rhgp.perf import PerfRecorder
+
+
+def test_recorder_times_stages_and_dumps_profiles(tmp_path: Path) -> None:
+    perf = PerfRecorder(tmp_path / "prof")
+    with perf.stage("outer", rows=1000):
+        with perf.stage("inner") as stage:
+            sum(range(100_000))
+            stage.rows = 10
+
+    stats = perf.to_dict()
+    assert list(stats) == ["inner", "outer"]
+    assert stats["outer"]["rows"] == 1000 and stats["outer"]["rows_per_s"] > 0
+    assert stats["outer"]["wall_s"] >= stats["inner"]["wall_s"]
+    assert stats["inner"]["peak_rss_mb"] > 0 and "traced_peak_mb" not in stats["inner"]
+    # Only the outermost stage is profiled; its dump loads as pstats.
+    assert "profile" not in stats["inner"]
+    pstats.Stats(stats["outer"]["profile"])
+
+
+def test_cli_runs_record_perf_in_metadata(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=150, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=5)
+    raw_path = tmp_path / "raw.parquet"
+    raw.to_parquet(raw_path, index=False)
+    data = tmp_path / "dataset"
+    build_examples.main(["--in", str(raw_path), "--out", str(data)])
+    built = json.loads(build_examples.dataset_meta_path(data).read_text())
+    assert built["mode"] == "full"
+    assert list(built["perf"]) == ["read", "aggregate", "features", "write"]
+    assert built["perf"]["write"]["rows"] == built["rows"]
+
+    model = tmp_path / "logreg.joblib"
+    profile = tmp_path / "prof"
+    train.main(["--data", str(data), "--out", str(model), "--profile", str(profile)])
+    meta = json.loads(model_meta_path(model).read_text())
+    assert set(meta["perf"]) == {"split", "fit"} and "design_key" not in meta
+    assert (profile / "fit.prof").exists()
+    assert train.read_model_design_key(model) is None
+
+    out = tmp_path / "reports"
+    eval.main(["--data", str(data), "--model", str(model), "--out-dir", str(out)])
+    metrics = json.loads((out / "metrics.json").read_text())
+    perf = metrics["run_metadata"]["perf"]
+    assert perf["predict"]["rows"] == metrics["n_test"]
+    assert set(perf) == {"split", "load_model", "predict", "metrics"}
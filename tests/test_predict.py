@@ -0,0 +1,60 @@
+from datetime import date
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from rhgp.data.dataset import read_dataset, write_dataset
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features import build_examples
+from rhgp.features.build_examples import build_supervised_dataset, to_inspections
+from rhgp.models import predict, train
+from rhgp.models.train import feature_columns
+
+
+def test_predict_streams_chunks_in_input_order(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=200, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=7)
+    data = tmp_path / "dataset"
+    write_dataset(build_supervised_dataset(raw), data)
+    model = tmp_path / "logreg.joblib"
+    train.main(["--data", str(data), "--out", str(model)])
+
+    reports = []
+    for workers in (1, 2):
+        out = tmp_path / f"scores-{workers}.parquet"
+        reports.append(predict.predict(model, data, out, chunk_rows=250, workers=workers))
+    serial = pd.read_parquet(tmp_path / "scores-1.parquet")
+    parallel = pd.read_parquet(tmp_path / "scores-2.parquet")
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert reports[0]["rows"] == len(serial) and reports[0]["chunks"] > 4
+    assert reports[1]["rows_per_s"] > 0 and reports[1]["peak_rss_mb"]["max_worker"] > 0
+
+    # Same rows, same order and same scores as an in-memory predict over the dataset.
+    df = read_dataset(data)
+    assert list(serial.columns) == ["camis", "inspection_date_t", "p_fail"]
+    np.testing.assert_array_equal(serial["camis"].to_numpy(), df["camis"].to_numpy())
+    expected = joblib.load(model).predict_proba(df.loc[:, feature_columns()])[:, 1]
+    np.testing.assert_allclose(serial["p_fail"].to_numpy(), expected)
+
+
+def test_features_output_scores_every_latest_inspection(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=120, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=9)
+    raw_path = tmp_path / "raw.parquet"
+    raw.to_parquet(raw_path, index=False)
+    data, features = tmp_path / "dataset", tmp_path / "features.parquet"
+    argv = ["--in", str(raw_path), "--out", str(data), "--features-out", str(features)]
+    build_examples.main(argv)
+    model = tmp_path / "logreg.joblib"
+    train.main(["--data", str(data), "--out", str(model)])
+
+    out = tmp_path / "scores.parquet"
+    report = predict.predict(model, features, out, chunk_rows=300)
+    scores = pd.read_parquet(out)
+    inspections = to_inspections(raw)
+    assert report["rows"] == len(inspections) > len(read_dataset(data))
+    assert not out.with_name(out.name + ".tmp").exists()
+    # Each restaurant's latest inspection, which has no label yet, is scored.
+    latest = inspections.groupby("camis")["inspection_date_t"].max()
+    scored = scores.groupby("camis")["inspection_date_t"].max()
+    pd.testing.assert_series_equal(scored, latest, check_names=False, check_index_type=False)
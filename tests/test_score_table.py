@@ -0,0 +1,46 @@
+from datetime import date
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from rhgp.app import score_table
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset, to_inspections
+from rhgp.models import train
+
+
+def test_score_table_lookup_matches_dataset(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=200, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=11)
+    raw_path = tmp_path / "raw.parquet"
+    raw.to_parquet(raw_path, index=False)
+    dataset = build_supervised_dataset(raw)
+    pipe = train.build_pipeline()
+    pipe.fit(dataset.loc[:, train.feature_columns()], dataset["y_t1"].astype(int))
+    joblib.dump(pipe, tmp_path / "logreg.joblib")
+
+    out = tmp_path / "scores.arrow"
+    model = tmp_path / "logreg.joblib"
+    score_table.main(["--in", str(raw_path), "--model", str(model), "--out", str(out)])
+
+    table = score_table.ScoreTable.open(out)
+    inspections = to_inspections(raw)
+    assert len(table) == inspections["camis"].nunique()
+    assert table.lookup(-1) is None
+
+    camis = int(dataset["camis"].iloc[0])
+    found = table.lookup(camis)
+    assert found is not None
+    mine = inspections[inspections["camis"] == camis]
+    assert len(found.history) == len(mine)
+    assert found.latest["inspection_date_t"] == mine["inspection_date_t"].max()
+
+    # Labelled inspections score like the batch dataset's rows.
+    rows = dataset[dataset["camis"] == camis]
+    expected = pipe.predict_proba(rows.loc[:, train.feature_columns()])[:, 1]
+    history = found.history.set_index("inspection_date_t")
+    np.testing.assert_allclose(history.loc[rows["inspection_date_t"], "p_fail"], expected)
+
+    riskiest = table.riskiest(5)
+    assert len(riskiest) == 5 and riskiest["p_fail"].is_monotonic_decreasing
+    assert riskiest["camis"].is_unique
@@ -0,0 +1,167 @@
+import http.client
+import json
+import threading
+from collections import Counter
+from datetime import date
+from typing import Any, cast
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rhgp.app.serve import FeatureState, ScoringService, make_server
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import attach_labels, to_inspections
+from rhgp.features.features import HistoryConfig, add_history_features
+from rhgp.models.train import build_pipeline, feature_columns
+
+CUTOFF = pd.Timestamp("2023-06-01")
+
+
+def _inspections(seed: int) -> pd.DataFrame:
+    raw = synthetic_raw(n_restaurants=200, start=date(2021, 1, 1), end=date(2025, 1, 1), seed=seed)
+    return to_inspections(raw)
+
+
+def _records(t: pd.DataFrame) -> list[dict[str, Any]]:
+    later = cast(pd.DataFrame, t[t["inspection_date_t"] >= CUTOFF])
+    later = later.sort_values("inspection_date_t", kind="stable")
+    return [{k: None if pd.isna(v) else v for k, v in r.items()} for r in later.to_dict("records")]
+
+
+def _post(conn: http.client.HTTPConnection, body: Any) -> tuple[int, dict[str, Any]]:
+    conn.request("POST", "/score", json.dumps(body, default=str))
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read())
+
+
+@pytest.mark.parametrize(
+    "history", [HistoryConfig(), HistoryConfig(windows=(1, 5), day_windows=(90, 365))]
+)
+def test_feature_state_matches_batch_history(history: HistoryConfig) -> None:
+    t = _inspections(seed=3)
+    state = FeatureState.from_inspections(
+        cast(pd.DataFrame, t[t["inspection_date_t"] < CUTOFF]), history
+    )
+    events = [{k: np.nan if v is None else v for k, v in r.items()} for r in _records(t)]
+    staged: dict[int, Any] = {}
+    rows = state.stage(events, staged)
+    # Staged inspections are seen within the batch but not stored until committed.
+    camis, day = int(events[-1]["camis"]), pd.Timestamp(events[-1]["inspection_date_t"])
+    stored = state.latest(camis)
+    assert stored is None or stored < day
+    state.commit(staged)
+    assert state.latest(camis) == day
+    got = pd.DataFrame(rows).set_index(["camis", "inspection_date_t"]).sort_index()
+    expected = add_history_features(t, history).set_index(["camis", "inspection_date_t"])
+    expected = expected.loc[got.index]
+    for c in history.feature_names():
+        if c == "prev_grade":
+            assert got[c].fillna("-").tolist() == expected[c].astype(object).fillna("-").tolist()
+        else:
+            np.testing.assert_allclose(got[c].astype(float), expected[c].astype(float))
+
+
+def test_service_micro_batches_and_matches_batch_scores() -> None:
+    t = _inspections(seed=4)
+    before = cast(pd.DataFrame, t[t["inspection_date_t"] < CUTOFF])
+    train = attach_labels(add_history_features(before))
+    model = build_pipeline().fit(train.loc[:, feature_columns()], train["y_t1"].astype(int))
+    service = ScoringService(model, FeatureState.from_inspections(before), max_wait_ms=5.0)
+    server = make_server(service, "127.0.0.1", 0)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    events = _records(t)
+    for e in events:
+        e["inspection_date_t"] = e["inspection_date_t"].date().isoformat()
+    scores: dict[tuple[int, str], float] = {}
+
+    def client(share: list[dict[str, Any]]) -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        for e in share:
+            status, body = _post(conn, {"inspections": [e]})
+            assert status == 200, body
+            (s,) = body["scores"]
+            scores[(s["camis"], s["inspection_date_t"])] = s["p_fail"]
+        conn.close()
+
+    threads = [
+        threading.Thread(target=client, args=([e for e in events if e["camis"] % 4 == i],))
+        for i in range(4)
+    ]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    assert _post(conn, events[0])[0] == 409
+    assert _post(conn, {"inspection_date_t": "2024-01-01"})[0] == 400
+    conn.request("GET", "/stats")
+    stats = json.loads(conn.getresponse().read())
+    conn.close()
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+    assert stats["requests"] == len(events) and stats["inspections"] == len(events)
+    assert stats["p99_ms"] >= stats["p50_ms"] > 0
+
+    # Scores equal the pipeline on the batch-built features of the same inspections.
+    batch = add_history_features(t)
+    batch = cast(pd.DataFrame, batch[batch["inspection_date_t"] >= CUTOFF])
+    expected = model.predict_proba(batch.loc[:, feature_columns()])[:, 1]
+    keys = zip(batch["camis"], batch["inspection_date_t"].dt.strftime("%Y-%m-%d"), strict=True)
+    got = [scores[k] for k in keys]
+    np.testing.assert_allclose(got, expected, rtol=1e-9)
+
+
+class _FailingModel:
+    def __init__(self, model: Any) -> None:
+        self.model = model
+        self.fail = True
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return self.model.predict_proba(X)
+
+
+def test_failed_batch_leaves_state_unchanged_and_returns_500() -> None:
+    t = _inspections(seed=5)
+    before = cast(pd.DataFrame, t[t["inspection_date_t"] < CUTOFF])
+    train = attach_labels(add_history_features(before))
+    pipe = build_pipeline().fit(train.loc[:, feature_columns()], train["y_t1"].astype(int))
+    model = _FailingModel(pipe)
+    service = ScoringService(model, FeatureState.from_inspections(before), max_wait_ms=1.0)
+    server = make_server(service, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Two inspections of one restaurant: the second sees the first within the request.
+    records = _records(t)
+    counts = Counter(int(e["camis"]) for e in records)
+    camis, n = counts.most_common(1)[0]
+    assert n >= 2
+    events = [e for e in records if e["camis"] == camis][:2]
+    for e in events:
+        e["inspection_date_t"] = e["inspection_date_t"].date().isoformat()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    status, body = _post(conn, {"inspections": events})
+    assert status == 500 and "model unavailable" in body["error"]
+
+    # The retry is neither stale nor scored on history that includes the failed attempt.
+    model.fail = False
+    status, body = _post(conn, {"inspections": events})
+    conn.close()
+    server.shutdown()
+    server.server_close()
+    service.close()
+    assert status == 200, body
+
+    batch = add_history_features(t)
+    batch = cast(
+        pd.DataFrame, batch[(batch["camis"] == camis) & (batch["inspection_date_t"] >= CUTOFF)]
+    )
+    expected = pipe.predict_proba(batch.loc[:, feature_columns()].head(2))[:, 1]
+    np.testing.assert_allclose([s["p_fail"] for s in body["scores"]], expected, rtol=1e-9)
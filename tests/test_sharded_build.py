@@ -0,0 +1,38 @@
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from rhgp.data.dataset import read_dataset
+from rhgp.data.schema import COLS
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_sharded, build_supervised_dataset
+from rhgp.features.features import HistoryConfig
+
+
+def _files(root: Path) -> dict[str, bytes]:
+    return {str(p.relative_to(root)): p.read_bytes() for p in sorted(root.rglob("*.parquet"))}
+
+
+def test_sharded_build_is_identical_for_any_worker_count(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=150, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=8)
+    # Shards only see some inspection types; the dataset must still share one category set.
+    raw[COLS.inspection_type] = raw[COLS.inspection_type].cat.remove_unused_categories()
+    raw.to_parquet(tmp_path / "raw.parquet", index=False)
+    history = HistoryConfig(windows=(3, 5), day_windows=(365,))
+
+    outs = []
+    for workers in (1, 3):
+        out = tmp_path / f"dataset-w{workers}"
+        n = build_sharded(
+            tmp_path / "raw.parquet", out, history, workers=workers, shards=4, batch_rows=700
+        )
+        outs.append(out)
+    assert _files(outs[0]) == _files(outs[1])
+    shards = {p.name.split("-")[1] for p in outs[0].rglob("*.parquet")}
+    assert shards == {"00000", "00001", "00002", "00003"}
+
+    expected = build_supervised_dataset(raw, history)
+    got = read_dataset(outs[0]).sort_values(["camis", "inspection_date_t"], ignore_index=True)
+    assert n == len(expected)
+    pd.testing.assert_frame_equal(got, expected)
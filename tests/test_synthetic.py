@@ -0,0 +1,23 @@
+from pathlib import Path
+
+import pandas as pd
+
+from rhgp.data.schema import read_raw
+from rhgp.data.synthetic import synthetic_raw, synthetic_raw_rows
+
+
+def test_synthetic_raw_rows_is_sized_deterministic_and_typed(tmp_path: Path) -> None:
+    raw = synthetic_raw_rows(100_000, seed=1)
+    assert abs(len(raw) - 100_000) < 5_000
+    pd.testing.assert_frame_equal(raw, synthetic_raw_rows(100_000, seed=1))
+
+    # Already in the snapshot schema: a parquet round trip through `read_raw` is lossless.
+    raw.to_parquet(tmp_path / "raw.parquet", index=False)
+    pd.testing.assert_frame_equal(read_raw(tmp_path / "raw.parquet"), raw)
+
+    # Denser inspections and violations scale the rows per restaurant.
+    base = synthetic_raw(n_restaurants=500, seed=2)
+    dense = synthetic_raw(
+        n_restaurants=500, seed=2, days_between_inspections=90.0, points_per_violation=4.0
+    )
+    assert len(dense) > 1.5 * len(base)
@@ -0,0 +1,59 @@
+from typing import Any, cast
+
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, precision_recall_fscore_support, roc_auc_score
+
+from rhgp.models.eval import format_threshold_table
+from rhgp.models.sweep import threshold_sweep
+
+
+def _scores(n: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    y = rng.random(n) < 0.3
+    # Rounded scores give many ties, which must be grouped into one threshold.
+    p = np.clip(np.round(rng.normal(0.35 + 0.2 * y, 0.2), 2), 0.0, 1.0)
+    return y.astype(int), p
+
+
+def test_sweep_matches_sklearn_at_every_threshold() -> None:
+    y, p = _scores(3000, seed=0)
+    sweep = threshold_sweep(y, p)
+    assert len(sweep.thresholds) == len(np.unique(p))
+
+    thresholds = [*np.unique(p).tolist(), 0.0, 0.333, 1.0, 1.5]
+    for row in sweep.rows(thresholds):
+        expected = precision_recall_fscore_support(
+            y,
+            (p >= row["threshold"]).astype(int),
+            average="binary",
+            zero_division=cast(Any, 0),
+        )
+        assert [row["precision_fail"], row["recall_fail"], row["f1_fail"]] == pytest.approx(
+            [float(v) for v in expected[:3]]
+        )
+        assert row["tp"] == int(((p >= row["threshold"]) & (y == 1)).sum())
+
+    assert sweep.pr_auc() == pytest.approx(average_precision_score(y, p))
+    assert sweep.roc_auc() == pytest.approx(roc_auc_score(y, p))
+
+    best = sweep.best_f1()
+    assert best is not None and best["f1_fail"] == pytest.approx(sweep.f1.max())
+    table = format_threshold_table(sweep.rows([0.5, 0.7]))
+    assert table.splitlines()[1].startswith("0.500\t")
+
+
+def test_target_precision_picks_highest_recall_point() -> None:
+    y, p = _scores(2000, seed=1)
+    sweep = threshold_sweep(y, p)
+    point = sweep.at_precision(0.6)
+    assert point is not None and point["precision_fail"] >= 0.6
+    frame = sweep.to_frame()
+    assert point["recall_fail"] == frame.loc[frame["precision_fail"] >= 0.6, "recall_fail"].max()
+    assert sweep.at_precision(1.01) is None
+
+
+def test_sweep_without_positives_has_no_aucs() -> None:
+    sweep = threshold_sweep(np.zeros(5, dtype=int), np.linspace(0, 1, 5))
+    assert sweep.pr_auc() is None and sweep.roc_auc() is None
+    assert sweep.rows([0.5])[0]["precision_fail"] == 0.0
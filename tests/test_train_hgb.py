@@ -0,0 +1,39 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from rhgp.data.dataset import read_dataset, write_dataset
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset
+from rhgp.models import eval, train_hgb
+from rhgp.models.train import FEATURE_COLUMNS_CAT, feature_columns
+
+
+def test_hgb_trainer_plugs_into_eval(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=300, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=9)
+    data = tmp_path / "dataset"
+    write_dataset(build_supervised_dataset(raw), data)
+
+    out = tmp_path / "hgb.joblib"
+    train_hgb.main(["--data", str(data), "--out", str(out), "--max-iter", "60"])
+    pipe = joblib.load(out)
+    assert 10 <= pipe.named_steps["clf"].n_iter_ <= 60
+    assert list(pipe.named_steps) == ["pre", "clf"]
+
+    eval.main(["--data", str(data), "--model", str(out), "--out-dir", str(tmp_path / "r")])
+    metrics = json.loads((tmp_path / "r" / "metrics.json").read_text())
+    assert metrics["run_metadata"]["model_key"] == "hgb"
+    assert metrics["hgb_curve"]["roc_auc"] > 0.5
+
+    # String-typed categoricals and unseen categories score like the parquet-typed frame.
+    X = read_dataset(data, columns=feature_columns())
+    as_str = X.copy()
+    for c in FEATURE_COLUMNS_CAT:
+        as_str[c] = as_str[c].astype(object)
+    np.testing.assert_allclose(pipe.predict_proba(as_str), pipe.predict_proba(X))
+    unseen = X.head(5).copy()
+    unseen["inspection_type"] = "Never seen / Initial"
+    assert np.isfinite(pipe.predict_proba(unseen)).all()
@@ -0,0 +1,62 @@
+import json
+from datetime import date
+from pathlib import Path
+from typing import Any, cast
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from rhgp.data.dataset import iter_batches, write_dataset
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset
+from rhgp.models import eval, train_stream
+from rhgp.models.train import FEATURE_COLUMNS_CAT, FEATURE_COLUMNS_NUM, feature_columns
+
+
+def _dense(X: Any) -> np.ndarray:
+    return X.toarray() if sp.issparse(X) else np.asarray(X)
+
+
+def _dataset(tmp_path: Path, seed: int) -> Path:
+    raw = synthetic_raw(n_restaurants=300, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=seed)
+    data = tmp_path / "dataset"
+    write_dataset(build_supervised_dataset(raw), data)
+    return data
+
+
+def test_streamed_preprocessor_matches_in_memory_fit(tmp_path: Path) -> None:
+    data = _dataset(tmp_path, seed=3)
+    batches = list(iter_batches(data, feature_columns() + ["y_t1"], batch_rows=300))
+    assert max(len(b) for b in batches) <= 300 and len(batches) > 5
+    stats = train_stream.collect_stats(batches)
+    pre = train_stream.build_stream_preprocessor(stats, batches[0])
+
+    # The in-memory equivalent: mean imputation, then scaling and one-hot on all rows.
+    X = cast(pd.DataFrame, pd.concat(batches, ignore_index=True)).loc[:, feature_columns()]
+    numeric = Pipeline([("imputer", SimpleImputer()), ("scaler", StandardScaler(with_mean=False))])
+    categorical = Pipeline(
+        [
+            ("imputer", SimpleImputer(strategy="most_frequent")),
+            ("onehot", OneHotEncoder(handle_unknown="ignore")),
+        ]
+    )
+    reference = ColumnTransformer(
+        [("num", numeric, FEATURE_COLUMNS_NUM), ("cat", categorical, FEATURE_COLUMNS_CAT)]
+    ).fit(X)
+    np.testing.assert_allclose(_dense(pre.transform(X)), _dense(reference.transform(X)), rtol=1e-6)
+
+
+def test_streaming_trainer_artifact_loads_in_eval(tmp_path: Path) -> None:
+    data = _dataset(tmp_path, seed=4)
+    out = tmp_path / "logreg_stream.joblib"
+    train_stream.main(["--data", str(data), "--out", str(out), "--batch-rows", "500"])
+
+    eval.main(["--data", str(data), "--model", str(out), "--out-dir", str(tmp_path / "r")])
+    metrics = json.loads((tmp_path / "r" / "metrics.json").read_text())
+    assert metrics["run_metadata"]["model_key"] == "logreg"
+    assert metrics["logreg_curve"]["roc_auc"] > 0.6
@@ -0,0 +1,75 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from rhgp.data.dataset import write_dataset
+from rhgp.data.synthetic import synthetic_raw
+from rhgp.features.build_examples import build_supervised_dataset
+from rhgp.models import tune
+
+
+def test_tune_halves_candidates_and_saves_best_pipeline(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=300, start=date(2021, 6, 1), end=date(2025, 1, 1), seed=5)
+    data = tmp_path / "dataset"
+    write_dataset(build_supervised_dataset(raw), data)
+
+    out, reports = tmp_path / "logreg_tuned.joblib", tmp_path / "tune"
+    tune.main(
+        ["--data", str(data), "--out", str(out), "--out-dir", str(reports)]
+        + ["--n-candidates", "9", "--min-rows", "200", "--workers", "2"]
+    )
+    board = pd.read_csv(reports / "leaderboard.csv")
+    # 9 candidates, eta=3: rungs of 9, 3 and 1 candidates on growing training slices.
+    assert board.groupby("rung")["candidate"].count().to_dict() == {0: 9, 1: 3, 2: 1}
+    fractions = board.groupby("rung")["train_fraction"].first()
+    assert fractions.is_monotonic_increasing and fractions.iloc[-1] == 1.0
+    survivors = set(board.loc[board["rung"] == 1, "candidate"])
+    rung0 = board.loc[board["rung"] == 0].sort_values("pr_auc", ascending=False)
+    assert survivors == set(rung0["candidate"].head(3))
+
+    summary = json.loads((reports / "tune.json").read_text())
+    best = json.loads(board.loc[0, "params"])
+    assert summary["best_params"] == best
+    clf = joblib.load(out).named_steps["clf"]
+    assert clf.C == best["C"] and clf.class_weight == best["class_weight"]
+
+
+def test_prepare_folds_writes_memmappable_time_ordered_matrices(tmp_path: Path) -> None:
+    raw = synthetic_raw(n_restaurants=150, start=date(2022, 1, 1), end=date(2025, 1, 1), seed=6)
+    df = tune.sort_by_label_date(build_supervised_dataset(raw))
+    folds = tune.prepare_folds(df, n_folds=2, fold_months=3, work_dir=tmp_path)
+    assert len(folds) == 2 and folds[0].n_train < folds[1].n_train
+    X = np.load(folds[1].X_train, mmap_mode="r")
+    assert isinstance(X, np.memmap) and X.shape[0] == folds[1].n_train
+    # Validation rows of the first fold are the start of the second fold's extra training rows.
+    y0_val = np.load(folds[0].y_val)
+    y1_train = np.load(folds[1].y_train)
+    np.testing.assert_array_equal(
+        y1_train[folds[0].n_train : folds[0].n_train + len(y0_val)], y0_val
+    )
+
+
+def test_sparse_fold_matrices_stay_sparse_and_slice_recent_rows(tmp_path: Path) -> None:
+    rng = np.random.default_rng(0)
+    X = sp.csr_matrix(np.where(rng.random((500, 40)) < 0.05, rng.random((500, 40)), 0.0))
+    y = (np.arange(500) % 3 == 0).astype(int)
+    paths = {
+        name: tune.save_matrix(tmp_path / name, arr)
+        for name, arr in {"X_train": X, "y_train": y, "X_val": X[:100], "y_val": y[:100]}.items()
+    }
+    assert not (tmp_path / "X_train.npy").exists()
+    recent = tune.load_matrix(paths["X_train"], last_rows=120)
+    # Views of the mapped arrays, not copies.
+    assert sp.issparse(recent) and not recent.data.flags.writeable
+    np.testing.assert_array_equal(recent.toarray(), X[-120:].toarray())
+    np.testing.assert_array_equal(tune.load_matrix(paths["y_train"], last_rows=120), y[-120:])
+
+    fm = tune.FoldMatrices(fold=0, n_train=500, **paths)
+    for model, params in [("logreg", {"C": 1.0}), ("rf", {"n_estimators": 5})]:
+        value, _ = tune._fit_score((model, params, fm, 120, "roc_auc"))
+        assert 0.0 <= value <= 1.0